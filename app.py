@@ -1,5 +1,7 @@
 import os
-from flask import Flask, render_template
+import time
+from flask import Flask, Response, render_template
+from config import METRICS_DIR, METRICS_INTERVAL
 
 app = Flask(__name__)
 
@@ -8,6 +10,37 @@ def welcome():
     # Render the welcome page with animated "༺⚡༻ 𝑫𝒊𝒗𝒚𝒂𝒏𝒔𝒉 𝒔𝒉𝒖𝒌𝒍𝒂 ༺⚡༻ 🤭🤫" text
     return render_template("welcome.html")
 
+def merge_exports(directory=METRICS_DIR, stale_after=METRICS_INTERVAL * 4):
+    """Merge the .prom snapshots written by each bot process into one exposition"""
+    if not os.path.isdir(directory):
+        return ""
+    families = {}  # name -> (header lines, sample lines), in first-seen order
+    now = time.time()
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not name.endswith(".prom") or now - os.path.getmtime(path) > stale_after:
+            continue  # Stale snapshot from a process that is gone
+        current = None
+        with open(path) as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if line.startswith(("# HELP ", "# TYPE ")):
+                    current = families.setdefault(line.split()[2], ([], []))
+                    if line not in current[0]:
+                        current[0].append(line)
+                elif line and current:
+                    current[1].append(line)
+    lines = []
+    for header, samples in families.values():
+        lines.extend(header[:2])
+        lines.extend(samples)
+    return "\n".join(lines) + "\n" if lines else ""
+
+@app.route("/metrics")
+def metrics():
+    # Bot processes write snapshots (devgagan/core/metrics.py); we only read them
+    return Response(merge_exports(), mimetype="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     # Default to port 5000 if PORT is not set in the environment
     port = int(os.environ.get("PORT", 8000))
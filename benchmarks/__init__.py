@@ -0,0 +1,7 @@
+# ---------------------------------------------------
+# File Name: __init__.py
+# Description: Offline benchmarks for the transfer pipeline (python -m benchmarks)
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
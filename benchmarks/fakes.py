@@ -0,0 +1,338 @@
+# ---------------------------------------------------
+# File Name: fakes.py
+# Description: In-process fake Telegram clients (and local HTTP origins) for offline benchmarks
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import inspect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import ModuleType, SimpleNamespace
+from typing import Dict, List, Optional, Union
+
+GET_FILE_CHUNK = 1024 * 1024  # upload.getFile limit
+SAVE_PART_CHUNK = 512 * 1024  # upload.saveFilePart / saveBigFilePart limit
+
+async def _maybe_await(result):
+    if inspect.isawaitable(result):
+        await result
+
+class FakeNetwork:
+    """
+    One shared link: each request pays `latency` once, and payload bytes
+    are serialized through `bandwidth` bytes/s across all transfers, so
+    concurrency helps hide latency but can't exceed the pipe.
+    """
+    def __init__(self, latency: float = 0.03, bandwidth: float = 80 * 1024**2):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self._busy_until = 0.0
+        self.requests = 0
+        self.bytes = 0
+
+    async def request(self, nbytes: int = 0):
+        self.requests += 1
+        self.bytes += nbytes
+        now = time.monotonic()
+        start = max(now, self._busy_until)
+        self._busy_until = start + nbytes / self.bandwidth
+        await asyncio.sleep(self._busy_until - now + self.latency)
+
+class FakeStatus:
+    """Status/progress message: edits and deletes cost one round trip"""
+    def __init__(self, network: FakeNetwork, message_id: int = 1):
+        self.network = network
+        self.id = message_id
+        self.edits = 0
+
+    async def edit(self, *args, **kwargs):
+        self.edits += 1
+        await self.network.request()
+        return self
+
+    async def delete(self, *args, **kwargs):
+        await self.network.request()
+
+class FakeMessage(FakeStatus):
+    """A channel message carrying a document of `size` bytes"""
+    def __init__(self, network: FakeNetwork, message_id: int, size: int = 0, file_name: str = None, caption: str = ""):
+        super().__init__(network, message_id)
+        self.empty = False
+        self.service = None
+        self.caption = caption
+        self.chat = SimpleNamespace(id=-100123456)
+        self.video = self.photo = self.audio = self.voice = self.video_note = self.sticker = None
+        self.document = SimpleNamespace(file_name=file_name or f"file_{message_id}.bin", file_size=size) if size else None
+
+    async def download(self, file_name: str, block: bool = True, progress=None, progress_args=(), **kwargs) -> str:
+        size = self.document.file_size
+        chunk = b"\0" * GET_FILE_CHUNK
+        os.makedirs(os.path.dirname(file_name) or ".", exist_ok=True)
+        done = 0
+        with open(file_name, "wb") as f:
+            while done < size:
+                n = min(GET_FILE_CHUNK, size - done)
+                await self.network.request(n)
+                f.write(chunk[:n])
+                done += n
+                if progress:
+                    await _maybe_await(progress(done, size, *progress_args))
+        return file_name
+
+    async def copy(self, chat_id, *args, **kwargs):
+        await self.network.request()
+        return FakeMessage(self.network, self.id + 1)
+
+class FakePyrogramClient:
+    """The subset of pyrogram.Client the transfer pipeline calls"""
+    def __init__(self, network: FakeNetwork, corpus: Optional[Dict[int, int]] = None, name: str = "bench"):
+        self.network = network
+        self.name = name
+        self.corpus = {} if corpus is None else corpus  # message id -> document size
+        self._next_id = 1000
+
+    def on_message(self, *args, **kwargs):
+        return lambda func: func
+
+    def on_callback_query(self, *args, **kwargs):
+        return lambda func: func
+
+    async def get_chat(self, ref):
+        await self.network.request()
+        return SimpleNamespace(id=-100123456, username=None, title="bench")
+
+    async def resolve_peer(self, peer_id):
+        return SimpleNamespace(channel_id=123456, access_hash=42)
+
+    async def get_messages(self, chat_id, message_ids: Union[int, List[int]]):
+        await self.network.request()
+        ids = message_ids if isinstance(message_ids, list) else [message_ids]
+        messages = [FakeMessage(self.network, i, self.corpus.get(i, 0)) for i in ids]
+        return messages if isinstance(message_ids, list) else messages[0]
+
+    async def send_message(self, chat_id, text="", *args, **kwargs):
+        await self.network.request()
+        self._next_id += 1
+        return FakeStatus(self.network, self._next_id)
+
+    async def _save_file(self, path: str, progress=None, progress_args=()):
+        """saveFilePart loop: the file is read in the loop, like Pyrogram does"""
+        size = os.path.getsize(path)
+        done = 0
+        with open(path, "rb") as f:
+            while True:
+                part = f.read(SAVE_PART_CHUNK)
+                if not part:
+                    break
+                await self.network.request(len(part))
+                done += len(part)
+                if progress:
+                    await _maybe_await(progress(done, size, *progress_args))
+
+    async def _send_media(self, chat_id, path, progress=None, progress_args=(), **kwargs):
+        await self._save_file(path, progress, progress_args)
+        await self.network.request()  # messages.sendMedia
+        self._next_id += 1
+        return FakeMessage(self.network, self._next_id)
+
+    async def send_document(self, chat_id, document, *args, progress=None, progress_args=(), **kwargs):
+        return await self._send_media(chat_id, document, progress, progress_args)
+
+    async def send_video(self, chat_id, video, *args, progress=None, progress_args=(), **kwargs):
+        return await self._send_media(chat_id, video, progress, progress_args)
+
+    async def send_audio(self, chat_id, audio, *args, progress=None, progress_args=(), **kwargs):
+        return await self._send_media(chat_id, audio, progress, progress_args)
+
+    async def send_photo(self, chat_id, photo, *args, progress=None, progress_args=(), **kwargs):
+        return await self._send_media(chat_id, photo, progress, progress_args)
+
+class FakeTelethonClient:
+    """The subset of telethon.TelegramClient used by the fallback paths"""
+    def __init__(self, network: FakeNetwork, corpus: Optional[Dict[int, int]] = None):
+        self.network = network
+        self.corpus = {} if corpus is None else corpus
+
+    def on(self, *args, **kwargs):
+        return lambda func: func
+
+    async def get_messages(self, entity, ids=None):
+        await self.network.request()
+        size = self.corpus.get(ids, 0)
+        return SimpleNamespace(
+            id=ids, media=bool(size), message="",
+            file=SimpleNamespace(name=f"file_{ids}.bin", size=size, ext=".bin"),
+        )
+
+    async def send_message(self, entity, message="", *args, **kwargs):
+        await self.network.request()
+        return FakeStatus(self.network)
+
+    async def send_file(self, entity, file, *args, **kwargs):
+        await self.network.request()
+        return FakeStatus(self.network)
+
+def fake_devgagantools(network: FakeNetwork) -> ModuleType:
+    """Stand-in for devgagantools.fast_upload / fast_download (parallel MTProto transfers)"""
+    module = ModuleType("devgagantools")
+
+    # Same parameter order and names as the real library, so positional mistakes fail here too
+    async def fast_download(client, msg, reply=None, download_folder=None, progress_bar_function=None, name=None, user_id=None):
+        path = os.path.join(download_folder or "", name or msg.file.name)
+        size = msg.file.size
+        chunk = b"\0" * GET_FILE_CHUNK
+        done = 0
+        with open(path, "wb") as f:
+            while done < size:
+                n = min(GET_FILE_CHUNK, size - done)
+                await network.request(n)
+                f.write(chunk[:n])
+                done += n
+                if progress_bar_function:
+                    await _maybe_await(progress_bar_function(done, size))
+        return path
+
+    async def fast_upload(client, file_location, reply=None, name=None, progress_bar_function=None, user_id=None):
+        size = os.path.getsize(file_location)
+        done = 0
+        with open(file_location, "rb") as f:
+            while True:
+                part = f.read(SAVE_PART_CHUNK)
+                if not part:
+                    break
+                await network.request(len(part))
+                done += len(part)
+                if progress_bar_function:
+                    await _maybe_await(progress_bar_function(done, size))
+        return SimpleNamespace(name=name or os.path.basename(file_location), size=size)
+
+    module.fast_download = fast_download
+    module.fast_upload = fast_upload
+    return module
+
+class FakeHlsOrigin:
+    """
+    Local HTTP server with one HLS stream of `segments` equal fragments.
+    Every request pays `latency` and each connection is capped at `rate`
+    bytes/s, like a CDN throttling per connection, so fetching fragments
+    concurrently matters here the way it does against real sites.
+    """
+    def __init__(self, segments: int, size: int, latency: float = 0.03, rate: float = 8 * 1024**2):
+        self.segments = segments
+        self.segment_size = max(1, size // segments)
+        self.latency = latency
+        self.rate = rate
+        self.requests = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/stream/index.m3u8"
+
+    def playlist(self) -> bytes:
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:4", "#EXT-X-MEDIA-SEQUENCE:0"]
+        for index in range(self.segments):
+            lines += ["#EXTINF:4.0,", f"seg{index}.ts"]
+        return ("\n".join(lines + ["#EXT-X-ENDLIST", ""])).encode()
+
+    def _handler(self):
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                origin.requests += 1
+                time.sleep(origin.latency)
+                if self.path.endswith(".m3u8"):
+                    body, content_type = origin.playlist(), "application/vnd.apple.mpegurl"
+                elif self.path.endswith(".ts"):
+                    body, content_type = b"\x47" * origin.segment_size, "video/mp2t"  # TS sync bytes
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                for offset in range(0, len(body), 64 * 1024):
+                    chunk = body[offset:offset + 64 * 1024]
+                    self.wfile.write(chunk)
+                    time.sleep(len(chunk) / origin.rate)
+
+        return Handler
+
+    def __enter__(self) -> "FakeHlsOrigin":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+class FakeHttpOrigin:
+    """
+    Local HTTP/1.1 server for small files (thumbnails, shortener replies).
+    Each new connection costs `handshake` (TCP + TLS round trips against a
+    real host) and each request `latency`; `connections` counts how many
+    the client opened, so pooling shows up as connections < requests.
+    """
+    def __init__(self, size: int, latency: float = 0.03, handshake: float = 0.06):
+        self.size = size
+        self.latency = latency
+        self.handshake = handshake
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def url(self, index: int) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/thumb/{index}.jpg"
+
+    def _handler(self):
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with origin._lock:
+                    origin.connections += 1
+                time.sleep(origin.handshake)
+
+            def do_GET(self):
+                with origin._lock:
+                    origin.requests += 1
+                time.sleep(origin.latency)
+                body = b"\xff" * origin.size
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def __enter__(self) -> "FakeHttpOrigin":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,258 @@
+# ---------------------------------------------------
+# File Name: harness.py
+# Description: Loads the real transfer pipeline against fake clients and measures it
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from types import ModuleType
+from typing import Awaitable, Callable, Dict, Optional
+
+import psutil
+
+from benchmarks.fakes import FakeHlsOrigin, FakeHttpOrigin, FakeNetwork, FakePyrogramClient, FakeTelethonClient, fake_devgagantools
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MB = 1024 * 1024
+
+@dataclass
+class Result:
+    name: str
+    bytes: int
+    seconds: float
+    throughput_mb_s: float
+    peak_rss_mb: float
+    rss_growth_mb: float
+    loop_lag_p50_ms: float
+    loop_lag_p99_ms: float
+    loop_lag_max_ms: float
+    requests: int
+
+class _OfflineMongo:
+    """pymongo.MongoClient that fails at once, so DatabaseManager runs cache-only"""
+    def __init__(self, *args, **kwargs):
+        raise ConnectionError("benchmarks run offline")
+
+class Bench:
+    """
+    Installs fakes for the `devgagan` package (clients) and `devgagantools`
+    before importing devgagan.core.get_func, so the code under test is the
+    real pipeline and only the network is simulated.
+    """
+    def __init__(self, workdir: str, network: FakeNetwork, corpus: Dict[int, int]):
+        self.workdir = workdir
+        self.network = network
+        self.corpus = corpus
+        self.app = FakePyrogramClient(network, corpus, name="bot")
+        self.userbot = FakePyrogramClient(network, corpus, name="userbot")
+        self.telethon = FakeTelethonClient(network, corpus)
+        self.get_func = self._install()
+
+    def _install(self) -> ModuleType:
+        os.environ.update({
+            "DOWNLOAD_DIR": os.path.join(self.workdir, "downloads"),
+            "METRICS_DIR": os.path.join(self.workdir, "metrics"),
+            "TRACE_LOG": os.path.join(self.workdir, "traces.jsonl"),
+        })
+        os.environ.pop("STRING", None)
+        sys.path.insert(0, REPO_ROOT)
+
+        package = ModuleType("devgagan")
+        package.__path__ = [os.path.join(REPO_ROOT, "devgagan")]
+        package.app = self.app
+        package.sex = package.telethon_client = self.telethon
+        package.pro = package.userrbot = None
+        package.botStartTime = time.time()
+        sys.modules["devgagan"] = package
+        sys.modules["devgagantools"] = fake_devgagantools(self.network)
+
+        import pymongo
+        pymongo.MongoClient = _OfflineMongo
+
+        import devgagan.core.get_func as get_func
+        from devgagan.core.transfers import transfer_scheduler
+        transfer_scheduler.tier_resolver = None  # Everyone is "free"; no Mongo plan lookups
+        return get_func
+
+    @property
+    def bot(self):
+        return self.get_func.bot
+
+    def make_file(self, name: str, size: int) -> str:
+        path = os.path.join(self.workdir, name)
+        with open(path, "wb") as f:
+            f.truncate(size)  # Sparse: cheap to create, read back as zeros
+        return path
+
+    async def measure(self, name: str, scenario: Callable[[], Awaitable[int]]) -> Result:
+        from devgagan.core.loopmon import LoopMonitor
+
+        process = psutil.Process()
+        baseline = process.memory_info().rss
+        peak = baseline
+        sampling = threading.Event()
+
+        def sample():
+            nonlocal peak
+            while not sampling.wait(0.01):
+                peak = max(peak, process.memory_info().rss)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        monitor = LoopMonitor(interval=0.005, threshold=5.0)
+        requests_before = self.network.requests
+
+        sampler.start()
+        monitor.start()
+        start = time.perf_counter()
+        try:
+            moved = await scenario()
+        finally:
+            seconds = time.perf_counter() - start
+            monitor.stop()
+            sampling.set()
+            sampler.join()
+
+        lag = monitor.stats()
+        return Result(
+            name=name,
+            bytes=moved,
+            seconds=round(seconds, 3),
+            throughput_mb_s=round(moved / MB / seconds, 2) if seconds else 0.0,
+            peak_rss_mb=round(peak / MB, 1),
+            rss_growth_mb=round((peak - baseline) / MB, 1),
+            loop_lag_p50_ms=round(lag["p50"] * 1000, 2),
+            loop_lag_p99_ms=round(lag["p99"] * 1000, 2),
+            loop_lag_max_ms=round(lag["max"] * 1000, 2),
+            requests=self.network.requests - requests_before,
+        )
+
+# ---------------- Scenarios ----------------
+
+async def scenario_download(bench: Bench, files: int, size: int) -> int:
+    """download_from_channel for `files` messages in parallel (one user each)"""
+    dest = os.path.join(bench.workdir, "dl")
+
+    async def one(index):
+        message_id = 1 + index
+        path, _ = await bench.bot.download_from_channel(-100123456, message_id, 10 + index, dest, client=bench.userbot)
+        os.remove(path)
+
+    for index in range(files):
+        bench.corpus[1 + index] = size
+    await asyncio.gather(*(one(index) for index in range(files)))
+    return files * size
+
+async def scenario_upload(bench: Bench, files: int, size: int) -> int:
+    """upload_with_pyrogram of `files` documents in parallel"""
+    paths = [bench.make_file(f"up_{index}.bin", size) for index in range(files)]
+    await asyncio.gather(*(
+        bench.bot.upload_with_pyrogram(path, 10 + index, 10 + index, "caption")
+        for index, path in enumerate(paths)
+    ))
+    for path in paths:
+        os.remove(path)
+    return files * size
+
+async def scenario_split(bench: Bench, size: int, part_size: int) -> int:
+    """split_large_file: read, write parts, upload parts concurrently"""
+    bench.bot.file_ops.config.PART_SIZE = part_size
+    path = bench.make_file("big.bin", size)
+    await bench.bot.file_ops.split_large_file(path, bench.app, 10, 10, "caption")
+    return size
+
+async def scenario_batch(bench: Bench, items: int, size: int) -> int:
+    """The /batch loop: prefetch chunks, then get_msg per usable message"""
+    first = 5000
+    for message_id in range(first, first + items):
+        bench.corpus[message_id] = size
+    message_ids = list(range(first, first + items))
+    link = "https://t.me/c/123456/{}"
+    async for _, messages in bench.bot.iter_batch_messages(bench.userbot, -100123456, message_ids):
+        for message in messages:
+            await bench.get_func.get_msg(bench.userbot, 10, 0, link.format(message.id), source_message=message)
+    return items * size
+
+async def scenario_hls(bench: Bench, segments: int, size: int, latency: float, rate: float,
+                       fragments: Optional[int] = None) -> int:
+    """yt-dlp (through YtdlpEngine) fetching an HLS stream from a local origin"""
+    from devgagan.core.ytdl_profiles import DownloadProfile, profile_for
+    from devgagan.core.ytdlp_engine import YtdlpEngine
+
+    with FakeHlsOrigin(segments, size, latency, rate) as origin:
+        # fragments=None: the profile /dl would pick for a premium user
+        profile = profile_for(origin.url, "premium") if fragments is None else DownloadProfile(concurrent_fragments=fragments)
+        opts = {"quiet": True, "noprogress": True, "fixup": "never", **profile.ydl_opts()}
+        engine = YtdlpEngine(workers=1)
+        try:
+            info = await engine.extract(0, origin.url, opts)
+            await engine.download(0, info, opts, os.path.join(bench.workdir, "hls.%(ext)s"))
+        finally:
+            engine.shutdown()
+    for name in os.listdir(bench.workdir):
+        if name.startswith("hls."):
+            os.remove(os.path.join(bench.workdir, name))
+    return origin.segment_size * segments
+
+async def scenario_http(bench: Bench, requests: int, size: int, latency: float, pooled: bool = True) -> int:
+    """Thumbnail-sized GETs, 16 at a time, through the shared HttpClient or a session per call"""
+    import aiohttp
+    from devgagan.core.http_client import HttpClient
+
+    client = HttpClient(per_host=8)
+    slots = asyncio.Semaphore(16)
+
+    async def fresh(url, path):
+        # What download_thumbnail / get_shortened_url used to do
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as response:
+                with open(path, "wb") as f:
+                    f.write(await response.read())
+
+    async def one(index):
+        path = os.path.join(bench.workdir, f"thumb_{index}.jpg")
+        async with slots:
+            if pooled:
+                if not await client.download(origin.url(index), path):
+                    raise RuntimeError(f"GET {origin.url(index)} failed")
+            else:
+                await fresh(origin.url(index), path)
+        os.remove(path)
+
+    with FakeHttpOrigin(size, latency, handshake=2 * latency) as origin:
+        try:
+            await asyncio.gather(*(one(index) for index in range(requests)))
+        finally:
+            await client.close()
+    print(f"   {requests} requests over {origin.connections} connections", file=sys.stderr)
+    if pooled and origin.connections > client.per_host:
+        raise RuntimeError(f"pool opened {origin.connections} connections, limit is {client.per_host}")
+    return requests * size
+
+SCENARIOS = {
+    "download": lambda bench, args: scenario_download(bench, args.files, args.size * MB),
+    "upload": lambda bench, args: scenario_upload(bench, args.files, args.size * MB),
+    "split": lambda bench, args: scenario_split(bench, args.split_size * MB, args.part_size * MB),
+    "batch": lambda bench, args: scenario_batch(bench, args.batch_items, args.batch_size * MB),
+    "hls": lambda bench, args: scenario_hls(
+        bench, args.hls_segments, args.size * MB, args.latency / 1000, args.origin_rate * MB
+    ),
+    # yt-dlp's default (one fragment at a time), for comparison in the same run
+    "hls_seq": lambda bench, args: scenario_hls(
+        bench, args.hls_segments, args.size * MB, args.latency / 1000, args.origin_rate * MB, fragments=1
+    ),
+    "http": lambda bench, args: scenario_http(bench, args.http_requests, args.http_size * 1024, args.latency / 1000),
+    # A new aiohttp session (DNS, TCP, TLS) per request, as before the shared client
+    "http_fresh": lambda bench, args: scenario_http(
+        bench, args.http_requests, args.http_size * 1024, args.latency / 1000, pooled=False
+    ),
+}
+
+def result_dict(result: Result) -> Dict:
+    return asdict(result)
@@ -30,3 +30,79 @@ INSTA_COOKIES = getenv("INSTA_COOKIES", INST_COOKIES)
 CHUNK_SIZE = 64 * 1024 * 1024  # 64MB chunks
 MAX_CONCURRENT = 2  # Parallel uploads
 PART_SIZE = 1.5 * 1024**3  # 1.5GB parts
+
+# ⚡ TRANSFER SCHEDULER (all users share these)
+MAX_TRANSFERS = int(getenv("MAX_TRANSFERS", "6"))  # Concurrent downloads/uploads on the box
+USER_MAX_TRANSFERS = int(getenv("USER_MAX_TRANSFERS", "2"))  # Per-user cap
+MAX_TRANSFER_RATE = int(getenv("MAX_TRANSFER_RATE", "0"))  # Bytes/s across all transfers, 0 = unlimited
+
+# ⚡ DISK ADMISSION CONTROL
+DOWNLOAD_DIR = getenv("DOWNLOAD_DIR", "./downloads")
+DISK_BUDGET = int(getenv("DISK_BUDGET", "0"))  # Bytes for in-flight jobs, 0 = free space at startup
+DISK_MIN_FREE = int(getenv("DISK_MIN_FREE", str(1024**3)))  # Never admit below 1GB free
+DISK_DEFAULT_RESERVE = int(getenv("DISK_DEFAULT_RESERVE", str(256 * 1024**2)))  # When size is unknown
+
+# ⚡ TEMP FILE JANITOR
+JANITOR_MAX_AGE = int(getenv("JANITOR_MAX_AGE", str(6 * 3600)))  # Orphans older than this are removed
+JANITOR_INTERVAL = int(getenv("JANITOR_INTERVAL", "900"))  # Seconds between sweeps
+
+# ⚡ METRICS (bot writes snapshots, Flask serves /metrics)
+METRICS_DIR = getenv("METRICS_DIR", "/tmp/devgagan_metrics")
+METRICS_INTERVAL = int(getenv("METRICS_INTERVAL", "15"))  # Seconds between snapshots
+
+# ⚡ EVENT LOOP MONITOR
+LOOP_LAG_INTERVAL = float(getenv("LOOP_LAG_INTERVAL", "0.1"))  # Heartbeat period in seconds
+LOOP_LAG_THRESHOLD = float(getenv("LOOP_LAG_THRESHOLD", "0.5"))  # Log the loop's stack past this stall
+
+# ⚡ CLIENT SUPERVISOR
+CLIENT_PING_INTERVAL = float(getenv("CLIENT_PING_INTERVAL", "30"))  # Seconds between health pings
+CLIENT_PING_TIMEOUT = float(getenv("CLIENT_PING_TIMEOUT", "10"))
+CLIENT_RECONNECT_MAX = float(getenv("CLIENT_RECONNECT_MAX", "300"))  # Backoff cap in seconds
+
+# ⚡ USERBOT POOL (per-user clients stay started between links)
+USERBOT_IDLE_TIMEOUT = float(getenv("USERBOT_IDLE_TIMEOUT", "600"))  # Stop after this many idle seconds
+USERBOT_MAX_OPEN = int(getenv("USERBOT_MAX_OPEN", "50"))
+PEER_FLUSH_INTERVAL = float(getenv("PEER_FLUSH_INTERVAL", "300"))  # Seconds between peer batches to Mongo
+
+# ⚡ SHARDING (a front process routes updates to worker processes by user)
+SHARDS = int(getenv("SHARDS", "1"))  # Worker processes; 1 = classic single process
+SHARD_INDEX = int(getenv("SHARD_INDEX", "-1"))  # Set by the front for each worker, -1 = not a worker
+SHARD_SOCKET = getenv("SHARD_SOCKET", "/tmp/devgagan_shards.sock")
+
+# ⚡ MEDIA WORKERS (probing, tagging and thumbnails run in worker processes)
+MEDIA_WORKERS = int(getenv("MEDIA_WORKERS", "0"))  # Processes, 0 = one per CPU
+
+# ⚡ YT-DLP ENGINE (/dl and /adl)
+YTDLP_WORKERS = int(getenv("YTDLP_WORKERS", "4"))  # Concurrent extractions/downloads, shared fairly between users
+YTDLP_STREAM_UPLOAD = getenv("YTDLP_STREAM_UPLOAD", "true").lower() == "true"  # Upload progressive videos while they download
+STREAM_UPLOAD_PARALLEL = int(getenv("STREAM_UPLOAD_PARALLEL", "4"))  # Parts in flight per streamed upload
+YTDL_CACHE_TTL = int(getenv("YTDL_CACHE_TTL", str(3 * 86400)))  # Re-send uploaded results for this long, 0 = off
+YTDL_PROGRESS_INTERVAL = float(getenv("YTDL_PROGRESS_INTERVAL", "5"))  # Seconds between progress message edits
+
+# ⚡ YT-DLP DOWNLOAD PROFILES (per plan tier; site rules and YTDL_PROFILES refine them)
+YTDL_FRAGMENTS_FREE = int(getenv("YTDL_FRAGMENTS_FREE", "4"))  # DASH/HLS fragments fetched in parallel
+YTDL_FRAGMENTS_PREMIUM = int(getenv("YTDL_FRAGMENTS_PREMIUM", "16"))
+YTDL_CHUNK_SIZE = int(getenv("YTDL_CHUNK_SIZE", str(10 * 1024**2)))  # Ranged HTTP requests (avoids YouTube throttling), 0 = off
+YTDL_RATE_LIMIT_FREE = int(getenv("YTDL_RATE_LIMIT_FREE", "0"))  # Bytes/s per free download, 0 = unlimited
+YTDL_EXTERNAL_DOWNLOADER = getenv("YTDL_EXTERNAL_DOWNLOADER", "")  # e.g. aria2c for segmented HTTP, used if installed
+YTDL_PROFILES = getenv("YTDL_PROFILES", "")  # JSON, e.g. {"instagram:*": {"concurrent_fragments": 1}, "*:free": {"rate_limit": 2000000}}
+
+# ⚡ OUTBOUND HTTP (thumbnails, URL shortener; one pooled session per process)
+HTTP_POOL_SIZE = int(getenv("HTTP_POOL_SIZE", "100"))  # Open connections in total
+HTTP_PER_HOST = int(getenv("HTTP_PER_HOST", "8"))  # Open connections per host
+HTTP_TIMEOUT = float(getenv("HTTP_TIMEOUT", "30"))  # Seconds per request, connect included
+HTTP_DNS_TTL = int(getenv("HTTP_DNS_TTL", "300"))  # Seconds to cache DNS answers
+
+# ⚡ TOKEN POOL (/token answers from links shortened ahead of time)
+TOKEN_POOL_SIZE = int(getenv("TOKEN_POOL_SIZE", "50"))  # Links kept ready, 0 = shorten per /token
+TOKEN_POOL_TTL = int(getenv("TOKEN_POOL_TTL", str(24 * 3600)))  # Seconds a link stays in the pool
+TOKEN_VERIFY_TTL = int(getenv("TOKEN_VERIFY_TTL", str(3 * 3600)))  # Seconds a user has to open the link /token gave them
+
+# ⚡ JOB TRACING
+TRACE_LOG = getenv("TRACE_LOG", "./logs/traces.jsonl")
+TRACE_MAX_BYTES = int(getenv("TRACE_MAX_BYTES", str(10 * 1024**2)))  # Rotate after 10MB
+TRACE_BACKUPS = int(getenv("TRACE_BACKUPS", "3"))
+
+# ⚡ MEMORY BUDGET (large splits stream from disk instead of buffering past this)
+MEMORY_BUDGET = int(getenv("MEMORY_BUDGET", "0"))  # Bytes of RSS, 0 = 80% of the cgroup/RAM limit
+MEMORY_PROFILE = getenv("MEMORY_PROFILE", "false").lower() == "true"  # tracemalloc + RSS report for every job
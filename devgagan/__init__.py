@@ -3,8 +3,8 @@ import asyncio
 import logging
 import time
 from pyrogram import Client, enums
-from config import API_ID, API_HASH, BOT_TOKEN, STRING, MONGO_DB, DEFAULT_SESSION
-from telethon.sync import TelegramClient
+from config import API_ID, API_HASH, BOT_TOKEN, STRING, MONGO_DB, DEFAULT_SESSION, SHARDS, SHARD_INDEX
+from telethon import TelegramClient
 from motor.motor_asyncio import AsyncIOMotorClient
 
 logging.basicConfig(
@@ -14,18 +14,25 @@ logging.basicConfig(
 
 botStartTime = time.time()
 
+# Sharded workers get their own session files and leave updates to the front
+WORKER = SHARD_INDEX >= 0
+FRONT = SHARDS > 1 and not WORKER
+SESSION_SUFFIX = f"_shard{SHARD_INDEX}" if WORKER else ""
+
 # Pyrogram Bot
 app = Client(
-    "pyrobot",
+    f"pyrobot{SESSION_SUFFIX}",
     api_id=API_ID,
     api_hash=API_HASH,
     bot_token=BOT_TOKEN,
     workers=100,  # ⚡ Max workers for speed
-    parse_mode=enums.ParseMode.MARKDOWN
+    parse_mode=enums.ParseMode.MARKDOWN,
+    no_updates=WORKER or None
 )
 
-# Telethon Client
-sex = TelegramClient('sexrepo', API_ID, API_HASH).start(bot_token=BOT_TOKEN)
+# Telethon Client (connected in start_bot, not at import). It only sends and uploads:
+# every command is a Pyrogram handler, so in sharded mode the front routes all of them
+sex = TelegramClient(f'sexrepo{SESSION_SUFFIX}', API_ID, API_HASH, receive_updates=not WORKER)
 
 # Premium Userbot
 pro = None
@@ -50,23 +57,43 @@ async def setup_database():
     except Exception as e:
         print(f"❌ DB Error: {e}")
 
-async def start_bot():
+async def _timed(timings, name, coro):
+    start = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[name] = time.perf_counter() - start
+
+async def _start_app():
     global BOT_ID, BOT_NAME, BOT_USERNAME
-    await setup_database()
     await app.start()
     getme = await app.get_me()
     BOT_ID = getme.id
     BOT_USERNAME = getme.username
     BOT_NAME = f"{getme.first_name} {getme.last_name}" if getme.last_name else getme.first_name
+
+async def start_bot():
+    """Connect every client concurrently; returns {phase: seconds} for the startup table"""
+    from devgagan.core.supervisor import supervisor
     
-    if pro:
-        await pro.start()
-        print("✅ Premium userbot started")
-    if userrbot:
-        await userrbot.start()
-        print("✅ Default userbot started")
+    # Only the bot itself is required; the rest come up later via the supervisor.
+    # The sharding front only receives updates, so it needs nothing else.
+    supervisor.register("pyrogram bot", app, _start_app, required=True)
+    if not FRONT:
+        supervisor.register("telethon bot", sex, lambda: sex.start(bot_token=BOT_TOKEN), kind="telethon")
+        if pro:
+            supervisor.register("premium userbot", pro, pro.start)
+        if userrbot:
+            supervisor.register("default userbot", userrbot, userrbot.start)
     
+    timings = {}
+    client_timings, _ = await asyncio.gather(
+        supervisor.start_all(),
+        _timed(timings, "mongo indexes", setup_database()),
+    )
+    timings.update(client_timings)
+    
+    for name, data in supervisor.stats().items():
+        print(f"{'✅' if data['available'] else '❌'} {name}" + (f": {data['last_error']}" if data['last_error'] else ""))
     print(f"🚀 Bot @{BOT_USERNAME} started successfully!")
-
-loop = asyncio.get_event_loop()
-loop.run_until_complete(start_bot())
+    return timings
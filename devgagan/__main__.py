@@ -10,9 +10,23 @@ import asyncio
 import importlib
 import logging
 import sys
+import time
 from pyrogram import idle
+from pyrogram.handlers import RawUpdateHandler
+from devgagan import app, botStartTime, start_bot, FRONT, WORKER
 from devgagan.modules import ALL_MODULES
 from devgagan.core.mongo.plans_db import check_and_remove_expired_users
+from devgagan.core.workdir import janitor
+from devgagan.core.metrics import MetricsExporter
+from devgagan.core.loopmon import loop_monitor
+from devgagan.core.supervisor import supervisor
+from devgagan.core.userbot_pool import userbot_pool
+from devgagan.core.media_pool import media_pool
+from devgagan.core.ytdlp_engine import ytdlp_engine
+from devgagan.core.http_client import http_client
+from devgagan.core.token_pool import token_pool
+from devgagan.core.sharding import ShardWorker, apply_worker_share, router
+from config import SHARD_INDEX, SHARDS
 from aiojobs import create_scheduler
 
 # Configure logging
@@ -44,6 +58,11 @@ async def load_modules():
     
     return loaded, failed
 
+def log_startup_timings(timings):
+    """Per-phase startup table; phases that ran concurrently overlap"""
+    rows = "\n".join(f"  {name:<18} {seconds:>7.2f}s" for name, seconds in timings.items())
+    logger.info(f"⏱️ Startup phases:\n{rows}\n  {'ready after':<18} {time.time() - botStartTime:>7.2f}s")
+
 async def schedule_expiry_check():
     """Remove expired premium users every hour"""
     global scheduler
@@ -71,12 +90,69 @@ async def schedule_expiry_check():
             await scheduler.close()
             logger.info("🔒 Scheduler closed")
 
+async def front_boot():
+    """Sharded mode front: receive updates and hand each to its user's worker"""
+    logger.info(f"🔀 Starting sharding front for {SHARDS} workers...")
+    loop_monitor.start()
+    
+    # Janitor's startup sweep runs here only: in a worker it would delete its siblings' jobs
+    timings = {}
+    start = time.perf_counter()
+    client_timings, _ = await asyncio.gather(start_bot(), janitor.startup())
+    timings.update(client_timings)
+    timings["connect + janitor"] = time.perf_counter() - start
+    log_startup_timings(timings)
+    
+    # Workers parse updates; the front forwards them raw (no parsing, no extra API calls)
+    app.dispatcher.update_parsers = {}
+    app.add_handler(RawUpdateHandler(router.route))
+    
+    asyncio.create_task(schedule_expiry_check())
+    asyncio.create_task(janitor.run())
+    asyncio.create_task(MetricsExporter(name="front").run())
+    asyncio.create_task(supervisor.run())
+    asyncio.create_task(router.run())
+    logger.info("✅ Front deployed! Press Ctrl+C to stop")
+    
+    try:
+        await idle()
+    except KeyboardInterrupt:
+        logger.info("🛑 Shutdown signal received")
+    finally:
+        await router.stop()
+        logger.info("🔴 Front stopped")
+
 async def devggn_boot():
     """Main bot initialization"""
-    logger.info("🚀 Starting bot initialization...")
+    if FRONT:
+        return await front_boot()
+    logger.info(f"🚀 Starting shard {SHARD_INDEX}..." if WORKER else "🚀 Starting bot initialization...")
+    
+    # Fork the media workers first, while the process is still small and
+    # single-threaded: a fork with live threads (the loop monitor's watchdog,
+    # executor threads) can leave a lock held forever in the child
+    if WORKER:
+        apply_worker_share()
+    media_pool.start()
+    
+    # Watch for blocking calls from here on (module loading included)
+    loop_monitor.start()
+    
+    # Connect clients and reclaim disk left by the previous process concurrently
+    timings = {}
+    start = time.perf_counter()
+    if WORKER:
+        timings.update(await start_bot())
+    else:
+        client_timings, _ = await asyncio.gather(start_bot(), janitor.startup())
+        timings.update(client_timings)
+    timings["connect + janitor"] = time.perf_counter() - start
     
     # Load all modules
+    start = time.perf_counter()
     loaded, failed = await load_modules()
+    timings["load modules"] = time.perf_counter() - start
+    log_startup_timings(timings)
     
     # Startup banner
     banner = f"""
@@ -92,16 +168,30 @@ async def devggn_boot():
 """
     print(banner)
     
-    # Start background tasks
-    asyncio.create_task(schedule_expiry_check())
+    # Start background tasks (the front owns the process-wide ones in sharded mode)
+    if not WORKER:
+        asyncio.create_task(schedule_expiry_check())
+        asyncio.create_task(janitor.run())
+    asyncio.create_task(MetricsExporter(name=f"shard{SHARD_INDEX}" if WORKER else "bot").run())
+    asyncio.create_task(supervisor.run())
+    asyncio.create_task(userbot_pool.run())
+    if not WORKER or SHARD_INDEX == 0:
+        asyncio.create_task(token_pool.run(app))  # Shared pool in Mongo: one refiller is enough
     logger.info("✅ Bot deployed successfully! Press Ctrl+C to stop")
     
     # Keep bot alive
     try:
-        await idle()
+        if WORKER:
+            await ShardWorker().run(app)  # Until the front goes away
+        else:
+            await idle()
     except KeyboardInterrupt:
         logger.info("🛑 Shutdown signal received")
     finally:
+        await userbot_pool.shutdown()
+        media_pool.shutdown()
+        ytdlp_engine.shutdown()
+        await http_client.close()
         logger.info("🔴 Bot stopped")
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+# ---------------------------------------------------
+# File Name: caption.py
+# Description: Markdown caption conversion for the Telethon upload path
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import re
+import html
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from telethon.tl.types import (
+    MessageEntityBold, MessageEntityItalic, MessageEntityUnderline,
+    MessageEntityStrike, MessageEntitySpoiler, MessageEntityCode,
+    MessageEntityPre, MessageEntityTextUrl
+)
+
+# Same delimiters Pyrogram's markdown parser understands
+_TOKEN_RE = re.compile(
+    r"```(?:(?P<lang>[\w+-]+)\n)?(?P<pre>.*?)```"
+    r"|`(?P<code>[^`\n]+)`"
+    r"|\[(?P<label>[^\]\n]+)\]\((?P<url>[^)\s]+)\)"
+    r"|(?P<delim>\*\*|__|--|~~|\|\|)",
+    re.DOTALL,
+)
+
+_DELIMITERS = {
+    "**": (MessageEntityBold, "b"),
+    "__": (MessageEntityItalic, "i"),
+    "--": (MessageEntityUnderline, "u"),
+    "~~": (MessageEntityStrike, "s"),
+    "||": (MessageEntitySpoiler, "tg-spoiler"),
+}
+
+def _utf16_len(text: str) -> int:
+    """Telegram entity offsets are counted in UTF-16 code units"""
+    return len(text.encode("utf-16-le")) // 2
+
+@dataclass(frozen=True)
+class FormattedCaption:
+    """Caption parsed once into plain text, entities and HTML"""
+    text: str
+    entities: Tuple
+    html: str
+
+class CaptionFormatter:
+    """Markdown -> Telethon entities/HTML with an LRU of recent captions"""
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[str, FormattedCaption]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def format(self, caption: Optional[str]) -> FormattedCaption:
+        """Parse caption, reusing the cached result for repeated captions"""
+        caption = caption or ""
+        cached = self._cache.get(caption)
+        if cached is not None:
+            self._cache.move_to_end(caption)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        result = self._parse(caption)
+        self._cache[caption] = result
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return result
+
+    async def markdown_to_html(self, caption: Optional[str]) -> str:
+        """Backward compatible HTML conversion"""
+        return self.format(caption).html
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _pair_delimiters(tokens: List[re.Match]) -> Dict[int, int]:
+        """Match opening/closing delimiters; unmatched or empty ones stay literal"""
+        pairs: Dict[int, int] = {}
+        stack: List[int] = []
+        for index, match in enumerate(tokens):
+            delim = match.group("delim")
+            if not delim:
+                continue
+            opener = next((i for i in reversed(range(len(stack))) if tokens[stack[i]].group("delim") == delim), None)
+            if opener is None:
+                stack.append(index)
+                continue
+            start = stack[opener]
+            del stack[opener:]
+            if tokens[start].end() == match.start():
+                continue  # "----" and friends are text, not empty entities
+            pairs[start] = index
+        return pairs
+
+    def _parse(self, caption: str) -> FormattedCaption:
+        tokens = list(_TOKEN_RE.finditer(caption))
+        pairs = self._pair_delimiters(tokens)
+        closers = {close: start for start, close in pairs.items()}
+
+        text_parts: List[str] = []
+        html_parts: List[str] = []
+        entities: List = []
+        open_offsets: Dict[int, int] = {}
+        offset = 0
+        pos = 0
+
+        def add_text(chunk: str):
+            nonlocal offset
+            if chunk:
+                text_parts.append(chunk)
+                html_parts.append(html.escape(chunk, quote=False))
+                offset += _utf16_len(chunk)
+
+        for index, match in enumerate(tokens):
+            add_text(caption[pos:match.start()])
+            pos = match.end()
+            delim = match.group("delim")
+
+            if delim:
+                entity_cls, tag = _DELIMITERS[delim]
+                if index in pairs:
+                    open_offsets[index] = offset
+                    html_parts.append(f"<{tag}>")
+                elif index in closers:
+                    start = open_offsets.pop(closers[index])
+                    entities.append(entity_cls(start, offset - start))
+                    html_parts.append(f"</{tag}>")
+                else:
+                    add_text(delim)
+                continue
+
+            start = offset
+            if match.group("code") is not None:
+                body = match.group("code")
+                text_parts.append(body)
+                html_parts.append(f"<code>{html.escape(body, quote=False)}</code>")
+                offset += _utf16_len(body)
+                entities.append(MessageEntityCode(start, offset - start))
+            elif match.group("label") is not None:
+                label, url = match.group("label"), match.group("url")
+                text_parts.append(label)
+                html_parts.append(f'<a href="{html.escape(url)}">{html.escape(label, quote=False)}</a>')
+                offset += _utf16_len(label)
+                entities.append(MessageEntityTextUrl(start, offset - start, url))
+            else:
+                body, lang = match.group("pre"), match.group("lang") or ""
+                text_parts.append(body)
+                lang_attr = f' class="language-{html.escape(lang)}"' if lang else ""
+                html_parts.append(f"<pre><code{lang_attr}>{html.escape(body, quote=False)}</code></pre>")
+                offset += _utf16_len(body)
+                entities.append(MessageEntityPre(start, offset - start, lang))
+
+        add_text(caption[pos:])
+        entities = [e for e in entities if e.length > 0]
+        entities.sort(key=lambda e: e.offset)
+        return FormattedCaption("".join(text_parts), tuple(entities), "".join(html_parts))
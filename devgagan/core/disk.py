@@ -0,0 +1,142 @@
+# ---------------------------------------------------
+# File Name: disk.py
+# Description: Disk-space admission control for downloads
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import os
+import shutil
+from typing import Dict, Optional, Set
+
+from config import DOWNLOAD_DIR, DISK_BUDGET, DISK_MIN_FREE
+from devgagan.core.metrics import registry
+
+class DiskBudgetExceeded(Exception):
+    """The job alone needs more than the whole disk budget"""
+
+class DiskHold:
+    """Space reserved by one job; grows as sizes become known, released once"""
+    def __init__(self, budget: "DiskBudget", owner=None):
+        self.budget = budget
+        self.owner = owner
+        self.size = 0
+
+    async def reserve(self, nbytes: int):
+        """
+        Wait until nbytes fit in the budget, then add them to this hold.
+        Reserve everything a job needs in one call: growing a hold that is
+        already holding space can wait on jobs that are waiting on it.
+        """
+        if nbytes and nbytes > 0:
+            await self.budget._admit(self, int(nbytes))
+
+    def release(self):
+        self.budget._release(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+class DiskBudget:
+    """
+    Reservations are checked against a fixed byte budget rather than live
+    free space: a file that is already on disk has lowered free space *and*
+    still holds its reservation, so comparing the two would count it twice.
+    Live free space is only used as a floor (DISK_MIN_FREE) so that
+    something else filling the disk pauses new jobs while others run.
+    """
+    def __init__(self, path: str = DOWNLOAD_DIR, budget: int = 0, min_free: int = 0, recheck: float = 5.0):
+        self.path = path
+        self.min_free = min_free
+        self.recheck = recheck
+        self._budget = budget
+        self._holds: Set[DiskHold] = set()
+        self._reserved = 0
+        self._waiting = 0
+        self._changed: Optional[asyncio.Condition] = None
+
+    @property
+    def budget(self) -> int:
+        if not self._budget:
+            # Derived once: whatever is free now, minus the floor
+            self._budget = max(self.free_space() - self.min_free, 0)
+        return self._budget
+
+    def free_space(self) -> int:
+        os.makedirs(self.path, exist_ok=True)
+        return shutil.disk_usage(self.path).free
+
+    def hold(self, owner=None) -> DiskHold:
+        return DiskHold(self, owner)
+
+    def can_admit(self, nbytes: int, hold: Optional[DiskHold] = None) -> bool:
+        """Would a reservation of nbytes (on top of `hold`) be admitted right now"""
+        return (hold.size if hold else 0) + nbytes <= self.budget and self._fits(nbytes)
+
+    def _fits(self, nbytes: int) -> bool:
+        if self._reserved + nbytes > self.budget:
+            return False
+        return self.free_space() - nbytes >= self.min_free or not self._reserved
+
+    async def _admit(self, hold: DiskHold, nbytes: int):
+        # Against the hold's total: its own space never frees up while it waits
+        if hold.size + nbytes > self.budget:
+            raise DiskBudgetExceeded(
+                f"Needs {(hold.size + nbytes) / 1024**3:.2f} GB, disk budget is {self.budget / 1024**3:.2f} GB"
+            )
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+
+        async with self._changed:
+            self._waiting += 1
+            try:
+                while not self._fits(nbytes):
+                    try:
+                        # Released reservations notify; the timeout catches external deletes
+                        await asyncio.wait_for(self._changed.wait(), self.recheck)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._waiting -= 1
+            self._reserved += nbytes
+            hold.size += nbytes
+            self._holds.add(hold)
+
+    def _release(self, hold: DiskHold):
+        if hold not in self._holds:
+            return
+        self._holds.discard(hold)
+        self._reserved -= hold.size
+        hold.size = 0
+        if self._changed is not None:
+            asyncio.ensure_future(self._notify())
+
+    async def _notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "budget": self.budget,
+            "reserved": self._reserved,
+            "jobs": len(self._holds),
+            "waiting": self._waiting,
+            "free": self.free_space(),
+        }
+
+# One budget for everything written under DOWNLOAD_DIR / the CWD
+disk_budget = DiskBudget(DOWNLOAD_DIR, DISK_BUDGET, DISK_MIN_FREE)
+
+_DISK = registry.gauge("devgagan_disk_bytes", "Disk budget, reservations and free space", ("kind",))
+
+def _collect():
+    stats = disk_budget.stats()
+    for kind in ("budget", "reserved", "free"):
+        _DISK.set(stats[kind], kind=kind)
+
+registry.add_collector(_collect)
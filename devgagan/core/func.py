@@ -2,7 +2,6 @@
 import math
 import time
 import re
-import cv2
 import asyncio
 import subprocess
 import os
@@ -27,6 +26,13 @@ async def chk_user(message, user_id):
         return 0
     return 1
 
+async def get_user_tier(user_id):
+    """Plan tier used for transfer scheduling: owner, premium or free"""
+    if user_id in OWNER_ID:
+        return "owner"
+    from devgagan.core.mongo.plans_db import check_premium
+    return "premium" if await check_premium(user_id) else "free"
+
 async def gen_link(app, chat_id):
     try:
         link = await app.export_chat_invite_link(chat_id)
@@ -114,6 +120,7 @@ def get_link(string):
 def video_metadata(file):
     default = {'width': 1280, 'height': 720, 'duration': 1}
     try:
+        import cv2  # Deferred: ~100ms of import that only video uploads need
         vcap = cv2.VideoCapture(file)
         if not vcap.isOpened():
             return default
@@ -141,7 +148,7 @@ async def screenshot(video, duration, sender):
     if os.path.exists(f'{sender}.jpg'):
         return f'{sender}.jpg'
     time_stamp = convert(int(duration)//2)
-    out = f"thumb_{sender}_{int(time.time())}.jpg"
+    out = os.path.join(os.path.dirname(video), f"thumb_{sender}_{int(time.time())}.jpg")
     cmd = [
         "ffmpeg", "-ss", time_stamp, "-i", video,
         "-frames:v", "1", "-q:v", "2", out, "-y"
@@ -181,7 +188,7 @@ async def progress_bar(current, total, ud_type, message, start):
             humanbytes(speed),
             estimated_total_time if estimated_total_time != '' else "0 s"
         )
-        try
+        try:
             await message.edit(text=f"{ud_type}\n{tmp}")
         except:
             pass
@@ -255,7 +262,7 @@ async def screenshot(video, duration, sender):
     if os.path.exists(f'{sender}.jpg'):
         return f'{sender}.jpg'
     time_stamp = convert(int(duration)//2)
-    out = f"thumb_{sender}_{int(time.time())}.jpg"
+    out = os.path.join(os.path.dirname(video), f"thumb_{sender}_{int(time.time())}.jpg")
     cmd = [
         "ffmpeg", "-ss", time_stamp, "-i", video,
         "-frames:v", "1", "-q:v", "2", out, "-y"
@@ -2,15 +2,14 @@ import asyncio
 import os
 import re
 import time
-import gc
 from typing import Dict, Set, Optional, Union, Any, Tuple, List
 from pathlib import Path
 from functools import lru_cache, wraps
 from collections import defaultdict
 from dataclasses import dataclass, field
 from contextlib import asynccontextmanager
-import aiofiles
 import pymongo
+from pyrogram import filters
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message
 from pyrogram.errors import (
     ChannelBanned, ChannelInvalid, ChannelPrivate, ChatIdInvalid, 
@@ -27,8 +26,19 @@ from telethon.errors import (
 from devgagan import app, sex as gf
 from devgagan.core.func import *
 from devgagan.core.mongo import db as odb
+from devgagan.core.caption import CaptionFormatter
+from devgagan.core.pacer import pacer
+from devgagan.core.transfers import transfer_scheduler
+from devgagan.core.disk import DiskBudgetExceeded, disk_budget
+from devgagan.core.workdir import workdir
+from devgagan.core.metrics import registry, MONGO_SECONDS, export_cache, timed_job
+from devgagan.core.tracing import tracer
+from devgagan.core.supervisor import supervisor
+from devgagan.core.memory import memory_guard
+from devgagan.core.media_pool import media_pool
+from devgagan.core.peer_cache import PeerCache, PeerResolutionError, ResolvedPeer, resolve_with_pyrogram
 from devgagantools import fast_upload, fast_download
-from config import MONGO_DB as MONGODB_CONNECTION_STRING, LOG_GROUP, OWNER_ID, STRING, API_ID, API_HASH
+from config import MONGO_DB as MONGODB_CONNECTION_STRING, LOG_GROUP, OWNER_ID, STRING, API_ID, API_HASH, DOWNLOAD_DIR
 
 # Import pro userbot if STRING is available
 if STRING:
@@ -69,6 +79,18 @@ class BotConfig:
     # ⚡ BUFFER SIZES (Increase for speed)
     FILE_READ_BUFFER: int = 64 * 1024 * 1024  # 64MB read buffer
     NETWORK_BUFFER: int = 256 * 1024  # 256KB network buffer
+    STREAM_BLOCK: int = 8 * 1024 * 1024  # Block size when streaming parts from disk
+    
+    # ⚡ CAPTION CACHE (batches repeat the same caption suffix)
+    CAPTION_CACHE_SIZE: int = 1024
+    
+    # ⚡ PEER CACHE (one resolution per channel, not per link)
+    PEER_CACHE_SIZE: int = 2048
+    PEER_CACHE_TTL: int = 6 * 3600  # Access hashes are stable, usernames may move
+    PEER_NEGATIVE_TTL: int = 60  # Don't hammer unresolvable chats
+    
+    # ⚡ BATCH PREFETCH (get_messages accepts up to 200 ids per call)
+    PREFETCH_CHUNK: int = 200
 
 class UserProgress:
     previous_done: int = 0
@@ -77,27 +99,31 @@ class UserProgress:
 class DatabaseManager:
     """Enhanced database operations with error handling and caching"""
     def __init__(self, connection_string: str, db_name: str, collection_name: str):
+        self.hits = self.misses = 0
         try:
+            # No server_info() ping: it blocked module loading on a network round
+            # trip. pymongo connects in the background; failed ops fall back to defaults.
             self.client = pymongo.MongoClient(connection_string, serverSelectionTimeoutMS=5000)
-            self.client.server_info()  # Test connection
             self.collection = self.client[db_name][collection_name]
             self._cache = {}
-            print("✅ MongoDB connected successfully")
         except Exception as e:
             print(f"❌ MongoDB connection failed: {e}")
             self.collection = None
             self._cache = {}
     
     def get_user_data(self, user_id: int, key: str, default=None) -> Any:
-        if not self.collection:
+        if self.collection is None:
             return default
         
         cache_key = f"{user_id}:{key}"
         if cache_key in self._cache:
+            self.hits += 1
             return self._cache[cache_key]
         
+        self.misses += 1
         try:
-            doc = self.collection.find_one({"_id": user_id})
+            with MONGO_SECONDS.time(op="find_one"):
+                doc = self.collection.find_one({"_id": user_id})
             value = doc.get(key, default) if doc else default
             self._cache[cache_key] = value
             return value
@@ -106,16 +132,17 @@ class DatabaseManager:
             return default
     
     def save_user_data(self, user_id: int, key: str, value: Any) -> bool:
-        if not self.collection:
+        if self.collection is None:
             return False
         
         cache_key = f"{user_id}:{key}"
         try:
-            self.collection.update_one(
-                {"_id": user_id}, 
-                {"$set": {key: value}}, 
-                upsert=True
-            )
+            with MONGO_SECONDS.time(op="update_one"):
+                self.collection.update_one(
+                    {"_id": user_id}, 
+                    {"$set": {key: value}}, 
+                    upsert=True
+                )
             self._cache[cache_key] = value
             return True
         except Exception as e:
@@ -193,6 +220,13 @@ class MediaProcessor:
         elif msg.sticker:
             return "sticker.webp", getattr(msg.sticker, 'file_size', 1), "sticker"
         return "unknown", 1, "document"
+    
+    @staticmethod
+    def has_downloadable_media(msg) -> bool:
+        """Skip empty/deleted, service and text-only messages"""
+        if not msg or getattr(msg, "empty", False) or getattr(msg, "service", None):
+            return False
+        return bool(msg.video or msg.document or msg.photo or msg.audio)
 
 class ProgressManager:
     """Enhanced progress tracking with better formatting"""
@@ -315,55 +349,28 @@ class FileOperations:
             f"🔄 Starting upload..."
         )
 
-        part_number = 0
-        base_path = Path(file_path)
-        upload_tasks = []  # ⚡ For concurrent uploads
+        ticket = await transfer_scheduler.acquire(sender, "upload", file_size)
         
         try:
-            # ⚡ READ FILE ONCE, KEEP IN MEMORY (if RAM allows)
-            # For 4GB file on 8GB+ RAM server, this is FASTER
-            with open(file_path, 'rb') as f:
-                file_data = f.read()  # ⚡ LOAD ENTIRE FILE TO RAM FOR SPEED
-            
-            for i in range(0, len(file_data), self.config.PART_SIZE):
-                chunk = file_data[i:i + self.config.PART_SIZE]
-                if not chunk:
-                    break
-
-                part_file = f"{base_path.stem}.part{str(part_number).zfill(3)}{base_path.suffix}"
-                
-                # ⚡ DIRECT WRITE (no async for speed)
-                with open(part_file, 'wb') as pf:
-                    pf.write(chunk)
-
-                part_caption = f"{caption}\n\n**📦 Part {part_number + 1}/{total_parts}**" if caption else f"**📦 Part {part_number + 1}/{total_parts}**"
-                
-                # ⚡ CREATE UPLOAD TASK
-                task = self._upload_part_with_retry(
-                    app_client, sender, part_file, part_caption, 
-                    target_chat_id, topic_id, part_number + 1, total_parts
-                )
-                upload_tasks.append(task)
-                
-                part_number += 1
-                
-                # ⚡ CONTROL CONCURRENCY
-                if len(upload_tasks) >= self.config.MAX_CONCURRENT_PARTS:
-                    await asyncio.gather(*upload_tasks)
-                    upload_tasks = []
-                    gc.collect()
-            
-            # Wait for remaining tasks
-            if upload_tasks:
-                await asyncio.gather(*upload_tasks)
+            # ⚡ WHOLE FILE IN RAM only while it fits the memory budget
+            if memory_guard.can_buffer(file_size):
+                with memory_guard.buffer(file_size):
+                    file_data = await asyncio.to_thread(Path(file_path).read_bytes)
+                    await self._upload_parts(file_path, file_size, app_client, sender, target_chat_id, caption, topic_id, ticket, file_data)
+                    del file_data
+            else:
+                memory_guard.degrade(f"{os.path.basename(file_path)} ({file_size / 1024**3:.2f} GB) exceeds the memory budget")
+                await self._split_large_file_slow(file_path, app_client, sender, target_chat_id, caption, topic_id, ticket)
                 
         except MemoryError:
             print("❌ Not enough RAM for fast mode, falling back to slow mode")
-            await self._split_large_file_slow(file_path, app_client, sender, target_chat_id, caption, topic_id)
+            memory_guard.degrade("MemoryError while buffering")
+            await self._split_large_file_slow(file_path, app_client, sender, target_chat_id, caption, topic_id, ticket)
         except Exception as e:
             print(f"❌ Critical error during split upload: {e}")
             await app_client.send_message(sender, f"❌ Upload failed: {str(e)}")
         finally:
+            transfer_scheduler.release(ticket)
             # Cleanup original file
             await self._cleanup_file(file_path)
             try:
@@ -371,10 +378,72 @@ class FileOperations:
             except:
                 pass
     
-    async def _upload_part_with_retry(self, app_client, sender, part_file, caption, target_chat_id, topic_id, part_num, total_parts):
+    def _copy_range(self, src: str, dst: str, offset: int, length: int):
+        """Blocking: copy src[offset:offset+length] to dst in bounded blocks (run in a thread)"""
+        with open(src, "rb") as fin, open(dst, "wb") as fout:
+            try:
+                # Kernel-side copy, nothing passes through our memory
+                while length > 0:
+                    copied = os.copy_file_range(fin.fileno(), fout.fileno(), length, offset)
+                    if not copied:
+                        break
+                    offset += copied
+                    length -= copied
+            except (AttributeError, OSError):
+                fin.seek(offset)
+                while length > 0:
+                    block = fin.read(min(self.config.STREAM_BLOCK, length))
+                    if not block:
+                        break
+                    fout.write(block)
+                    length -= len(block)
+    
+    @staticmethod
+    def _write_part(dst: str, data: memoryview):
+        with open(dst, "wb") as fout:
+            fout.write(data)
+    
+    async def _upload_parts(self, file_path: str, file_size: int, app_client, sender: int, target_chat_id: int, caption: str,
+                            topic_id: Optional[int], ticket, file_data: Optional[bytes] = None):
+        """Write each part (from the RAM copy, or streamed from disk) and upload them in groups"""
+        part_size = self.config.PART_SIZE
+        total_parts = (file_size + part_size - 1) // part_size
+        base_path = Path(file_path)
+        upload_tasks = []  # ⚡ For concurrent uploads
+        
+        for part_number in range(total_parts):
+            offset = part_number * part_size
+            length = min(part_size, file_size - offset)
+            part_file = str(base_path.with_name(f"{base_path.stem}.part{str(part_number).zfill(3)}{base_path.suffix}"))
+            
+            # ⚡ OFF THE EVENT LOOP (a 1.5GB write would stall every other transfer)
+            if file_data is not None:
+                await asyncio.to_thread(self._write_part, part_file, memoryview(file_data)[offset:offset + length])
+            else:
+                await asyncio.to_thread(self._copy_range, file_path, part_file, offset, length)
+
+            part_caption = f"{caption}\n\n**📦 Part {part_number + 1}/{total_parts}**" if caption else f"**📦 Part {part_number + 1}/{total_parts}**"
+            
+            # ⚡ CREATE UPLOAD TASK
+            upload_tasks.append(self._upload_part_with_retry(
+                app_client, sender, part_file, part_caption, 
+                target_chat_id, topic_id, part_number + 1, total_parts, ticket
+            ))
+            
+            # ⚡ CONTROL CONCURRENCY
+            if len(upload_tasks) >= self.config.MAX_CONCURRENT_PARTS:
+                await asyncio.gather(*upload_tasks)
+                upload_tasks = []
+        
+        # Wait for remaining tasks
+        if upload_tasks:
+            await asyncio.gather(*upload_tasks)
+    
+    async def _upload_part_with_retry(self, app_client, sender, part_file, caption, target_chat_id, topic_id, part_num, total_parts, ticket=None):
         """⚡ Upload single part with retry logic"""
         async with self._semaphore:  # ⚡ Limit concurrency
             for retry in range(self.config.MAX_RETRIES):
+                progress = ticket.wrap_progress(progress_bar) if ticket else progress_bar
                 try:
                     edit_msg = await app_client.send_message(
                         sender, 
@@ -386,7 +455,7 @@ class FileOperations:
                         document=part_file,
                         caption=caption,
                         reply_to_message_id=topic_id,
-                        progress=progress_bar,
+                        progress=progress,
                         progress_args=("╭──────────────╮\n│ **__FAST UPLOAD__**\n├────────", edit_msg, time.time())
                     )
                     
@@ -400,37 +469,30 @@ class FileOperations:
                     return True
                     
                 except FloodWait as e:
-                    wait_time = min(e.value, 60)  # ⚡ Max wait 60s
-                    await app_client.send_message(sender, f"⏳ FloodWait {wait_time}s for part {part_num}")
-                    await asyncio.sleep(wait_time)
+                    pacer.on_flood_error("send", e)
+                    if retry == self.config.MAX_RETRIES - 1:
+                        break
+                    await app_client.send_message(sender, f"⏳ FloodWait {e.value}s for part {part_num}")
+                    await pacer.wait("send", target_chat_id)
                     
                 except Exception as e:
                     print(f"❌ Part {part_num} failed (attempt {retry + 1}): {e}")
                     if retry == self.config.MAX_RETRIES - 1:
-                        await app_client.send_message(sender, f"❌ Part {part_num} failed after {self.config.MAX_RETRIES} tries")
-                        return False
+                        break
                     await asyncio.sleep(2 ** retry)  # ⚡ Exponential backoff
+            
+            # ❌ OUT OF RETRIES (whatever the last error was)
+            await app_client.send_message(sender, f"❌ Part {part_num} failed after {self.config.MAX_RETRIES} tries")
+            if os.path.exists(part_file):
+                os.remove(part_file)
+            return False
     
-    async def _split_large_file_slow(self, file_path: str, app_client, sender: int, target_chat_id: int, caption: str, topic_id: Optional[int] = None):
-        """⚡ SLOW MODE: For low RAM servers"""
+    async def _split_large_file_slow(self, file_path: str, app_client, sender: int, target_chat_id: int, caption: str, topic_id: Optional[int] = None, ticket=None):
+        """⚡ SLOW MODE: For low RAM servers - parts are streamed from disk, never buffered whole"""
         print("⚠️ Using slow mode (low RAM)")
-        
-        part_number = 0
-        base_path = Path(file_path)
-        
-        async with aiofiles.open(file_path, mode="rb") as f:
-            while True:
-                chunk = await f.read(self.config.PART_SIZE)
-                if not chunk:
-                    break
-
-                part_file = f"{base_path.stem}.part{str(part_number).zfill(3)}{base_path.suffix}"
-                
-                async with aiofiles.open(part_file, mode="wb") as part_f:
-                    await part_f.write(chunk)
-
-                part_caption = f"{caption}\n\n**📦 Part {part_number + 1}**"
-                await self._upload_part_with_retry(app_client, sender, part_file, part_caption, target_chat_id, topic_id, part_number + 1, 999)
+        file_size = os.path.getsize(file_path)
+        # Concurrent part uploads stay cheap here: Pyrogram reads each part in 512KB pieces
+        await self._upload_parts(file_path, file_size, app_client, sender, target_chat_id, caption, topic_id, ticket)
 
 class SmartTelegramBot:
     """Main bot class with all functionality"""
@@ -440,7 +502,10 @@ class SmartTelegramBot:
         self.media_processor = MediaProcessor(self.config)
         self.progress_manager = ProgressManager()
         self.file_ops = FileOperations(self.config, self.db)
-        self.caption_formatter = CaptionFormatter()
+        self.caption_formatter = CaptionFormatter(self.config.CAPTION_CACHE_SIZE)
+        self.peer_cache = PeerCache(
+            self.config.PEER_CACHE_SIZE, self.config.PEER_CACHE_TTL, self.config.PEER_NEGATIVE_TTL
+        )
         
         # User session management
         self.user_sessions: Dict[int, str] = {}
@@ -468,118 +533,199 @@ class SmartTelegramBot:
             return int(parts[0]), int(parts[1])
         return int(target), None
     
+    async def resolve_channel(self, channel_id: Union[str, int], client=None, namespace: str = "bot") -> ResolvedPeer:
+        """⚡ CACHED ENTITY RESOLUTION (one lookup per channel per TTL)"""
+        client = client or app
+        return await self.peer_cache.resolve(
+            namespace, channel_id, lambda ref: resolve_with_pyrogram(client, ref)
+        )
+
+    def disk_need(self, file_size: int) -> int:
+        """Disk a link needs: the file, plus its parts while a split upload runs"""
+        if file_size > self.config.SIZE_LIMIT:
+            return file_size + min(file_size, self.config.PART_SIZE * self.config.MAX_CONCURRENT_PARTS)
+        return file_size
+
     # ✅ MAXIMUM SPEED DOWNLOAD FUNCTION
     async def download_from_channel(
         self, 
         channel_id: Union[str, int], 
         message_id: int, 
         user_id: int,
-        download_path: str = "./downloads"
-    ) -> Optional[str]:
-        """
-        ⚡ MAX SPEED DOWNLOAD from both public and private channels
-        Uses parallel workers and optimized buffers
-        """
-        os.makedirs(download_path, exist_ok=True)
-        
-        # ⚡ CACHED ENTITY RESOLUTION
-        entity = None
-        cache_key = f"entity_{channel_id}"
-        
-        # ✅ MAXIMUM SPEED DOWNLOAD FUNCTION
-    async def download_from_channel(
-        self, 
-        channel_id: Union[str, int], 
-        message_id: int, 
-        user_id: int,
-        download_path: str = "./downloads"
-    ) -> Optional[str]:
+        download_path: str = DOWNLOAD_DIR,
+        client=None,
+        namespace: Optional[str] = None,
+        source_message=None,
+        disk_hold=None
+    ) -> Optional[Tuple[str, Any]]:
         """
         ⚡ MAX SPEED DOWNLOAD from both public and private channels
-        Uses parallel workers and optimized buffers
+        Returns (file_path, source_message) so callers reuse the message for the caption
         """
         os.makedirs(download_path, exist_ok=True)
         
-        # ⚡ CACHED ENTITY RESOLUTION
-        entity = None
-        cache_key = f"entity_{channel_id}"
-        
-        # Method 1: Try Pyrogram (FASTEST)
-        try:
-            if isinstance(channel_id, str) and channel_id.startswith('@'):
-                entity = await app.get_chat(channel_id)
-            elif str(channel_id).startswith('-100'):
-                entity = await app.get_chat(int(channel_id))
-        except Exception as e:
-            print(f"⚠️ Pyrogram entity resolution failed: {e}")
-        
-        # Method 2: Telethon fallback
-        if not entity and self.pro_client:
-            try:
-                entity = await self.pro_client.get_entity(channel_id)
-            except Exception as e:
-                print(f"⚠️ Telethon entity resolution failed: {e}")
-        
-        if not entity:
-            await app.send_message(user_id, f"❌ Cannot access channel: {channel_id}")
+        # Method 1: caller's client (userbot) or the bot itself
+        # Method 2: premium userbot fallback
+        # Peer namespace = account: userbots are keyed by their session name
+        candidates = [(client, namespace or getattr(client, "name", str(id(client))))] if client else [(app, "bot")]
+        if not client and self.pro_client:
+            candidates.append((self.pro_client, "pro"))
+        # ⚡ Skip clients the supervisor has marked down instead of timing out on them
+        candidates = [c for c in candidates if supervisor.is_available(c[0])]
+        if not candidates:
+            await app.send_message(user_id, "⏳ Telegram connection is being restored, try again shortly.")
             return None
         
+        peer, client, namespace = None, None, None
+        if source_message is None:
+            for candidate, candidate_ns in candidates:
+                try:
+                    async with tracer.span("resolve", namespace=candidate_ns):
+                        peer = await self.resolve_channel(channel_id, candidate, candidate_ns)
+                    client, namespace = candidate, candidate_ns
+                    break
+                except PeerResolutionError as e:
+                    print(f"⚠️ Entity resolution failed ({candidate_ns}): {e}")
+                except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+                    # Transient and uncached: try the next client, this link isn't lost for the channel
+                    print(f"⚠️ Entity resolution interrupted ({candidate_ns}): {e}")
+                    supervisor.suspect(candidate)
+            
+            if not peer:
+                await app.send_message(user_id, f"❌ Cannot access channel: {channel_id}")
+                return None
+        else:
+            client, namespace = candidates[0]
+        
         download_status = await app.send_message(user_id, "🔍 Finding message...")
+        message = source_message
+        method = "get_messages"  # What a FloodWait gets charged to
         
         try:
             # ⚡ FAST DOWNLOAD WITH PYROGRAM
-            message = await app.get_messages(entity.id, message_id)
-            if not message or not (message.video or message.document or message.photo):
+            if message is None:
+                await pacer.wait("get_messages")
+                async with tracer.span("fetch"):
+                    message = await client.get_messages(peer.peer_id, message_id)
+            if not self.media_processor.has_downloadable_media(message):
                 raise Exception("No media found")
             
             filename, file_size, media_type = self.media_processor.get_media_info(message)
             
-            file_path = await message.download(
-                file_name=os.path.join(download_path, filename),
-                block=True,
-                block_size=self.config.FILE_READ_BUFFER,  # ⚡ 64MB blocks
-                progress=progress_bar,
-                progress_args=("╭──────────────╮\n│ **__FAST DOWNLOAD__**\n├────────", download_status, time.time())
-            )
+            # ⚡ DISK ADMISSION, then GLOBAL SCHEDULER (bounded slots, fair share)
+            if disk_hold and not disk_hold.size:
+                need = self.disk_need(file_size)
+                if not disk_budget.can_admit(need):
+                    await download_status.edit("💾 Waiting for disk space...")
+                async with tracer.span("disk_wait", size=need):
+                    await disk_hold.reserve(need)
+            method = "download"
+            await pacer.wait("download")
+            async with tracer.span("download", client="pyrogram", size=file_size) as span, \
+                    transfer_scheduler.slot(user_id, "download", file_size) as ticket:
+                span.attrs["queued"] = round(ticket.started_at - ticket.queued_at, 3)
+                file_path = await message.download(
+                    file_name=os.path.join(download_path, filename),
+                    block=True,
+                    progress=ticket.wrap_progress(progress_bar),
+                    progress_args=("╭──────────────╮\n│ **__FAST DOWNLOAD__**\n├────────", download_status, time.time())
+                )
             
             await download_status.edit("✅ Download complete!")
-            return file_path
+            pacer.on_success("download")
+            return file_path, message
             
+        except FloodWait as e:
+            # Not a reason to switch clients: wait it out (get_msg retries after the pacer's block)
+            pacer.on_flood_error(method, e)
+            await download_status.edit(f"⏳ FloodWait {e.value}s, retrying...")
+            raise
+        except DiskBudgetExceeded as e:
+            # Can never fit; another client wouldn't change that
+            await download_status.edit(f"💾 File is too large for this server's disk budget. {e}")
+            return None
         except Exception as pyro_error:
             print(f"❌ Pyrogram download failed: {pyro_error}")
+            if isinstance(pyro_error, (ConnectionError, OSError, asyncio.TimeoutError)):
+                supervisor.suspect(client)
             
-            # ⚡ TELETHON FALLBACK WITH FAST DOWNLOAD
-            if self.pro_client:
+            # ⚡ TELETHON FALLBACK - same bot account, so the cached access hash is valid
+            if namespace == "bot" and (peer or message) and supervisor.is_available(gf):
                 try:
                     await download_status.edit("🔄 Pyrogram failed, trying FAST Telethon...")
                     
-                    telethon_entity = await self.pro_client.get_entity(entity.id)
-                    telethon_message = await self.pro_client.get_messages(telethon_entity, ids=message_id)
+                    if not peer:
+                        peer = await self.resolve_channel(channel_id)
+                    telethon_message = await gf.get_messages(peer.telethon_input(), ids=message_id)
                     
                     if not telethon_message or not telethon_message.media:
                         raise Exception("No media in Telethon message")
                     
-                    filename, _, _ = self.media_processor.get_media_info(message)
-                    
-                    file_path = await fast_download(
-                        self.pro_client,
-                        telethon_message,
-                        download_path,
-                        filename,
-                        lambda done, total: self.progress_manager.calculate_progress(done, total, user_id, "Telethon"),
-                        download_status,
-                        user_id
+                    filename = self.media_processor.get_media_info(message)[0] if message else (
+                        telethon_message.file.name or f"{message_id}{telethon_message.file.ext or ''}"
                     )
                     
+                    if disk_hold and not disk_hold.size:
+                        await disk_hold.reserve(self.disk_need(telethon_message.file.size or 0))
+                    async with tracer.span("download", client="telethon", size=telethon_message.file.size or 0) as span, \
+                            transfer_scheduler.slot(user_id, "download", telethon_message.file.size or 0, client="telethon") as ticket:
+                        span.attrs["queued"] = round(ticket.started_at - ticket.queued_at, 3)
+                        file_path = await fast_download(
+                            gf,
+                            telethon_message,
+                            reply=download_status,
+                            download_folder=download_path,
+                            progress_bar_function=ticket.wrap_sync(
+                                lambda done, total: self.progress_manager.calculate_progress(done, total, user_id, "Telethon")
+                            ),
+                            name=filename,
+                            user_id=user_id
+                        )
+                    
                     await download_status.edit("✅ Download complete via Telethon!")
-                    return file_path
+                    return file_path, message or telethon_message
                     
+                except FloodWaitError as e:
+                    pacer.on_flood_error("download", e)
+                    await download_status.edit(f"⏳ FloodWait {e.seconds}s, retrying...")
+                    raise
+                except DiskBudgetExceeded as e:
+                    await download_status.edit(f"💾 File is too large for this server's disk budget. {e}")
                 except Exception as tele_error:
                     print(f"❌ Telethon download also failed: {tele_error}")
                     await download_status.edit(f"❌ Download failed: {str(tele_error)[:150]}")
+            else:
+                await download_status.edit(f"❌ Download failed: {str(pyro_error)[:150]}")
             
             return None
     
+    async def iter_batch_messages(self, client, chat_id: int, message_ids: List[int]):
+        """
+        ⚡ Bulk prefetch for batches: one get_messages call per PREFETCH_CHUNK ids.
+        Yields (chunk_ids, messages) with unusable messages dropped and the
+        smallest media first, so nothing is scheduled for a skipped id.
+        """
+        chunk_size = self.config.PREFETCH_CHUNK
+        for i in range(0, len(message_ids), chunk_size):
+            chunk_ids = message_ids[i:i + chunk_size]
+            for attempt in range(self.config.MAX_RETRIES + 1):
+                await pacer.wait("get_messages")  # Also sits out any FloodWait block
+                try:
+                    messages = await client.get_messages(chat_id, chunk_ids)
+                    pacer.on_success("get_messages")
+                    break
+                except FloodWait as e:
+                    # Retry this chunk instead of ending the whole batch
+                    pacer.on_flood_error("get_messages", e)
+                    if attempt == self.config.MAX_RETRIES:
+                        raise
+            if not isinstance(messages, list):
+                messages = [messages]
+            
+            usable = [m for m in messages if self.media_processor.has_downloadable_media(m)]
+            usable.sort(key=lambda m: self.media_processor.get_media_info(m)[1] or 0)
+            yield chunk_ids, usable
+    
     async def process_user_caption(self, original_caption: str, user_id: int) -> str:
         """Process caption with user preferences (OPTIMIZED)"""
         # ⚡ BATCH FETCH USER DATA
@@ -611,13 +757,15 @@ class SmartTelegramBot:
         file_type = self.media_processor.get_file_type(file_path)
         thumb_path = self.get_thumbnail_path(user_id)
         
+        async with tracer.span("upload_queue"):
+            ticket = await transfer_scheduler.acquire(user_id, "upload", os.path.getsize(file_path))
+        progress = ticket.wrap_progress(progress_bar)
         progress_args = ("╭──────────────╮\n│ **__FAST UPLOAD__**\n├────────", edit_msg, time.time())
         
         try:
             if file_type == 'video':
-                metadata = {}
-                if 'video_metadata' in globals():
-                    metadata = video_metadata(file_path)
+                async with tracer.span("probe"):
+                    metadata = await media_pool.probe_video(file_path)
                 
                 width = metadata.get('width', 0)
                 height = metadata.get('height', 0)
@@ -626,118 +774,117 @@ class SmartTelegramBot:
                 # ⚡ GENERATE THUMBNAIL ONLY IF NEEDED
                 if not thumb_path and 'screenshot' in globals():
                     try:
-                        thumb_path = await screenshot(file_path, duration, user_id)
+                        async with tracer.span("thumbnail"):
+                            thumb_path = await screenshot(file_path, duration, user_id)
                     except:
                         pass
+            
+            async with tracer.span("upload", client="pyrogram", type=file_type, size=ticket.size):
+                if file_type == 'video':
+                    result = await app.send_video(
+                        chat_id=target_chat_id,
+                        video=file_path,
+                        caption=caption,
+                        height=height,
+                        width=width,
+                        duration=duration,
+                        thumb=thumb_path,
+                        reply_to_message_id=topic_id,
+                        parse_mode=ParseMode.MARKDOWN,
+                        progress=progress,
+                        progress_args=progress_args
+                    )
                 
-                result = await app.send_video(
-                    chat_id=target_chat_id,
-                    video=file_path,
-                    caption=caption,
-                    height=height,
-                    width=width,
-                    duration=duration,
-                    thumb=thumb_path,
-                    reply_to_message_id=topic_id,
-                    parse_mode=ParseMode.MARKDOWN,
-                    progress=progress_bar,
-                    progress_args=progress_args
-                )
-                
-            elif file_type == 'photo':
-                result = await app.send_photo(
-                    chat_id=target_chat_id,
-                    photo=file_path,
-                    caption=caption,
-                    reply_to_message_id=topic_id,
-                    parse_mode=ParseMode.MARKDOWN,
-                    progress=progress_bar,
-                    progress_args=progress_args
-                )
+                elif file_type == 'photo':
+                    result = await app.send_photo(
+                        chat_id=target_chat_id,
+                        photo=file_path,
+                        caption=caption,
+                        reply_to_message_id=topic_id,
+                        parse_mode=ParseMode.MARKDOWN,
+                        progress=progress,
+                        progress_args=progress_args
+                    )
                 
-            elif file_type == 'audio':
-                result = await app.send_audio(
-                    chat_id=target_chat_id,
-                    audio=file_path,
-                    caption=caption,
-                    reply_to_message_id=topic_id,
-                    parse_mode=ParseMode.MARKDOWN,
-                    progress=progress_bar,
-                    progress_args=progress_args
-                )
+                elif file_type == 'audio':
+                    result = await app.send_audio(
+                        chat_id=target_chat_id,
+                        audio=file_path,
+                        caption=caption,
+                        reply_to_message_id=topic_id,
+                        parse_mode=ParseMode.MARKDOWN,
+                        progress=progress,
+                        progress_args=progress_args
+                    )
                 
-            else:  # document
-                result = await app.send_document(
-                    chat_id=target_chat_id,
-                    document=file_path,
-                    caption=caption,
-                    thumb=thumb_path,
-                    reply_to_message_id=topic_id,
-                    parse_mode=ParseMode.MARKDOWN,
-                    progress=progress_bar,
-                    progress_args=progress_args
-                )
+                else:  # document
+                    result = await app.send_document(
+                        chat_id=target_chat_id,
+                        document=file_path,
+                        caption=caption,
+                        thumb=thumb_path,
+                        reply_to_message_id=topic_id,
+                        parse_mode=ParseMode.MARKDOWN,
+                        progress=progress,
+                        progress_args=progress_args
+                    )
             
             # ⚡ COPY TO LOG IN BACKGROUND
-            asyncio.create_task(result.copy(LOG_GROUP))
+            asyncio.create_task(self._copy_to_log(result))
             return result
             
         except Exception as e:
             await app.send_message(LOG_GROUP, f"**FAST Upload Failed:** {str(e)}")
             raise
         finally:
+            transfer_scheduler.release(ticket)
             if edit_msg:
                 try:
                     await edit_msg.delete()
                 except:
                     pass
 
+    async def _copy_to_log(self, message):
+        async with tracer.span("log_copy"):
+            await message.copy(LOG_GROUP)
+
     async def upload_with_telethon(self, file_path: str, user_id: int, target_chat_id: int, caption: str, topic_id: Optional[int] = None, edit_msg=None):
         """⚡ MAX SPEED upload using Telethon"""
+        async with tracer.span("upload_queue"):
+            ticket = await transfer_scheduler.acquire(user_id, "upload", os.path.getsize(file_path), client="telethon")
         try:
             if edit_msg:
                 await edit_msg.delete()
             
             progress_message = await gf.send_message(user_id, "**__⚡ MAX SPEED UPLOAD...__**")
-            html_caption = await self.caption_formatter.markdown_to_html(caption)
+            # ⚡ PARSED ONCE (LRU cached), SENT AS ENTITIES - NO RE-PARSE
+            formatted = self.caption_formatter.format(caption)
             
             # ⚡ FAST UPLOAD WITH OPTIMIZED SETTINGS
-            uploaded = await fast_upload(
-                gf, file_path,
-                reply=progress_message,
-                name=os.path.basename(file_path),
-                progress_bar_function=lambda done, total: self.progress_manager.calculate_progress(done, total, user_id, "Telethon"),
-                user_id=user_id
-            )
+            async with tracer.span("upload", client="telethon", size=ticket.size):
+                uploaded = await fast_upload(
+                    gf, file_path,
+                    reply=progress_message,
+                    name=os.path.basename(file_path),
+                    progress_bar_function=ticket.wrap_sync(lambda done, total: self.progress_manager.calculate_progress(done, total, user_id, "Telethon")),
+                    user_id=user_id
+                )
             
             await progress_message.delete()
             
             # ⚡ SEND FILE WITH STREAMING SUPPORT
             if self.media_processor.get_file_type(file_path) == 'video':
                 from telethon.tl.types import DocumentAttributeVideo, DocumentAttributeFilename
-                import subprocess
                 
-                duration = width = height = 0
-                try:
-                    result = subprocess.run([
-                        'ffprobe', '-v', 'error', '-show_entries', 
-                        'format=duration,stream=width,height', '-of', 'json',
-                        file_path
-                    ], capture_output=True, text=True, timeout=10)
-                    if result.returncode == 0:
-                        import json
-                        data = json.loads(result.stdout)
-                        duration = int(float(data['format']['duration']))
-                        width = data['streams'][0]['width']
-                        height = data['streams'][0]['height']
-                except:
-                    pass
+                async with tracer.span("probe"):
+                    metadata = await media_pool.probe_video(file_path)
+                duration, width, height = metadata['duration'], metadata['width'], metadata['height']
                 
                 message = await gf.send_file(
                     target_chat_id,
                     uploaded,
-                    caption=html_caption,
-                    parse_mode="html",
+                    caption=formatted.text,
+                    formatting_entities=list(formatted.entities),
                     supports_streaming=True,
                     attributes=[
                         DocumentAttributeVideo(duration, width, height, round_message=False, supports_streaming=True),
@@ -749,8 +896,8 @@ class SmartTelegramBot:
                 message = await gf.send_file(
                     target_chat_id,
                     uploaded,
-                    caption=html_caption,
-                    parse_mode="html",
+                    caption=formatted.text,
+                    formatting_entities=list(formatted.entities),
                     reply_to=topic_id
                 )
             
@@ -764,18 +911,102 @@ class SmartTelegramBot:
             await app.send_message(LOG_GROUP, f"**FAST Telethon Upload Failed:** {str(e)}")
             raise
         finally:
+            transfer_scheduler.release(ticket)
             if os.path.exists(file_path):
                 try:
                     os.remove(file_path)
                 except:
                     pass
 
+    @timed_job("link")
+    async def transfer_message(
+        self,
+        channel_id: Union[str, int],
+        message_id: int,
+        user_id: int,
+        target_chat: str,
+        client=None,
+        namespace: Optional[str] = None,
+        source_message=None
+    ) -> bool:
+        """⚡ Download -> rename -> caption -> upload for one message"""
+        # ⚡ PER-JOB DIRECTORY + DISK RESERVATION, both held until the upload is done
+        async with workdir.job(user_id) as job_path, disk_budget.hold(user_id) as disk_hold, \
+                memory_guard.profile(f"link {channel_id}/{message_id}", user_id):
+            # ⚡ DOWNLOAD WITH MAX SPEED
+            result = await self.download_from_channel(
+                channel_id, message_id, user_id, job_path,
+                client=client, namespace=namespace, source_message=source_message, disk_hold=disk_hold
+            )
+            
+            if not result or not os.path.exists(result[0]):
+                return False
+            file_path = processed_path = result[0]
+            source_message = result[1]
+            
+            try:
+                # ⚡ FAST FILENAME PROCESSING
+                async with tracer.span("rename"):
+                    processed_path = await self.file_ops.process_filename(file_path, user_id)
+                
+                # ⚡ CAPTION FROM THE MESSAGE WE ALREADY DOWNLOADED (no second get_messages)
+                original_caption = getattr(source_message, "caption", None) or getattr(source_message, "message", None) or ""
+                
+                async with tracer.span("caption"):
+                    final_caption = await self.process_user_caption(original_caption, user_id)
+                target_chat_id, topic_id = self.parse_target_chat(target_chat)
+                
+                # ⚡ FAST UPLOAD DECISION
+                file_size = os.path.getsize(processed_path)
+                edit_msg = await app.send_message(user_id, "⬆️ Starting upload...")
+                
+                if file_size > self.config.SIZE_LIMIT:
+                    # Part space was reserved with the download (disk_need)
+                    async with tracer.span("split_upload", size=file_size):
+                        await self.file_ops.split_large_file(
+                            processed_path, app, user_id, target_chat_id, 
+                            final_caption, topic_id
+                        )
+                    await edit_msg.delete()
+                elif not supervisor.is_available(app) and self.pro_client and supervisor.is_available(gf):
+                    # ⚡ Pyrogram is reconnecting: go straight to Telethon
+                    await self.upload_with_telethon(
+                        processed_path, user_id, target_chat_id,
+                        final_caption, topic_id, edit_msg
+                    )
+                else:
+                    # ⚡ TRY PYROGRAM FIRST (FASTEST)
+                    try:
+                        await self.upload_with_pyrogram(
+                            processed_path, user_id, target_chat_id, 
+                            final_caption, topic_id, edit_msg
+                        )
+                    except FloodWait as e:
+                        # Telethon is the same bot account: it would hit the same limit
+                        pacer.on_flood_error("send", e)
+                        raise
+                    except Exception as e:
+                        print(f"⚠️ Pyrogram failed, trying Telethon: {e}")
+                        if isinstance(e, (ConnectionError, OSError, asyncio.TimeoutError)):
+                            supervisor.suspect(app)
+                        if self.pro_client and supervisor.is_available(gf):
+                            await self.upload_with_telethon(
+                                processed_path, user_id, target_chat_id,
+                                final_caption, topic_id, None
+                            )
+                        else:
+                            raise
+                return True
+            finally:
+                # Free the disk before the reservation goes
+                await self.file_ops._cleanup_file(processed_path)
+
     async def handle_download_command(self, message: Message):
         """⚡ Handle download command with MAXIMUM SPEED"""
         user_id = message.from_user.id
         
         # ⚡ FAST AUTHORIZATION CHECK
-        if not self.db.get_user_data(user_id, "premium", False) and user_id != OWNER_ID:
+        if not self.db.get_user_data(user_id, "premium", False) and user_id not in OWNER_ID:
             await message.reply("❌ Not authorized!", quote=True)
             return
         
@@ -795,53 +1026,11 @@ class SmartTelegramBot:
             message_id = int(args[2])
             target_chat = args[3] if len(args) > 3 else str(message.chat.id)
             
-            # ⚡ DOWNLOAD WITH MAX SPEED
-            file_path = await self.download_from_channel(channel_input, message_id, user_id)
-            
-            if not file_path or not os.path.exists(file_path):
-                await message.reply("❌ Download failed!", quote=True)
-                return
-            
-            # ⚡ FAST FILENAME PROCESSING
-            processed_path = await self.file_ops.process_filename(file_path, user_id)
-            
-            # ⚡ GET CAPTION IN BACKGROUND
-            original_caption = ""
-            try:
-                msg = await app.get_messages(channel_input, message_id)
-                original_caption = msg.caption or ""
-            except:
-                pass
-            
-            final_caption = await self.process_user_caption(original_caption, user_id)
-            target_chat_id, topic_id = self.parse_target_chat(target_chat)
-            
-            # ⚡ FAST UPLOAD DECISION
-            file_size = os.path.getsize(processed_path)
-            edit_msg = await message.reply("⬆️ Starting upload...", quote=True)
-            
-            if file_size > self.config.SIZE_LIMIT:
-                await self.file_ops.split_large_file(
-                    processed_path, app, user_id, target_chat_id, 
-                    final_caption, topic_id
-                )
-                await edit_msg.delete()
-            else:
-                # ⚡ TRY PYROGRAM FIRST (FASTEST)
-                try:
-                    await self.upload_with_pyrogram(
-                        processed_path, user_id, target_chat_id, 
-                        final_caption, topic_id, edit_msg
-                    )
-                except Exception as e:
-                    print(f"⚠️ Pyrogram failed, trying Telethon: {e}")
-                    if self.pro_client:
-                        await self.upload_with_telethon(
-                            processed_path, user_id, target_chat_id,
-                            final_caption, topic_id, None
-                        )
-                    else:
-                        raise
+            async with tracer.trace("command", user_id, channel=str(channel_input), message_id=message_id) as trace:
+                if not await self.transfer_message(channel_input, message_id, user_id, target_chat):
+                    trace.status = "failed"
+                    await message.reply("❌ Download failed!", quote=True)
+                    return
             
             await message.reply("✅ **MAX SPEED Upload Complete!**", quote=True)
             
@@ -850,9 +1039,54 @@ class SmartTelegramBot:
             await message.reply(error_msg, quote=True)
             await app.send_message(LOG_GROUP, f"Speed Mode Error:\n{error_msg}")
 
+def parse_message_link(link: str) -> Tuple[Union[str, int], int]:
+    """Split a t.me / tg:// link into (chat reference, message id)"""
+    if link.startswith("tg://openmessage"):
+        user_id = re.search(r"user_id=(\d+)", link).group(1)
+        message_id = re.search(r"message_id=(\d+)", link).group(1)
+        return int(user_id), int(message_id)
+    
+    parts = link.split("?")[0].rstrip("/").split("/")
+    message_id = int(parts[-1])
+    if "t.me/c/" in link:
+        # t.me/c/<id>/<msg> or t.me/c/<id>/<topic>/<msg>
+        return int(f"-100{parts[parts.index('c') + 1]}"), message_id
+    if "t.me/b/" in link:
+        return f"@{parts[parts.index('b') + 1]}", message_id
+    return f"@{parts[parts.index('t.me') + 1]}", message_id
+
 # Initialize bot
 bot = SmartTelegramBot()
 
+def _collect_caches():
+    export_cache("caption", bot.caption_formatter.stats())
+    export_cache("peer", bot.peer_cache.stats())
+    export_cache("user_data", {"hits": bot.db.hits, "misses": bot.db.misses})
+
+registry.add_collector(_collect_caches)
+
+async def get_msg(userbot, user_id, msg_id, link, retry_count=0, message=None, source_message=None):
+    """⚡ Link entry point for main.py (single links and batches)"""
+    channel_id, message_id = parse_message_link(link)
+    target_chat = bot.user_chat_ids.get(user_id, str(user_id))
+    
+    # ⚡ ADAPTIVE PACING instead of a fixed sleep per item
+    await pacer.wait("send", target_chat)
+    try:
+        result = await bot.transfer_message(
+            channel_id, message_id, user_id, target_chat,
+            client=userbot, source_message=source_message
+        )
+        pacer.on_success("send")
+        return result
+    except (FloodWait, FloodWaitError) as e:
+        # Charged where it was caught (fetch, download or send); "send" if nobody did
+        method = pacer.on_flood_error("send", e)
+        if retry_count >= bot.config.MAX_RETRIES:
+            raise
+        await pacer.wait(method)
+        return await get_msg(userbot, user_id, msg_id, link, retry_count + 1, message, source_message)
+
 # ✅ SPEED-OPTIMIZED COMMAND HANDLERS
 
 @app.on_message(filters.command("download") & filters.private)
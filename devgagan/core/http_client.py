@@ -0,0 +1,151 @@
+# ---------------------------------------------------
+# File Name: http_client.py
+# Description: One pooled aiohttp session for every outbound HTTP call
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Set
+
+import aiofiles
+import aiohttp
+
+from config import HTTP_POOL_SIZE, HTTP_PER_HOST, HTTP_TIMEOUT, HTTP_DNS_TTL
+from devgagan.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+class HttpClient:
+    """
+    Process-wide aiohttp session. Connections stay open between calls
+    (keep-alive), DNS answers are cached for `dns_ttl`, and the connector
+    caps open connections in total and per host, so thumbnails and the
+    shortener no longer pay a DNS lookup and TCP/TLS handshake per request.
+    The session is created on first use and belongs to that event loop.
+    """
+    def __init__(self, limit: int = 100, per_host: int = 8, timeout: float = 30, dns_ttl: int = 300):
+        self.limit = limit
+        self.per_host = per_host
+        self.timeout = timeout
+        self.dns_ttl = dns_ttl
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing: Set[asyncio.Future] = set()
+        self.requests = self.failures = 0
+        self.connections = self.reused = 0
+
+    def _trace(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_create(session, context, params):
+            self.connections += 1
+
+        async def on_reuse(session, context, params):
+            self.reused += 1
+
+        trace.on_connection_create_end.append(on_create)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    def _discard(self, session: aiohttp.ClientSession, loop: asyncio.AbstractEventLoop):
+        """Close a session being replaced, on its own loop if that one still runs"""
+        if session.closed:
+            return
+        try:
+            if loop.is_running() and loop is not asyncio.get_running_loop():
+                closing = asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
+            else:
+                # Its loop has finished: this only marks the connector closed, the transports went with the loop
+                closing = asyncio.ensure_future(session.close())
+        except RuntimeError as e:
+            logger.debug(f"Could not close the previous HTTP session: {e}")
+            return
+        self._closing.add(closing)
+        closing.add_done_callback(self._closed)
+
+    def _closed(self, closing: asyncio.Future):
+        self._closing.discard(closing)
+        if not closing.cancelled() and closing.exception():
+            logger.debug(f"Closing the previous HTTP session failed: {closing.exception()}")
+
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            if self._session is not None:
+                self._discard(self._session, self._loop)
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.per_host,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=30,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout, connect=min(10, self.timeout)),
+                trace_configs=[self._trace()],
+            )
+            self._loop = loop
+        return self._session
+
+    async def get_json(self, url: str, **kwargs) -> Optional[Any]:
+        """Decoded JSON body, or None on any failure (logged)"""
+        self.requests += 1
+        try:
+            async with self.session().get(url, **kwargs) as response:
+                if response.status == 200:
+                    return await response.json(content_type=None)
+                logger.warning(f"⚠️ GET {response.url.host} returned {response.status}")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.error(f"GET {url.split('?')[0]} failed: {e}")
+        self.failures += 1
+        return None
+
+    async def download(self, url: str, path: str, max_bytes: Optional[int] = None) -> Optional[str]:
+        """Stream url into path; None on failure or past max_bytes"""
+        self.requests += 1
+        try:
+            async with self.session().get(url) as response:
+                if response.status == 200:
+                    size = 0
+                    async with aiofiles.open(path, "wb") as f:
+                        async for chunk in response.content.iter_chunked(64 * 1024):
+                            size += len(chunk)
+                            if max_bytes and size > max_bytes:
+                                raise ValueError(f"larger than {max_bytes} bytes")
+                            await f.write(chunk)
+                    return path
+                logger.warning(f"⚠️ GET {response.url.host} returned {response.status}")
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError) as e:
+            logger.error(f"Download of {url.split('?')[0]} failed: {e}")
+        self.failures += 1
+        return None
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "connections": self.connections,
+            "reused": self.reused,
+        }
+
+http_client = HttpClient(HTTP_POOL_SIZE, HTTP_PER_HOST, HTTP_TIMEOUT, HTTP_DNS_TTL)
+
+_REQUESTS = registry.counter("devgagan_http_requests_total", "Outbound HTTP requests", ("result",))
+_CONNECTIONS = registry.counter("devgagan_http_connections_total", "Outbound HTTP connections used per request", ("source",))
+
+def _collect():
+    stats = http_client.stats()
+    _REQUESTS.set_total(stats["requests"] - stats["failures"], result="ok")
+    _REQUESTS.set_total(stats["failures"], result="error")
+    _CONNECTIONS.set_total(stats["connections"], source="new")
+    _CONNECTIONS.set_total(stats["reused"], source="pooled")
+
+registry.add_collector(_collect)
@@ -0,0 +1,122 @@
+# ---------------------------------------------------
+# File Name: loopmon.py
+# Description: Event-loop lag sampler and blocked-loop stack reporter
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import inspect
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from config import LOOP_LAG_INTERVAL, LOOP_LAG_THRESHOLD
+from devgagan.core.metrics import registry, FAST_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+_LAG = registry.histogram("devgagan_loop_lag_seconds", "Event-loop scheduling delay per tick", buckets=FAST_BUCKETS)
+_LAG_QUANTILES = registry.gauge("devgagan_loop_lag_quantile_seconds", "Recent loop lag percentiles", ("quantile",))
+_STALLS = registry.counter("devgagan_loop_stalls_total", "Ticks that exceeded the stall threshold")
+
+def _percentile(ordered, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+class LoopMonitor:
+    """
+    A heartbeat coroutine measures how late each tick runs; a watchdog
+    thread notices when the heartbeat stops and logs what the loop thread
+    is executing at that moment, which is the blocking call itself.
+    """
+    def __init__(self, interval: float = 0.1, threshold: float = 0.5, samples: int = 3000):
+        self.interval = interval
+        self.threshold = threshold
+        self.lags: Deque[float] = deque(maxlen=samples)
+        self.stalls = 0
+        self.worst = 0.0
+        self._beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._reported_beat = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(now - expected, 0.0)
+            self._beat = now
+            self.lags.append(lag)
+            self.worst = max(self.worst, lag)
+            _LAG.observe(lag)
+            if lag > self.threshold:
+                self.stalls += 1
+                _STALLS.inc()
+                logger.warning(f"🐢 Event loop blocked for {lag:.2f}s")
+
+    def _watchdog(self):
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._beat
+            if time.monotonic() - beat < self.threshold or beat == self._reported_beat:
+                continue
+            self._reported_beat = beat  # One report per stall
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame))
+            logger.warning(
+                f"🐢 Event loop stalled >{self.threshold}s in {self._coroutine_of(frame)}\n{stack}"
+            )
+
+    @staticmethod
+    def _coroutine_of(frame) -> str:
+        """Innermost coroutine on the loop thread's stack"""
+        while frame is not None:
+            if frame.f_code.co_flags & (inspect.CO_COROUTINE | inspect.CO_ASYNC_GENERATOR):
+                return f"{getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)}()"
+            frame = frame.f_back
+        return "a plain callback"
+
+    def start(self):
+        """Call from the running loop (devggn_boot)"""
+        if self._task:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat())
+        threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True).start()
+        logger.info(f"✅ Loop monitor started (stall threshold {self.threshold}s)")
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, float]:
+        ordered = sorted(self.lags)
+        return {
+            "p50": _percentile(ordered, 0.50),
+            "p95": _percentile(ordered, 0.95),
+            "p99": _percentile(ordered, 0.99),
+            "max": self.worst,
+            "stalls": self.stalls,
+        }
+
+loop_monitor = LoopMonitor(LOOP_LAG_INTERVAL, LOOP_LAG_THRESHOLD)
+
+def _collect():
+    stats = loop_monitor.stats()
+    for quantile in ("p50", "p95", "p99"):
+        _LAG_QUANTILES.set(stats[quantile], quantile=f"0.{quantile[1:]}")
+
+registry.add_collector(_collect)
@@ -0,0 +1,131 @@
+# ---------------------------------------------------
+# File Name: media_cache.py
+# Description: Re-send already uploaded yt-dlp results; coalesce duplicate jobs
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from telethon.errors import RPCError
+from telethon.tl.types import InputDocument
+
+from config import YTDL_CACHE_TTL
+from devgagan.core.metrics import registry
+from devgagan.core.mongo import media_cache_db
+
+logger = logging.getLogger(__name__)
+
+class MediaCache:
+    """
+    /dl and /adl results keyed by what the media is, not how it was linked:
+    extractor_key:id:variant (variant = kind + format). Each entry holds the
+    uploaded Telegram document, so a repeat is one send_file with no
+    extraction, download or upload. URLs are remembered per entry, so the
+    exact same link skips extraction too.
+
+    flight() coalesces concurrent jobs for the same media: the first one
+    does the work, the rest wait for it and re-send its result.
+    """
+    def __init__(self, ttl: int = 3 * 86400):
+        self.ttl = ttl
+        self._flights: Dict[str, asyncio.Event] = {}
+        self.hits = self.coalesced = self.stored = self.stale = 0
+
+    @staticmethod
+    def key(info: Optional[Dict[str, Any]], variant: str) -> Optional[str]:
+        if not info or not info.get("extractor_key") or not info.get("id"):
+            return None
+        return f"{info['extractor_key']}:{info['id']}:{variant}"
+
+    @asynccontextmanager
+    async def flight(self, name: str, lookup: Callable[[], Awaitable[Optional[Dict[str, Any]]]]):
+        """
+        Yields the cached entry, or None when this job has to produce it;
+        until it leaves the block, other jobs for `name` wait here.
+        """
+        if not self.ttl:
+            yield None
+            return
+        waited = False
+        while True:
+            cached = await lookup()
+            if cached:
+                self.hits += 1
+                self.coalesced += waited
+                yield cached
+                return
+            flight = self._flights.get(name)
+            if flight is None:
+                break
+            waited = True
+            await flight.wait()
+        done = self._flights[name] = asyncio.Event()
+        try:
+            yield None
+        finally:
+            del self._flights[name]
+            done.set()
+
+    def by_url(self, url: str, variant: str):
+        return self.flight(f"url:{variant}:{url}", lambda: media_cache_db.get_result_by_url(url, variant))
+
+    def by_key(self, key: str):
+        return self.flight(key, lambda: media_cache_db.get_result(key))
+
+    async def send(self, client, chat_id: int, cached: Dict[str, Any], url: Optional[str] = None) -> bool:
+        """Re-send a cached upload; False (and the entry dropped) if Telegram refuses it"""
+        media = InputDocument(cached["document_id"], cached["access_hash"], cached["file_reference"])
+        try:
+            await client.send_file(chat_id, media, caption=cached.get("caption"))
+        except RPCError as e:
+            # File reference expired, document gone, ...: upload it again
+            logger.warning(f"Cached media {cached['_id']} rejected: {e}")
+            self.stale += 1
+            await media_cache_db.remove_result(cached["_id"])
+            return False
+        if url and url not in cached.get("urls", []):
+            await media_cache_db.add_url(cached["_id"], url)
+        return True
+
+    async def store(self, key: Optional[str], url: str, variant: str, message) -> bool:
+        """Remember the message's document for the next request"""
+        document = getattr(message, "document", None)
+        if not self.ttl or not key or document is None:
+            return False
+        media = {
+            "document_id": document.id,
+            "access_hash": document.access_hash,
+            "file_reference": document.file_reference,
+            "caption": message.text,
+        }
+        if await media_cache_db.save_result(key, url, variant, media, self.ttl):
+            self.stored += 1
+            return True
+        return False
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "stored": self.stored,
+            "stale": self.stale,
+            "in_flight": len(self._flights),
+        }
+
+media_cache = MediaCache(YTDL_CACHE_TTL)
+
+_RESULTS = registry.counter("devgagan_ytdl_cache_total", "yt-dlp result cache events", ("event",))
+_FLIGHTS = registry.gauge("devgagan_ytdl_cache_in_flight", "Distinct media being produced right now")
+
+def _collect():
+    stats = media_cache.stats()
+    for event in ("hits", "coalesced", "stored", "stale"):
+        _RESULTS.set_total(stats[event], event=event)
+    _FLIGHTS.set(stats["in_flight"])
+
+registry.add_collector(_collect)
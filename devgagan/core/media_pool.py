@@ -0,0 +1,193 @@
+# ---------------------------------------------------
+# File Name: media_pool.py
+# Description: Process pool for CPU-bound media work (probing, tagging, thumbnails)
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from config import MEDIA_WORKERS
+from devgagan.core.metrics import registry, FAST_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------
+# Tasks: plain top-level functions so they pickle; they run in the workers
+# ---------------------------------------------------
+
+def _noop():
+    return os.getpid()
+
+def ffprobe_video(path: str) -> Dict[str, int]:
+    """Width, height and duration (s) as ffprobe reports them"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration:stream=width,height', '-of', 'json', path],
+        capture_output=True, text=True, timeout=30
+    )
+    data = json.loads(result.stdout or "{}")
+    stream = next((s for s in data.get('streams', []) if s.get('width')), {})
+    return {
+        'width': int(stream.get('width', 0)),
+        'height': int(stream.get('height', 0)),
+        'duration': int(float(data.get('format', {}).get('duration', 0))),
+    }
+
+def probe_video(path: str) -> Dict[str, int]:
+    """OpenCV first (decodes in-process), ffprobe for containers it can't open"""
+    from devgagan.core.func import video_metadata
+    metadata = video_metadata(path)
+    if metadata == {'width': 1280, 'height': 720, 'duration': 1}:  # video_metadata's fallback
+        try:
+            probed = ffprobe_video(path)
+            if probed['duration'] > 0:
+                return probed
+        except Exception:
+            pass
+    return metadata
+
+def encode_thumbnail(src: str, dest: str, max_side: int = 320, quality: int = 85) -> Optional[str]:
+    """Any image -> baseline JPEG within Telegram's 320px thumbnail limit"""
+    from PIL import Image
+    with Image.open(src) as image:
+        image = image.convert("RGB")
+        image.thumbnail((max_side, max_side))
+        image.save(dest, "JPEG", quality=quality, optimize=True)
+    return dest
+
+def tag_mp3(path: str, title: str, artist: str, comment: str, cover: Optional[str] = None):
+    """Title/artist/comment and an optional JPEG cover, saved in place"""
+    from mutagen.id3 import ID3, TIT2, TPE1, COMM, APIC
+    from mutagen.mp3 import MP3
+    audio = MP3(path, ID3=ID3)
+    try:
+        audio.add_tags()
+    except Exception:
+        pass  # Already tagged
+    audio.tags["TIT2"] = TIT2(encoding=3, text=title)
+    audio.tags["TPE1"] = TPE1(encoding=3, text=artist)
+    audio.tags["COMM"] = COMM(encoding=3, lang="eng", desc="Comment", text=comment)
+    if cover:
+        with open(cover, 'rb') as img:
+            audio.tags["APIC"] = APIC(encoding=3, mime='image/jpeg', type=3, desc='Cover', data=img.read())
+    audio.save()
+
+# ---------------------------------------------------
+# Async facade used by the modules
+# ---------------------------------------------------
+
+class MediaPool:
+    """
+    Shared ProcessPoolExecutor for work that holds the GIL: a thread pool
+    would serialize it and stall the event loop's network I/O. Workers are
+    forked (a spawned child would re-import devgagan and its clients), so
+    start() them at boot while the process is still small. A crashed worker
+    breaks the pool; it is rebuilt and the task retried once.
+    """
+    def __init__(self, workers: int = 0):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.completed: Dict[str, int] = {}
+        self.failed: Dict[str, int] = {}
+        self.restarts = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("fork"))
+        return self._pool
+
+    def start(self):
+        """Fork the workers now (the fork context starts them all on first submit); call before any thread starts"""
+        if threading.active_count() > 1:
+            logger.warning(f"⚠️ Forking media workers with {threading.active_count() - 1} other threads running")
+        self._executor().submit(_noop)
+        logger.info(f"⚙️ Media pool started with {self.workers} workers")
+
+    async def run(self, task: Callable[..., Any], *args) -> Any:
+        name = task.__name__
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            try:
+                result = await loop.run_in_executor(self._executor(), task, *args)
+            except BrokenProcessPool:
+                logger.warning(f"⚠️ Media worker died during {name}; restarting pool")
+                self._reset()
+                result = await loop.run_in_executor(self._executor(), task, *args)
+            self.completed[name] = self.completed.get(name, 0) + 1
+            return result
+        except Exception:
+            self.failed[name] = self.failed.get(name, 0) + 1
+            raise
+        finally:
+            self.pending -= 1
+            _SECONDS.observe(time.perf_counter() - start, task=name)
+
+    def _reset(self):
+        pool, self._pool = self._pool, None
+        self.restarts += 1
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def probe_video(self, path: str) -> Dict[str, int]:
+        """{'width', 'height', 'duration'}; a safe default when nothing can read the file"""
+        try:
+            return await self.run(probe_video, path)
+        except Exception as e:
+            logger.error(f"Probe failed for {path}: {e}")
+            return {'width': 1280, 'height': 720, 'duration': 1}
+
+    async def thumbnail(self, src: str, dest: Optional[str] = None, max_side: int = 320) -> Optional[str]:
+        """Re-encode a downloaded image as a Telegram thumbnail; None if it isn't an image"""
+        dest = dest or f"{os.path.splitext(src)[0]}_thumb.jpg"
+        try:
+            return await self.run(encode_thumbnail, src, dest, max_side)
+        except Exception as e:
+            logger.error(f"Thumbnail encoding failed for {src}: {e}")
+            return None
+
+    async def tag_mp3(self, path: str, title: str, artist: str, comment: str, cover: Optional[str] = None):
+        await self.run(tag_mp3, path, title, artist, comment, cover)
+
+    def shutdown(self):
+        pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "completed": dict(self.completed),
+            "failed": dict(self.failed),
+            "restarts": self.restarts,
+        }
+
+media_pool = MediaPool(MEDIA_WORKERS)
+
+_SECONDS = registry.histogram("devgagan_media_task_seconds", "Media pool task time, queueing included", ("task",), buckets=FAST_BUCKETS)
+_TASKS = registry.counter("devgagan_media_tasks_total", "Media pool tasks by outcome", ("task", "outcome"))
+_PENDING = registry.gauge("devgagan_media_pending", "Media pool tasks queued or running")
+
+def _collect():
+    stats = media_pool.stats()
+    _PENDING.set(stats["pending"])
+    for name, count in stats["completed"].items():
+        _TASKS.set_total(count, task=name, outcome="ok")
+    for name, count in stats["failed"].items():
+        _TASKS.set_total(count, task=name, outcome="error")
+
+registry.add_collector(_collect)
@@ -0,0 +1,176 @@
+# ---------------------------------------------------
+# File Name: memory.py
+# Description: RSS budget enforcement and per-job memory profiling
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import logging
+import time
+import tracemalloc
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Deque, Dict, List, Set
+
+import psutil
+
+from config import MEMORY_BUDGET, MEMORY_PROFILE
+from devgagan.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+_CGROUP_LIMITS = ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes")
+
+def memory_limit() -> int:
+    """What the kernel will OOM-kill us at: the cgroup limit, else physical RAM"""
+    total = psutil.virtual_memory().total
+    for path in _CGROUP_LIMITS:
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+            if value.isdigit() and 0 < int(value) < total:
+                return int(value)
+        except OSError:
+            continue
+    return total
+
+class MemoryGuard:
+    """
+    Admits large in-memory buffers only while RSS + outstanding buffers stay
+    under the budget; callers that are refused switch to streaming.
+    """
+    def __init__(self, budget: int = 0, headroom: float = 0.8, sample_interval: float = 0.25, top: int = 10):
+        self._budget = budget
+        self.headroom = headroom
+        self.sample_interval = sample_interval
+        self.top = top
+        self.process = psutil.Process()
+        self.buffered = 0
+        self.degraded = 0
+        self.peak_rss = 0
+        self.profile_all = MEMORY_PROFILE
+        self.profile_users: Set[int] = set()
+        self.reports: Deque[Dict] = deque(maxlen=20)
+        self._tracing = 0
+        self._owns_tracing = False
+
+    @property
+    def budget(self) -> int:
+        if not self._budget:
+            self._budget = int(memory_limit() * self.headroom)
+        return self._budget
+
+    def rss(self) -> int:
+        rss = self.process.memory_info().rss
+        self.peak_rss = max(self.peak_rss, rss)
+        return rss
+
+    def can_buffer(self, nbytes: int) -> bool:
+        """Would holding nbytes more in RAM stay under the budget"""
+        return self.rss() + self.buffered + nbytes <= self.budget
+
+    @contextmanager
+    def buffer(self, nbytes: int):
+        """Count an admitted buffer until the caller drops it"""
+        self.buffered += nbytes
+        try:
+            yield
+        finally:
+            self.buffered -= nbytes
+
+    def degrade(self, reason: str):
+        self.degraded += 1
+        logger.warning(f"🧠 Streaming mode: {reason}")
+
+    def should_profile(self, user_id: int) -> bool:
+        return self.profile_all or user_id in self.profile_users
+
+    def _start_tracing(self):
+        if not self._tracing:
+            self._owns_tracing = not tracemalloc.is_tracing()
+            if self._owns_tracing:
+                tracemalloc.start(25)
+        self._tracing += 1
+        tracemalloc.reset_peak()
+
+    def _stop_tracing(self) -> List[str]:
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        sites = [
+            f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} {stat.size / 1024**2:.1f} MB ({stat.count} blocks)"
+            for stat in snapshot.statistics("lineno")[:self.top]
+        ]
+        self._tracing -= 1
+        if not self._tracing and self._owns_tracing:
+            tracemalloc.stop()
+        return sites
+
+    @asynccontextmanager
+    async def profile(self, job: str, user_id: int):
+        """
+        RSS sampling plus tracemalloc for one job when enabled for its user.
+        tracemalloc is process-wide, so concurrent jobs share the allocation
+        sites in the report.
+        """
+        if not self.should_profile(user_id):
+            yield None
+            return
+
+        start_rss = self.rss()
+        peak = start_rss
+        started = time.monotonic()
+        self._start_tracing()
+
+        async def sample():
+            nonlocal peak
+            while True:
+                peak = max(peak, self.rss())
+                await asyncio.sleep(self.sample_interval)
+
+        sampler = asyncio.create_task(sample())
+        try:
+            yield self
+        finally:
+            sampler.cancel()
+            peak = max(peak, self.rss())
+            traced_peak = tracemalloc.get_traced_memory()[1]
+            report = {
+                "job": job,
+                "user_id": user_id,
+                "seconds": round(time.monotonic() - started, 1),
+                "start_rss": start_rss,
+                "peak_rss": peak,
+                "traced_peak": traced_peak,
+                "sites": self._stop_tracing(),
+            }
+            self.reports.append(report)
+            logger.info(
+                f"🧠 {job}: RSS {start_rss / 1024**2:.0f} -> peak {peak / 1024**2:.0f} MB, "
+                f"traced peak {traced_peak / 1024**2:.1f} MB\n" + "\n".join(report["sites"])
+            )
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "rss": self.rss(),
+            "peak_rss": self.peak_rss,
+            "budget": self.budget,
+            "buffered": self.buffered,
+            "degraded": self.degraded,
+        }
+
+memory_guard = MemoryGuard(MEMORY_BUDGET)
+
+_MEMORY = registry.gauge("devgagan_memory_bytes", "Process RSS, in-memory buffers and budget", ("kind",))
+_DEGRADED = registry.counter("devgagan_streaming_fallbacks_total", "Jobs switched to streaming to stay under the memory budget")
+
+def _collect():
+    stats = memory_guard.stats()
+    for kind in ("rss", "peak_rss", "budget", "buffered"):
+        _MEMORY.set(stats[kind], kind=kind)
+    _DEGRADED.set_total(stats["degraded"])
+
+registry.add_collector(_collect)
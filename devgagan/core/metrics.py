@@ -0,0 +1,219 @@
+# ---------------------------------------------------
+# File Name: metrics.py
+# Description: Prometheus-style metrics shared with the Flask app
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import bisect
+import logging
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import METRICS_DIR, METRICS_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: Dict[str, str] = None) -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in zip(names, values)]
+    pairs += [f'{k}="{_escape(v)}"' for k, v in (extra or {}).items()]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self, extra: Dict[str, str]) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key, extra)} {value}"
+            for key, value in self._values.items()
+        ]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value: float, **labels):
+        """For totals kept elsewhere (cache/pacer stats) and copied in by a collector"""
+        self._values[self._key(labels)] = value
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., sum, count]
+        self._series: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self, extra: Dict[str, str]) -> List[str]:
+        lines = []
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (bound,), extra)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames + ("le",), key + ("+Inf",), extra)
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            base = _format_labels(self.labelnames, key, extra)
+            lines.append(f"{self.name}_sum{base} {series[-2]}")
+            lines.append(f"{self.name}_count{base} {series[-1]}")
+        return lines
+
+class Registry:
+    """Holds metrics; collectors copy stats from other components at render time"""
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _get(self, cls, name, documentation, labelnames=(), **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self, const_labels: Optional[Dict[str, str]] = None) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.error(f"❌ Metrics collector failed: {e}")
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples(const_labels or {}))
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# Shared metrics used across modules
+TRANSFER_BYTES = registry.counter(
+    "devgagan_transfer_bytes_total", "Bytes moved per direction and client path", ("direction", "client")
+)
+TRANSFER_SECONDS = registry.histogram(
+    "devgagan_transfer_duration_seconds", "Time a transfer held its slot", ("direction", "client")
+)
+JOB_SECONDS = registry.histogram(
+    "devgagan_job_duration_seconds", "End-to-end job duration", ("kind", "status")
+)
+MONGO_SECONDS = registry.histogram(
+    "devgagan_mongo_duration_seconds", "MongoDB call latency", ("op",), buckets=FAST_BUCKETS
+)
+CACHE_HITS = registry.counter("devgagan_cache_hits_total", "Cache hits", ("cache",))
+CACHE_MISSES = registry.counter("devgagan_cache_misses_total", "Cache misses", ("cache",))
+
+def export_cache(name: str, stats: Dict[str, int]):
+    """Copy a cache's hits/misses counters into the registry"""
+    CACHE_HITS.set_total(stats.get("hits", 0), cache=name)
+    CACHE_MISSES.set_total(stats.get("misses", 0), cache=name)
+
+def timed_job(kind: str):
+    """Decorator for job coroutines: False means failed, an exception means error"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            start, status = time.perf_counter(), "error"
+            try:
+                result = await func(*args, **kwargs)
+                status = "failed" if result is False else "ok"
+                return result
+            finally:
+                JOB_SECONDS.observe(time.perf_counter() - start, kind=kind, status=status)
+        return wrapper
+    return decorator
+
+class MetricsExporter:
+    """
+    The bot and the Flask app are separate processes, so each bot process
+    writes <METRICS_DIR>/<name>.prom atomically and app.py's /metrics merges
+    the files.
+    """
+    def __init__(self, directory: str = METRICS_DIR, name: str = "bot", interval: float = METRICS_INTERVAL):
+        self.directory = directory
+        self.name = name
+        self.interval = interval
+        self.path = os.path.join(directory, f"{name}.prom")
+
+    def write(self):
+        os.makedirs(self.directory, exist_ok=True)
+        text = registry.render({"process": self.name})
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, self.path)
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.write)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Metrics export failed: {e}")
+            await asyncio.sleep(self.interval)
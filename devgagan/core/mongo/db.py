@@ -13,8 +13,9 @@
 # ---------------------------------------------------
 
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from config import MONGO_DB
+from devgagan.core.metrics import MONGO_SECONDS
 from motor.motor_asyncio import AsyncIOMotorClient as MongoCli
 
 # Configure logging
@@ -28,11 +29,13 @@ class DatabaseManager:
         self.mongo_client = MongoCli(mongo_uri)
         self.db = self.mongo_client.user_data
         self.users_collection = self.db.users_data_db
+        self.peers_collection = self.db.user_peers
         
     async def get_user_data(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get user data from database."""
         try:
-            return await self.users_collection.find_one({"_id": user_id})
+            with MONGO_SECONDS.time(op="find_one"):
+                return await self.users_collection.find_one({"_id": user_id})
         except Exception as e:
             logger.error(f"Error getting user data for user_id {user_id}: {e}")
             return None
@@ -185,6 +188,41 @@ class DatabaseManager:
         """Delete the session associated with the given user_id from the database."""
         return await self.remove_field(user_id, "session")
 
+    async def get_peers(self, user_id: int) -> List[Tuple]:
+        """Get the userbot's saved peers as (id, access_hash, type, username, phone_number)."""
+        try:
+            with MONGO_SECONDS.time(op="find_one"):
+                doc = await self.peers_collection.find_one({"_id": user_id})
+            return [(int(peer_id), *values) for peer_id, values in (doc or {}).get("peers", {}).items()]
+        except Exception as e:
+            logger.error(f"Error getting peers for user_id {user_id}: {e}")
+            return []
+    
+    async def save_peers(self, user_id: int, peers: List[Tuple]) -> bool:
+        """Upsert changed peers in one write."""
+        if not peers:
+            return True
+        try:
+            with MONGO_SECONDS.time(op="update_one"):
+                await self.peers_collection.update_one(
+                    {"_id": user_id},
+                    {"$set": {f"peers.{peer[0]}": list(peer[1:]) for peer in peers}},
+                    upsert=True
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Error saving peers for user_id {user_id}: {e}")
+            return False
+    
+    async def remove_peers(self, user_id: int) -> bool:
+        """Forget the userbot's saved peers."""
+        try:
+            await self.peers_collection.delete_one({"_id": user_id})
+            return True
+        except Exception as e:
+            logger.error(f"Error removing peers for user_id {user_id}: {e}")
+            return False
+
 # Initialize database manager
 db_manager = DatabaseManager(MONGO_DB)
 
@@ -247,4 +285,16 @@ async def remove_channel(user_id: int) -> bool:
 
 async def delete_session(user_id: int) -> bool:
     """Delete the session associated with the given user_id from the database."""
-    return await db_manager.delete_session(user_id)
\ No newline at end of file
+    return await db_manager.delete_session(user_id)
+
+async def get_peers(user_id: int) -> List[Tuple]:
+    """Get the userbot's saved peers."""
+    return await db_manager.get_peers(user_id)
+
+async def save_peers(user_id: int, peers: List[Tuple]) -> bool:
+    """Upsert changed userbot peers."""
+    return await db_manager.save_peers(user_id, peers)
+
+async def remove_peers(user_id: int) -> bool:
+    """Forget the userbot's saved peers."""
+    return await db_manager.remove_peers(user_id)
@@ -0,0 +1,94 @@
+# ---------------------------------------------------
+# File Name: media_cache_db.py
+# Description: Uploaded yt-dlp results (Telegram file ids) with auto-expiry
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import datetime
+import logging
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient as MongoCli
+
+from config import MONGO_DB
+from devgagan.core.metrics import MONGO_SECONDS
+
+logger = logging.getLogger(__name__)
+
+mongo = MongoCli(MONGO_DB)
+db = mongo.media_cache
+media_db = db.ytdl_results
+
+_indexed = False
+
+async def _ensure_indexes():
+    """TTL on expires_at, plus the URL lookup; created once per process"""
+    global _indexed
+    if _indexed:
+        return
+    await media_db.create_index("expires_at", expireAfterSeconds=0)
+    await media_db.create_index([("urls", 1), ("variant", 1)])
+    _indexed = True
+
+def _live(query: Dict[str, Any]) -> Dict[str, Any]:
+    # The TTL monitor only runs every minute; don't serve what it hasn't reaped yet
+    return {**query, "expires_at": {"$gt": datetime.datetime.utcnow()}}
+
+async def get_result(key: str) -> Optional[Dict[str, Any]]:
+    """Cached upload for extractor_key:id:variant"""
+    try:
+        with MONGO_SECONDS.time(op="find_one"):
+            return await media_db.find_one(_live({"_id": key}))
+    except Exception as e:
+        logger.error(f"Error reading media cache {key}: {e}")
+        return None
+
+async def get_result_by_url(url: str, variant: str) -> Optional[Dict[str, Any]]:
+    """Cached upload for a URL seen before (skips extraction)"""
+    try:
+        with MONGO_SECONDS.time(op="find_one"):
+            return await media_db.find_one(_live({"urls": url, "variant": variant}))
+    except Exception as e:
+        logger.error(f"Error reading media cache for {url}: {e}")
+        return None
+
+async def save_result(key: str, url: str, variant: str, media: Dict[str, Any], ttl: int) -> bool:
+    """Upsert the uploaded document; each URL it was requested under is remembered"""
+    try:
+        await _ensure_indexes()
+        now = datetime.datetime.utcnow()
+        with MONGO_SECONDS.time(op="update_one"):
+            await media_db.update_one(
+                {"_id": key},
+                {
+                    "$set": {**media, "variant": variant, "expires_at": now + datetime.timedelta(seconds=ttl)},
+                    "$setOnInsert": {"created_at": now},
+                    "$addToSet": {"urls": url},
+                },
+                upsert=True
+            )
+        return True
+    except Exception as e:
+        logger.error(f"Error saving media cache {key}: {e}")
+        return False
+
+async def add_url(key: str, url: str) -> bool:
+    """Another URL form (youtu.be, shorts, mobile) resolved to a cached result"""
+    try:
+        with MONGO_SECONDS.time(op="update_one"):
+            await media_db.update_one({"_id": key}, {"$addToSet": {"urls": url}})
+        return True
+    except Exception as e:
+        logger.error(f"Error adding URL to media cache {key}: {e}")
+        return False
+
+async def remove_result(key: str) -> bool:
+    """Drop an entry Telegram no longer accepts"""
+    try:
+        await media_db.delete_one({"_id": key})
+        return True
+    except Exception as e:
+        logger.error(f"Error removing media cache {key}: {e}")
+        return False
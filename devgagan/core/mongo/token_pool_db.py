@@ -0,0 +1,112 @@
+# ---------------------------------------------------
+# File Name: token_pool_db.py
+# Description: Pre-shortened /token links and the tokens users are verifying with
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import datetime
+import logging
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient as MongoCli
+from pymongo.errors import BulkWriteError
+
+from config import MONGO_DB
+from devgagan.core.metrics import MONGO_SECONDS
+
+logger = logging.getLogger(__name__)
+
+mongo = MongoCli(MONGO_DB)
+db = mongo.telegram_bot
+pool_db = db.token_pool  # _id = param, short_url, expires_at: not handed out yet
+pending_db = db.pending_tokens  # _id = user_id, param, expires_at: handed out, not verified yet
+
+_indexed = False
+
+async def _ensure_indexes():
+    """TTL on both collections; created once per process"""
+    global _indexed
+    if _indexed:
+        return
+    await pool_db.create_index("expires_at", expireAfterSeconds=0)
+    await pending_db.create_index("expires_at", expireAfterSeconds=0)
+    _indexed = True
+
+def _live(query: Dict[str, Any], margin: int = 0) -> Dict[str, Any]:
+    # The TTL monitor only runs every minute; don't hand out what it hasn't reaped yet
+    cutoff = datetime.datetime.utcnow() + datetime.timedelta(seconds=margin)
+    return {**query, "expires_at": {"$gt": cutoff}}
+
+async def pool_size(margin: int = 0) -> int:
+    """Unclaimed links left with more than `margin` seconds to live"""
+    try:
+        with MONGO_SECONDS.time(op="count"):
+            return await pool_db.count_documents(_live({}, margin))
+    except Exception as e:
+        logger.error(f"Error counting token pool: {e}")
+        return 0
+
+async def add_tokens(tokens: List[Dict[str, Any]]) -> int:
+    """Insert {_id: param, short_url, expires_at} docs; returns how many landed"""
+    if not tokens:
+        return 0
+    try:
+        await _ensure_indexes()
+        with MONGO_SECONDS.time(op="insert_many"):
+            result = await pool_db.insert_many(tokens, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        return e.details.get("nInserted", 0)  # Param collisions are skipped
+    except Exception as e:
+        logger.error(f"Error filling token pool: {e}")
+        return 0
+
+async def claim_token(user_id: int, verify_ttl: int) -> Optional[Dict[str, Any]]:
+    """
+    Take one link out of the pool (atomic across shards) and make it the
+    user's pending token for `verify_ttl` seconds. Links that would lapse
+    sooner are skipped; of the rest the oldest goes first.
+    """
+    try:
+        with MONGO_SECONDS.time(op="find_one_and_delete"):
+            token = await pool_db.find_one_and_delete(
+                _live({}, verify_ttl), sort=[("expires_at", 1)]
+            )
+        if not token:
+            return None
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=verify_ttl)
+        if not await set_pending(user_id, token["_id"], expires_at):
+            # A link nobody can verify is useless to the user: put it back, the caller shortens one itself
+            await add_tokens([token])
+            return None
+        return token
+    except Exception as e:
+        logger.error(f"Error claiming token for {user_id}: {e}")
+        return None
+
+async def set_pending(user_id: int, param: str, expires_at: datetime.datetime) -> bool:
+    """The user's current token; a newer /token replaces it"""
+    try:
+        await _ensure_indexes()
+        with MONGO_SECONDS.time(op="update_one"):
+            await pending_db.update_one(
+                {"_id": user_id},
+                {"$set": {"param": param, "expires_at": expires_at}},
+                upsert=True
+            )
+        return True
+    except Exception as e:
+        logger.error(f"Error saving pending token for {user_id}: {e}")
+        return False
+
+async def consume_pending(user_id: int, param: str) -> bool:
+    """True (and the token used up) if param is the user's live pending token"""
+    try:
+        with MONGO_SECONDS.time(op="find_one_and_delete"):
+            token = await pending_db.find_one_and_delete(_live({"_id": user_id, "param": param}))
+        return token is not None
+    except Exception as e:
+        logger.error(f"Error verifying token for {user_id}: {e}")
+        return False
@@ -0,0 +1,166 @@
+# ---------------------------------------------------
+# File Name: pacer.py
+# Description: FloodWait-driven pacing for Telegram API calls
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from devgagan.core.metrics import registry
+
+# method -> (max calls, per seconds), per key (chat). Telegram's documented
+# bot limits: ~1 message/s per chat and ~30 messages/s overall.
+DEFAULT_WINDOWS: Dict[str, Tuple[int, float]] = {
+    "send": (3, 3.0),
+    "edit": (1, 3.0),
+    "get_messages": (30, 1.0),
+}
+
+def _chat_key(key: Any) -> Any:
+    """One window per chat whether it comes as -100123, "-100123" or "-100123/7" (topic)"""
+    if isinstance(key, str):
+        try:
+            return int(key.split("/", 1)[0])
+        except ValueError:
+            return key  # @username
+    return key
+
+@dataclass
+class MethodState:
+    blocked_until: float = 0.0  # Set by FloodWait, applies to every key
+    delay: float = 0.0  # Extra spacing, grows on FloodWait, decays on success
+    last_call: float = 0.0
+    successes: int = 0
+    calls: int = 0
+    flood_waits: int = 0
+    waited: float = 0.0
+    windows: Dict[Any, Deque[float]] = field(default_factory=lambda: defaultdict(deque))
+    swept: float = 0.0  # Last sweep of windows for chats not called since
+
+class AdaptivePacer:
+    """Runs calls as fast as Telegram allows; backs off only when told to"""
+    def __init__(
+        self,
+        windows: Optional[Dict[str, Tuple[int, float]]] = None,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        decay_after: int = 20
+    ):
+        self.windows = dict(DEFAULT_WINDOWS if windows is None else windows)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.decay_after = decay_after
+        self._states: Dict[str, MethodState] = defaultdict(MethodState)
+
+    def _next_slot(self, method: str, key: Any, now: float) -> float:
+        """Earliest time a call may run (<= now means immediately)"""
+        state = self._states[method]
+        ready = max(state.blocked_until, state.last_call + state.delay)
+
+        window = self.windows.get(method)
+        stamps = state.windows.get(key)
+        if window and stamps:
+            max_calls, period = window
+            while stamps and stamps[0] <= now - period:
+                stamps.popleft()
+            if not stamps:
+                del state.windows[key]  # Chats come and go; don't keep one deque per chat ever seen
+            elif len(stamps) >= max_calls:
+                ready = max(ready, stamps[0] + period)
+        return ready
+
+    def _record(self, method: str, key: Any, now: float):
+        state = self._states[method]
+        state.calls += 1
+        state.last_call = now
+        window = self.windows.get(method)
+        if window:
+            state.windows[key].append(now)
+            period = window[1]
+            if now - state.swept > period:
+                # Chats that aren't called again never reach _next_slot's cleanup
+                state.swept = now
+                for stale in [k for k, stamps in state.windows.items() if stamps[-1] <= now - period]:
+                    del state.windows[stale]
+
+    async def wait(self, method: str, key: Any = None):
+        """Sleep until the next call of `method` (to `key`) is allowed, then claim it"""
+        key = _chat_key(key)
+        while True:
+            now = time.monotonic()
+            ready = self._next_slot(method, key, now)
+            if ready <= now:
+                self._record(method, key, now)
+                return
+            self._states[method].waited += ready - now
+            await asyncio.sleep(ready - now)
+
+    def try_acquire(self, method: str, key: Any = None) -> bool:
+        """Non-blocking variant for optional calls such as status edits"""
+        key = _chat_key(key)
+        now = time.monotonic()
+        if self._next_slot(method, key, now) > now:
+            return False
+        self._record(method, key, now)
+        return True
+
+    def on_flood_wait(self, method: str, seconds: float):
+        """Telegram told us to wait: block the method and double its spacing"""
+        state = self._states[method]
+        state.flood_waits += 1
+        state.successes = 0
+        state.blocked_until = max(state.blocked_until, time.monotonic() + seconds)
+        state.delay = min(max(state.delay * 2, self.base_backoff), self.max_backoff)
+
+    def on_flood_error(self, method: str, error: BaseException) -> str:
+        """
+        on_flood_wait for a caught FloodWait (Pyrogram's .value or Telethon's
+        .seconds), charged once however many layers catch the same error.
+        Returns the method it was charged to, for the retry to wait on.
+        """
+        charged = getattr(error, "pacer_method", None)
+        if charged is None:
+            seconds = getattr(error, "value", None) or getattr(error, "seconds", 0) or 0
+            self.on_flood_wait(method, float(seconds))
+            error.pacer_method = charged = method
+        return charged
+
+    def on_success(self, method: str):
+        """Halve the extra spacing after a run of clean calls"""
+        state = self._states[method]
+        state.successes += 1
+        if state.delay and state.successes >= self.decay_after:
+            state.successes = 0
+            state.delay = state.delay / 2 if state.delay / 2 >= self.base_backoff else 0.0
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        now = time.monotonic()
+        return {
+            method: {
+                "calls": state.calls,
+                "flood_waits": state.flood_waits,
+                "delay": round(state.delay, 2),
+                "blocked_for": round(max(state.blocked_until - now, 0), 1),
+                "waited": round(state.waited, 1),
+            }
+            for method, state in self._states.items()
+        }
+
+# Shared by the link, batch and upload paths
+pacer = AdaptivePacer()
+
+_FLOOD_WAITS = registry.counter("devgagan_flood_waits_total", "FloodWait errors per API method", ("method",))
+_PACER_WAITED = registry.counter("devgagan_pacer_wait_seconds_total", "Time spent waiting for a call slot", ("method",))
+
+def _collect():
+    for method, state in pacer.stats().items():
+        _FLOOD_WAITS.set_total(state["flood_waits"], method=method)
+        _PACER_WAITED.set_total(state["waited"], method=method)
+
+registry.add_collector(_collect)
@@ -0,0 +1,170 @@
+# ---------------------------------------------------
+# File Name: peer_cache.py
+# Description: Bounded TTL cache for resolved chats/channels
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+PeerRef = Union[str, int]
+
+class PeerResolutionError(Exception):
+    """Raised when a peer cannot be resolved (also served from the negative cache)"""
+
+def is_definitive(error: Exception) -> bool:
+    """
+    Errors that will still hold in a minute: the chat doesn't exist or we
+    can't see it. FloodWait, timeouts and dropped connections are not,
+    so they are neither cached nor wrapped.
+    """
+    from pyrogram.errors import ChannelInvalid, ChannelPrivate, PeerIdInvalid, UsernameInvalid, UsernameNotOccupied
+    return isinstance(error, (UsernameNotOccupied, UsernameInvalid, ChannelPrivate, ChannelInvalid, PeerIdInvalid))
+
+@dataclass
+class ResolvedPeer:
+    """Resolved chat: marked id + access hash, plus the client's own chat object"""
+    peer_id: int
+    access_hash: int = 0
+    username: Optional[str] = None
+    chat: Any = None
+
+    def telethon_input(self):
+        """InputPeer for Telethon, built from the cached access hash (no get_entity)"""
+        from telethon.tl.types import InputPeerChannel, InputPeerChat, InputPeerUser
+        if self.peer_id <= -1000000000000:
+            return InputPeerChannel(-self.peer_id - 1000000000000, self.access_hash)
+        if self.peer_id < 0:
+            return InputPeerChat(-self.peer_id)
+        return InputPeerUser(self.peer_id, self.access_hash)
+
+async def resolve_with_pyrogram(client, ref: PeerRef) -> ResolvedPeer:
+    """Resolve through a Pyrogram client; resolve_peer hits its local storage first"""
+    chat = await client.get_chat(ref)
+    raw = await client.resolve_peer(chat.id)
+    return ResolvedPeer(chat.id, getattr(raw, "access_hash", 0), getattr(chat, "username", None), chat)
+
+class PeerCache:
+    """
+    Maps username / -100 id -> ResolvedPeer per namespace.
+
+    Access hashes are only valid for the account that obtained them, so the
+    namespace is the account: "bot" is shared by the Pyrogram and Telethon
+    bot clients (same token), userbots get their own namespace.
+    """
+    def __init__(self, maxsize: int = 2048, ttl: float = 6 * 3600, negative_ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # key -> (expires_at, ResolvedPeer or error string)
+        self._entries: "OrderedDict[Tuple[str, PeerRef], Tuple[float, Union[ResolvedPeer, str]]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, PeerRef], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+
+    @staticmethod
+    def normalize(ref: PeerRef) -> PeerRef:
+        if isinstance(ref, int):
+            return ref
+        ref = str(ref).strip()
+        if ref.lstrip("-").isdigit():
+            return int(ref)
+        return "@" + ref.lstrip("@").lower()
+
+    def get(self, namespace: str, ref: PeerRef) -> Optional[ResolvedPeer]:
+        """Cached peer, None on miss; raises PeerResolutionError on a negative hit"""
+        key = (namespace, self.normalize(ref))
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        if isinstance(value, str):
+            self.negative_hits += 1
+            raise PeerResolutionError(value)
+        self.hits += 1
+        return value
+
+    def put(self, namespace: str, ref: PeerRef, peer: ResolvedPeer):
+        expires_at = time.monotonic() + self.ttl
+        self._store((namespace, self.normalize(ref)), expires_at, peer)
+        # Alias by id and username so "@name" and "-100..." share one entry
+        self._store((namespace, peer.peer_id), expires_at, peer)
+        if peer.username:
+            self._store((namespace, self.normalize(peer.username)), expires_at, peer)
+
+    def put_negative(self, namespace: str, ref: PeerRef, error: str):
+        self._store((namespace, self.normalize(ref)), time.monotonic() + self.negative_ttl, error or "unresolvable")
+
+    def invalidate(self, namespace: str, ref: PeerRef):
+        self._entries.pop((namespace, self.normalize(ref)), None)
+
+    def _store(self, key, expires_at: float, value):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def resolve(
+        self,
+        namespace: str,
+        ref: PeerRef,
+        resolver: Callable[[PeerRef], Awaitable[ResolvedPeer]]
+    ) -> ResolvedPeer:
+        """
+        Cached lookup; concurrent misses for the same peer share one resolver
+        call. Only definitive failures become PeerResolutionError (cached for
+        negative_ttl); anything else propagates unchanged and uncached.
+        """
+        peer = self.get(namespace, ref)
+        if peer is not None:
+            return peer
+
+        key = (namespace, self.normalize(ref))
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            peer = await resolver(key[1])
+        except Exception as e:
+            if not is_definitive(e):
+                # Transient: the caller (and the pacer) should see it as is, and the next try re-resolves
+                future.set_exception(e)
+                future.exception()
+                raise
+            self.put_negative(namespace, ref, str(e))
+            error = PeerResolutionError(str(e))
+            future.set_exception(error)
+            future.exception()  # waiters re-raise; don't warn if there are none
+            raise error from e
+        else:
+            self.put(namespace, ref, peer)
+            future.set_result(peer)
+            return peer
+        finally:
+            self._inflight.pop(key, None)
+            if not future.done():
+                # The resolving task was cancelled: waiters get a transient error, not a hang
+                future.set_exception(ConnectionError(f"resolving {key[1]} was cancelled"))
+                future.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "negative_hits": self.negative_hits,
+        }
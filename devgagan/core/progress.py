@@ -0,0 +1,152 @@
+# ---------------------------------------------------
+# File Name: progress.py
+# Description: One throttled progress message for yt-dlp downloads and Telethon uploads
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from telethon.errors import FloodWaitError, MessageNotModifiedError
+
+from config import YTDL_PROGRESS_INTERVAL
+from devgagan.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# phase -> (done bytes, total bytes or 0, bytes/s or None, eta seconds or None)
+PhaseState = Tuple[int, int, Optional[float], Optional[float]]
+
+PHASE_ICONS = {"download": "⬇️", "upload": "📤"}
+
+class ProgressReporter:
+    """
+    Owns one status message. yt-dlp's progress_hooks (hook, on a worker
+    thread) and Telethon's progress_callback (upload, on the loop) only record
+    the latest numbers; a single edit task turns them into at most one edit
+    per `interval`, skipping edits that wouldn't change the text. The thread
+    side hands over with call_soon_threadsafe, at most a few times a second,
+    and never waits on the loop.
+    """
+    def __init__(self, message, title: str, interval: float = 5.0):
+        self.message = message
+        self.title = title
+        self.interval = interval
+        self._loop = asyncio.get_running_loop()
+        self._phases: Dict[str, PhaseState] = {}
+        self._started: Dict[str, Tuple[float, int]] = {}  # phase -> (time, bytes) of its first report
+        self._task: Optional[asyncio.Task] = None
+        self._shown: Optional[str] = None
+        self._last_edit = 0.0
+        self._posted = 0.0  # Written from the worker thread only
+        self._closed = False
+
+    # ---------------- Producers ----------------
+
+    def hook(self, d: Dict[str, Any]):
+        """yt-dlp progress hook (runs on the yt-dlp worker thread)"""
+        status = d.get("status")
+        if status not in ("downloading", "finished"):
+            return
+        now = time.monotonic()
+        if status == "downloading" and now - self._posted < 0.5:
+            return  # yt-dlp calls this per block; the loop only needs the latest now and then
+        self._posted = now
+        done = d.get("downloaded_bytes") or 0
+        total = d.get("total_bytes") or d.get("total_bytes_estimate") or 0
+        if status == "finished":
+            total = done = total or done
+        state = (int(done), int(total), d.get("speed"), d.get("eta"))
+        try:
+            self._loop.call_soon_threadsafe(self._record, "download", state)
+        except RuntimeError:
+            pass  # Loop already closed (shutdown mid-download)
+
+    def upload(self, current: int, total: int):
+        """Telethon progress_callback (runs on the loop)"""
+        now = time.monotonic()
+        started, base = self._started.setdefault("upload", (now, current))
+        elapsed = now - started
+        speed = (current - base) / elapsed if elapsed >= 1 else None
+        eta = (total - current) / speed if speed and total else None
+        self._record("upload", (current, total, speed, eta))
+
+    # ---------------- Consumer ----------------
+
+    def _record(self, phase: str, state: PhaseState):
+        if self._closed:
+            return
+        self._phases[phase] = state
+        _UPDATES.inc()
+        if self._task is None or self._task.done():
+            self._task = self._loop.create_task(self._flush())
+
+    async def _flush(self):
+        wait = self._last_edit + self.interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)  # Updates meanwhile only overwrite _phases
+        await self._edit(self.render())
+
+    async def _edit(self, text: str):
+        if text == self._shown:
+            return
+        try:
+            await self.message.edit(text)
+            self._shown = text
+            _EDITS.inc()
+        except MessageNotModifiedError:
+            self._shown = text
+        except FloodWaitError as e:
+            # Skip this one; the next edit waits out the flood wait
+            self._last_edit = time.monotonic() + e.seconds
+            return
+        except Exception as e:
+            logger.debug(f"Progress edit failed: {e}")
+        self._last_edit = time.monotonic()
+
+    async def status(self, text: str, title: Optional[str] = None):
+        """Replace the bars with a plain status line right away; `title` heads the next bars"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._phases.clear()
+        self._started.clear()
+        if title:
+            self.title = title
+        await self._edit(text)
+
+    def render(self) -> str:
+        lines = ["╭──────────────────╮", f"│ **__{self.title}__**", "├──────────────────"]
+        for phase, (done, total, speed, eta) in self._phases.items():
+            icon = PHASE_ICONS.get(phase, "•")
+            if total:
+                percent = min(done / total * 100, 100)
+                bar = "█" * int(percent // 10) + "░" * (10 - int(percent // 10))
+                lines.append(f"│ {icon} {bar} {percent:.1f}%")
+                lines.append(f"│ **__Done:__** {done / 1024**2:.1f} MB / {total / 1024**2:.1f} MB")
+            else:
+                lines.append(f"│ {icon} **__Done:__** {done / 1024**2:.1f} MB")
+            details = []
+            if speed:
+                details.append(f"**__Speed:__** {speed / 1024**2:.1f} MB/s")
+            if eta:
+                details.append(f"**__ETA:__** {eta / 60:.1f} min")
+            if details:
+                lines.append("│ " + " | ".join(details))
+        lines.append("╰──────────────────╯")
+        return "\n".join(lines)
+
+    def close(self):
+        """Stop editing (before the message is deleted or reused)"""
+        self._closed = True
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+def progress_reporter(message, title: str) -> ProgressReporter:
+    return ProgressReporter(message, title, YTDL_PROGRESS_INTERVAL)
+
+_UPDATES = registry.counter("devgagan_progress_updates_total", "Progress reports received from downloads and uploads")
+_EDITS = registry.counter("devgagan_progress_edits_total", "Progress message edits actually sent")
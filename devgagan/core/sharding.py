@@ -0,0 +1,263 @@
+# ---------------------------------------------------
+# File Name: sharding.py
+# Description: Front process routes raw updates to worker processes by user
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import pickle
+import queue
+import sys
+import threading
+import time
+from multiprocessing.connection import Client as Connect, Listener
+from typing import Dict, List, Optional
+
+from config import BOT_TOKEN, SHARDS, SHARD_INDEX, SHARD_SOCKET
+from devgagan.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# An update crosses the socket pickled. Not as TL bytes: Pyrogram reads an
+# absent flagged vector back as [] but write() keys the flag on truthiness and
+# the body on `is not None`, so re-serializing a parsed update corrupts it.
+Payload = bytes
+
+def is_front() -> bool:
+    return SHARDS > 1 and SHARD_INDEX < 0
+
+def is_worker() -> bool:
+    return SHARD_INDEX >= 0
+
+def shard_for(user_id: Optional[int], shards: int) -> int:
+    """Stable user -> shard; updates without a user go to shard 0"""
+    return user_id % shards if user_id else 0
+
+def update_user_id(update) -> Optional[int]:
+    """The user an update belongs to: callback/inline query sender or message author"""
+    user_id = getattr(update, "user_id", None)
+    if user_id:
+        return user_id
+    message = getattr(update, "message", None)
+    for peer in (getattr(message, "from_id", None), getattr(message, "peer_id", None)):
+        if getattr(peer, "user_id", None):
+            return peer.user_id
+    return None
+
+def encode(update, users: Dict, chats: Dict) -> Payload:
+    return pickle.dumps((update, users, chats), protocol=pickle.HIGHEST_PROTOCOL)
+
+def decode(payload: Payload):
+    # Only the front (authenticated with the bot token) writes to the socket
+    return pickle.loads(payload)
+
+def _authkey() -> bytes:
+    # Both sides know the bot token; nothing else on the box can feed us updates
+    return hashlib.sha256((BOT_TOKEN or "").encode()).digest()
+
+def worker_share(value: int, shards: int = SHARDS) -> int:
+    """A box-wide limit split across workers (rounded up, at least 1)"""
+    return max(1, math.ceil(value / shards)) if value else value
+
+def apply_worker_share(shards: int = SHARDS):
+    """
+    Split the box-wide transfer, disk, memory and CPU limits between workers.
+    Per-user limits stay as they are: every job of a user lands on one worker.
+    """
+    from devgagan.core.disk import disk_budget
+    from devgagan.core.media_pool import media_pool
+    from devgagan.core.memory import memory_guard
+    from devgagan.core.transfers import transfer_scheduler
+
+    transfer_scheduler.max_slots = worker_share(transfer_scheduler.max_slots, shards)
+    transfer_scheduler.max_rate = worker_share(transfer_scheduler.max_rate, shards)
+    disk_budget._budget = worker_share(disk_budget.budget, shards)
+    memory_guard._budget = worker_share(memory_guard.budget, shards)
+    media_pool.workers = worker_share(media_pool.workers, shards)
+
+class ShardRouter:
+    """
+    Front side: runs the workers (`python -m devgagan` with SHARD_INDEX set),
+    accepts their connections on a unix socket and forwards each update to
+    the worker owning its user. Updates for a worker that is restarting are
+    kept in its outbox and delivered once it reconnects.
+    """
+    def __init__(self, shards: int = SHARDS, address: str = SHARD_SOCKET, max_backoff: float = 60):
+        self.shards = shards
+        self.address = address
+        self.max_backoff = max_backoff
+        self.outboxes = [queue.SimpleQueue() for _ in range(shards)]
+        self.conns: List[Optional[object]] = [None] * shards
+        self._connected = [threading.Event() for _ in range(shards)]
+        self.processes: Dict[int, asyncio.subprocess.Process] = {}
+        self.routed = [0] * shards
+        self.restarts = [0] * shards
+        self._listener: Optional[Listener] = None
+        self._keepers: List[asyncio.Task] = []
+        self._stopping = False
+
+    async def route(self, client, update, users, chats):
+        """RawUpdateHandler callback"""
+        index = shard_for(update_user_id(update), self.shards)
+        self.outboxes[index].put(encode(update, users, chats))
+        self.routed[index] += 1
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+                index = conn.recv()
+                if not isinstance(index, int) or not 0 <= index < self.shards:
+                    raise ValueError(f"bad shard index {index!r}")
+            except (OSError, EOFError):
+                if self._listener is None:
+                    return
+                continue
+            except Exception as e:
+                logger.warning(f"⚠️ Rejected shard connection: {e}")
+                continue
+            self.conns[index] = conn
+            self._connected[index].set()
+            logger.info(f"🔀 Shard {index} connected")
+
+    def _send_loop(self, index: int):
+        outbox = self.outboxes[index]
+        while True:
+            payload = outbox.get()
+            if payload is None:
+                return
+            while True:
+                self._connected[index].wait()
+                conn = self.conns[index]
+                try:
+                    conn.send_bytes(payload)
+                    break
+                except (OSError, EOFError, ValueError, AttributeError):
+                    # Worker went away; hold the update until its replacement connects
+                    if self.conns[index] is conn:
+                        self.conns[index] = None
+                        self._connected[index].clear()
+
+    async def _spawn(self, index: int) -> asyncio.subprocess.Process:
+        env = {**os.environ, "SHARD_INDEX": str(index)}
+        return await asyncio.create_subprocess_exec(sys.executable, "-m", "devgagan", env=env)
+
+    async def _keep_alive(self, index: int):
+        backoff = 1
+        while not self._stopping:
+            started = time.monotonic()
+            process = self.processes[index] = await self._spawn(index)
+            code = await process.wait()
+            if self._stopping:
+                return
+            if time.monotonic() - started > self.max_backoff:
+                backoff = 1  # It ran fine for a while; this is a fresh failure
+            self.restarts[index] += 1
+            logger.error(f"❌ Shard {index} exited with code {code}; restarting in {backoff}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def run(self):
+        """Listen, start every worker and restart any that exit"""
+        if os.path.exists(self.address):
+            os.remove(self.address)  # Left by a previous front
+        self._listener = Listener(self.address, family="AF_UNIX", authkey=_authkey())
+        threading.Thread(target=self._accept_loop, name="shard-accept", daemon=True).start()
+        for index in range(self.shards):
+            threading.Thread(target=self._send_loop, args=(index,), name=f"shard-send-{index}", daemon=True).start()
+        self._keepers = [asyncio.create_task(self._keep_alive(index)) for index in range(self.shards)]
+        await asyncio.gather(*self._keepers)
+
+    async def stop(self):
+        # No respawns from here on: a worker exiting below must stay down
+        self._stopping = True
+        for task in self._keepers:
+            task.cancel()
+        await asyncio.gather(*self._keepers, return_exceptions=True)
+        for process in self.processes.values():
+            if process.returncode is None:
+                process.terminate()
+        await asyncio.gather(*(asyncio.wait_for(p.wait(), 30) for p in self.processes.values()), return_exceptions=True)
+        listener, self._listener = self._listener, None
+        if listener:
+            listener.close()
+        for index, outbox in enumerate(self.outboxes):
+            outbox.put(None)  # Ends its send thread
+            conn, self.conns[index] = self.conns[index], None
+            self._connected[index].clear()
+            if conn:
+                conn.close()
+
+    def stats(self) -> Dict[int, Dict[str, int]]:
+        return {
+            index: {
+                "connected": int(self._connected[index].is_set()),
+                "routed": self.routed[index],
+                "backlog": self.outboxes[index].qsize(),
+                "restarts": self.restarts[index],
+            }
+            for index in range(self.shards)
+        }
+
+class ShardWorker:
+    """Worker side: feeds updates from the front into this process's dispatcher"""
+    def __init__(self, index: int = SHARD_INDEX, address: str = SHARD_SOCKET):
+        self.index = index
+        self.address = address
+        self.received = 0
+
+    @staticmethod
+    def _start_dispatcher(client):
+        # Worker clients run with no_updates (Telegram sends updates to the
+        # front only), so Pyrogram doesn't start the handler tasks itself
+        dispatcher = client.dispatcher
+        for _ in range(client.workers):
+            dispatcher.locks_list.append(asyncio.Lock())
+            dispatcher.handler_worker_tasks.append(
+                client.loop.create_task(dispatcher.handler_worker(dispatcher.locks_list[-1]))
+            )
+
+    async def run(self, client):
+        """Returns when the front goes away"""
+        self._start_dispatcher(client)
+        conn = await asyncio.to_thread(Connect, self.address, family="AF_UNIX", authkey=_authkey())
+        conn.send(self.index)
+        logger.info(f"🔀 Shard {self.index} receiving updates")
+        try:
+            while True:
+                try:
+                    payload = await asyncio.to_thread(conn.recv_bytes)
+                except (EOFError, OSError):
+                    logger.warning(f"⚠️ Shard {self.index}: front disconnected")
+                    return
+                update, users, chats = decode(payload)
+                # What Client.handle_updates would have done: learn the peers first
+                await client.fetch_peers([*users.values(), *chats.values()])
+                client.dispatcher.updates_queue.put_nowait((update, users, chats))
+                self.received += 1
+        finally:
+            conn.close()
+
+router = ShardRouter() if is_front() else None
+
+_CONNECTED = registry.gauge("devgagan_shard_connected", "1 while the worker is connected to the front", ("shard",))
+_ROUTED = registry.counter("devgagan_shard_updates_total", "Updates routed to each worker", ("shard",))
+_BACKLOG = registry.gauge("devgagan_shard_backlog", "Updates waiting for a (re)connecting worker", ("shard",))
+_RESTARTS = registry.counter("devgagan_shard_restarts_total", "Worker process restarts", ("shard",))
+
+def _collect():
+    if router is None:
+        return
+    for index, data in router.stats().items():
+        _CONNECTED.set(data["connected"], shard=str(index))
+        _ROUTED.set_total(data["routed"], shard=str(index))
+        _BACKLOG.set(data["backlog"], shard=str(index))
+        _RESTARTS.set_total(data["restarts"], shard=str(index))
+
+registry.add_collector(_collect)
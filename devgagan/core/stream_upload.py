@@ -0,0 +1,215 @@
+# ---------------------------------------------------
+# File Name: stream_upload.py
+# Description: Upload a file to Telegram while it is still being downloaded
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+from typing import Any, Callable, Dict, Optional, Set
+
+from telethon.errors import FloodWaitError
+from telethon.helpers import generate_random_long
+from telethon.tl.functions.upload import SaveBigFilePartRequest
+from telethon.tl.types import InputFileBig
+
+from config import STREAM_UPLOAD_PARALLEL
+from devgagan.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+PART_SIZE = 512 * 1024  # Telegram's largest part; every part but the last must be this size
+BIG_FILE_SIZE = 10 * 1024 * 1024  # saveBigFilePart is for files above this (Telethon switches here too)
+
+def is_progressive(info: Dict[str, Any]) -> bool:
+    """One file written front to back over plain HTTP: nothing to merge or remux after"""
+    if not info or info.get("requested_formats") or info.get("_type", "video") != "video":
+        return False
+    return info.get("protocol") in ("http", "https")
+
+_FALLOC_FL_KEEP_SIZE = 0x01
+_FALLOC_FL_PUNCH_HOLE = 0x02
+_libc = None
+
+def _punch_hole(fd: int, offset: int, length: int):
+    """Give uploaded bytes back to the filesystem (Linux); silently a no-op elsewhere"""
+    global _libc
+    try:
+        if _libc is None:
+            _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            _libc.fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong]
+        _libc.fallocate(fd, _FALLOC_FL_PUNCH_HOLE | _FALLOC_FL_KEEP_SIZE, offset, length)
+    except (OSError, AttributeError, TypeError):
+        _libc = False
+
+async def _on_fd(func: Callable, fd: int, *args):
+    """
+    func(fd, ...) in a thread. A cancelled caller still waits for the thread
+    to return, so once the task is done nothing touches fd any more.
+    """
+    future = asyncio.ensure_future(asyncio.to_thread(func, fd, *args))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        await asyncio.gather(future, return_exceptions=True)
+        raise
+
+class StreamingUpload:
+    """
+    Tails a file that another writer (yt-dlp with nopart) is appending to and
+    sends each complete 512KB part with upload.saveBigFilePart as soon as it
+    lands, with file_total_parts=-1 until finish() says the file is complete
+    (Telegram's streamed upload). The result is an InputFileBig ready for
+    send_file, so delivery ends shortly after the download does.
+
+    If the writer starts over (the server refused to resume and the file
+    shrank) the upload restarts under a new file id. With release_disk,
+    uploaded parts are punched out of the file so it never holds much more
+    than the parts in flight; don't read the file afterwards, and a restart
+    is an error since holes may already be punched in the new data.
+    """
+    def __init__(self, client, path: str, name: Optional[str] = None, parallel: int = 4,
+                 release_disk: bool = False, progress: Optional[Callable] = None, poll: float = 0.25):
+        self.client = client
+        self.path = path
+        self.name = name or os.path.basename(path)
+        self.parallel = parallel
+        self.release_disk = release_disk
+        self.progress = progress
+        self.poll = poll
+        self.file_id = generate_random_long()
+        self.parts = 0
+        self.uploaded = 0
+        self.restarts = 0
+        self._done = asyncio.Event()
+        self._failed = False
+        self._error: Optional[BaseException] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self._slots = asyncio.Semaphore(parallel)
+
+    def finish(self):
+        """The writer is done; send the tail with the real part count"""
+        self._done.set()
+
+    def abort(self):
+        """The writer failed; run() raises instead of returning a file"""
+        self._failed = True
+        self._done.set()
+
+    async def _save_part(self, fd: int, file_id: int, index: int, total: int, size: int):
+        try:
+            data = await _on_fd(os.pread, fd, size, index * PART_SIZE)
+            for attempt in range(5):
+                try:
+                    await self.client(SaveBigFilePartRequest(file_id, index, total, data))
+                    break
+                except FloodWaitError as e:
+                    last_error, delay = e, e.seconds
+                except (ConnectionError, asyncio.TimeoutError) as e:
+                    last_error, delay = e, 2 ** attempt
+                if attempt < 4:
+                    await asyncio.sleep(delay)
+            else:
+                # Never saved: it must not count as uploaded (or be punched out of the file)
+                raise last_error
+            if file_id != self.file_id:
+                return  # Superseded by a restart
+            if self.release_disk:
+                await _on_fd(_punch_hole, fd, index * PART_SIZE, size)
+            self.uploaded += size
+            _BYTES.inc(size)
+            if self.progress:
+                result = self.progress(self.uploaded, max(self.uploaded, os.fstat(fd).st_size))
+                if asyncio.iscoroutine(result):
+                    await result
+        except Exception as e:
+            self._error = self._error or e
+        finally:
+            self._slots.release()
+
+    def _raise_error(self):
+        if self._error:
+            raise self._error
+
+    async def _submit(self, fd: int, index: int, total: int, size: int):
+        await self._slots.acquire()
+        if self._error:
+            self._slots.release()
+            self._raise_error()
+        task = asyncio.create_task(self._save_part(fd, self.file_id, index, total, size))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _drain(self):
+        if self._inflight:
+            await asyncio.gather(*self._inflight)
+        self._raise_error()
+
+    async def run(self) -> InputFileBig:
+        """Returns once every part is on Telegram's side"""
+        while not os.path.exists(self.path):
+            if self._done.is_set():
+                raise FileNotFoundError(self.path)
+            await asyncio.sleep(self.poll)
+        fd = os.open(self.path, os.O_RDWR if self.release_disk else os.O_RDONLY)
+        try:
+            sent = 0  # Bytes handed to _save_part
+            while not self._done.is_set():
+                size = os.fstat(fd).st_size
+                if size < sent:
+                    # Writer truncated and started over: the parts we sent are stale
+                    if self.release_disk:
+                        raise RuntimeError(f"{self.name} restarted by the downloader after parts were released")
+                    logger.warning(f"⚠️ {self.name} restarted by the downloader; restarting upload")
+                    await self._drain()
+                    self.file_id = generate_random_long()
+                    sent = self.uploaded = 0
+                    self.restarts += 1
+                # Keep one part back: it may turn out to be the last, which must carry the total
+                while size - sent > PART_SIZE:
+                    await self._submit(fd, sent // PART_SIZE, -1, PART_SIZE)
+                    sent += PART_SIZE
+                try:
+                    await asyncio.wait_for(self._done.wait(), self.poll)
+                except asyncio.TimeoutError:
+                    pass
+            if self._failed:
+                raise RuntimeError("download failed")
+
+            size = os.fstat(fd).st_size
+            if size < sent or size == 0:
+                raise RuntimeError(f"{self.name} shrank to {size} bytes after finishing")
+            if size <= BIG_FILE_SIZE:
+                raise RuntimeError(f"{self.name} is {size} bytes, too small for a big-file upload")
+            self.parts = -(-size // PART_SIZE)
+            while sent < size:
+                await self._submit(fd, sent // PART_SIZE, self.parts, min(PART_SIZE, size - sent))
+                sent += PART_SIZE
+            await self._drain()
+            return InputFileBig(self.file_id, self.parts, self.name)
+        finally:
+            for task in self._inflight:
+                task.cancel()
+            # The fd number is reused once closed: no part may still read or punch through it
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+            os.close(fd)
+
+_BYTES = registry.counter("devgagan_stream_upload_bytes_total", "Bytes uploaded while their download was still running")
+
+async def stream_while_downloading(client, path: str, download: Callable[[], Any], **kwargs) -> InputFileBig:
+    """Run download() and a StreamingUpload of its output side by side"""
+    upload = StreamingUpload(client, path, parallel=STREAM_UPLOAD_PARALLEL, **kwargs)
+    uploading = asyncio.create_task(upload.run())
+    try:
+        await download()
+    except BaseException:
+        upload.abort()
+        await asyncio.gather(uploading, return_exceptions=True)
+        raise
+    upload.finish()
+    return await uploading
@@ -0,0 +1,185 @@
+# ---------------------------------------------------
+# File Name: supervisor.py
+# Description: Parallel client startup, health pings and reconnect with backoff
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import CLIENT_PING_INTERVAL, CLIENT_PING_TIMEOUT, CLIENT_RECONNECT_MAX
+from devgagan.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class SupervisedClient:
+    name: str
+    client: Any
+    kind: str  # "pyrogram" or "telethon"
+    start: Callable[[], Awaitable[Any]]
+    required: bool = False
+    available: bool = False
+    failures: int = 0
+    reconnects: int = 0
+    latency: float = 0.0
+    last_ok: float = 0.0
+    last_error: str = ""
+    retry_at: float = 0.0
+    reconnecting: Optional[asyncio.Task] = field(default=None, repr=False)
+
+async def _ping(entry: SupervisedClient):
+    """One MTProto round trip; cheap and not rate limited"""
+    ping_id = random.getrandbits(63)
+    if entry.kind == "telethon":
+        from telethon.tl.functions import PingRequest
+        await entry.client(PingRequest(ping_id=ping_id))
+    else:
+        from pyrogram.raw.functions import Ping
+        await entry.client.invoke(Ping(ping_id=ping_id))
+
+async def _restart(entry: SupervisedClient):
+    """Drop the broken connection and bring the client back with its saved auth"""
+    if entry.kind == "telethon":
+        if entry.client.is_connected():
+            await entry.client.disconnect()
+        await entry.start()
+    elif entry.client.is_connected:
+        # Session only: Client.stop() would also clear the dispatcher's handlers
+        await entry.client.session.restart()
+    else:
+        await entry.start()
+
+class ClientSupervisor:
+    """
+    Starts every client concurrently, pings them every `interval` and
+    reconnects failed ones with exponential backoff. Routers ask
+    is_available() so a dead client is skipped instead of timing out each job.
+    """
+    def __init__(self, interval: float = 30, timeout: float = 10, max_backoff: float = 300):
+        self.interval = interval
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.clients: Dict[str, SupervisedClient] = {}
+        self._by_id: Dict[int, SupervisedClient] = {}
+        self._wake = asyncio.Event()
+
+    def register(self, name: str, client, start: Callable[[], Awaitable[Any]], kind: str = "pyrogram", required: bool = False):
+        entry = SupervisedClient(name, client, kind, start, required)
+        self.clients[name] = entry
+        self._by_id[id(client)] = entry
+
+    def is_available(self, client) -> bool:
+        """Unsupervised clients (per-user sessions) are assumed up"""
+        entry = self._by_id.get(id(client))
+        return entry is None or entry.available
+
+    def suspect(self, client):
+        """A transfer failed in a way that smells like a dead connection: check now"""
+        if id(client) in self._by_id:
+            self._wake.set()
+
+    async def _start_one(self, entry: SupervisedClient, timings: Dict[str, float]):
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(entry.start(), self.timeout * 3)
+            self._mark_ok(entry)
+        except Exception as e:
+            if entry.required:
+                raise
+            self._mark_failed(entry, e)
+        finally:
+            timings[entry.name] = time.perf_counter() - start
+
+    async def start_all(self) -> Dict[str, float]:
+        """Start concurrently; only a required client failing aborts the boot"""
+        timings: Dict[str, float] = {}
+        await asyncio.gather(*(self._start_one(entry, timings) for entry in self.clients.values()))
+        return timings
+
+    def _mark_ok(self, entry: SupervisedClient):
+        if not entry.available:
+            logger.info(f"✅ {entry.name} available")
+        entry.available = True
+        entry.failures = 0
+        entry.last_ok = time.time()
+
+    def _mark_failed(self, entry: SupervisedClient, error: Exception):
+        if entry.available:
+            logger.warning(f"⚠️ {entry.name} unavailable: {error!r}")
+        entry.available = False
+        entry.failures += 1
+        entry.last_error = repr(error)[:200]
+        backoff = min(self.max_backoff, 2 ** min(entry.failures, 10))
+        entry.retry_at = time.monotonic() + backoff * random.uniform(0.8, 1.2)
+
+    async def _reconnect(self, entry: SupervisedClient):
+        try:
+            await asyncio.wait_for(_restart(entry), self.timeout * 3)
+            entry.reconnects += 1
+            self._mark_ok(entry)
+        except Exception as e:
+            self._mark_failed(entry, e)
+            logger.error(f"❌ {entry.name} reconnect failed (retry in {entry.retry_at - time.monotonic():.0f}s): {e!r}")
+
+    async def check(self, entry: SupervisedClient):
+        if entry.reconnecting and not entry.reconnecting.done():
+            return
+        if not entry.available:
+            if time.monotonic() >= entry.retry_at:
+                entry.reconnecting = asyncio.create_task(self._reconnect(entry))
+            return
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(_ping(entry), self.timeout)
+            entry.latency = time.perf_counter() - start
+            self._mark_ok(entry)
+        except Exception as e:
+            self._mark_failed(entry, e)
+            entry.reconnecting = asyncio.create_task(self._reconnect(entry))
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await asyncio.gather(*(self.check(entry) for entry in self.clients.values()))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Supervisor error: {e}")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "available": entry.available,
+                "latency": entry.latency,
+                "failures": entry.failures,
+                "reconnects": entry.reconnects,
+                "last_error": entry.last_error,
+            }
+            for name, entry in self.clients.items()
+        }
+
+supervisor = ClientSupervisor(CLIENT_PING_INTERVAL, CLIENT_PING_TIMEOUT, CLIENT_RECONNECT_MAX)
+
+_UP = registry.gauge("devgagan_client_up", "1 while the client answers pings", ("client",))
+_LATENCY = registry.gauge("devgagan_client_ping_seconds", "Last ping round trip", ("client",))
+_RECONNECTS = registry.counter("devgagan_client_reconnects_total", "Successful reconnects", ("client",))
+
+def _collect():
+    for name, data in supervisor.stats().items():
+        _UP.set(int(data["available"]), client=name)
+        _LATENCY.set(data["latency"], client=name)
+        _RECONNECTS.set_total(data["reconnects"], client=name)
+
+registry.add_collector(_collect)
@@ -0,0 +1,155 @@
+# ---------------------------------------------------
+# File Name: token_pool.py
+# Description: /token links shortened ahead of time, kept in Mongo and refilled in the background
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import datetime
+import logging
+import random
+import string
+from typing import Dict, Optional
+
+from config import WEBSITE_URL, AD_API, TOKEN_POOL_SIZE, TOKEN_POOL_TTL, TOKEN_VERIFY_TTL
+from devgagan.core.http_client import http_client
+from devgagan.core.metrics import registry
+from devgagan.core.mongo import token_pool_db
+
+logger = logging.getLogger(__name__)
+
+def generate_param(length: int = 8) -> str:
+    """Random start parameter"""
+    return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
+
+async def get_shortened_url(deep_link: str) -> str:
+    """Short URL from the shortener API, or the deep link itself if it's off or failing"""
+    if not WEBSITE_URL or not AD_API:
+        return deep_link
+    data = await http_client.get_json(f"https://{WEBSITE_URL}/api?api={AD_API}&url={deep_link}")
+    if data and data.get("status") == "success" and data.get("shortenedUrl"):
+        return data["shortenedUrl"]
+    return deep_link
+
+class TokenPool:
+    """
+    Start links don't depend on who asks, so they are shortened before
+    anyone does: run() keeps `size` (param, short_url) pairs in Mongo and
+    tops them up after every quarter of that is claimed (and hourly). /token
+    takes one with a single find_one_and_delete, so it never waits on the
+    shortener, and no two shards hand out the same link. The claimed
+    param becomes the user's pending token in Mongo too, valid for
+    `verify_ttl` from the claim, so /start verification survives restarts
+    and works on any shard. Links with less than that left are not handed
+    out (and don't count as pooled).
+
+    An empty pool (first start, shortener down) falls back to shortening
+    inline, as before.
+    """
+    def __init__(self, size: int = 50, ttl: int = 24 * 3600, verify_ttl: int = 3 * 3600, parallel: int = 4):
+        self.size = size
+        self.ttl = ttl
+        self.verify_ttl = verify_ttl
+        self.parallel = parallel
+        self._username: Optional[str] = None
+        self._wanted = asyncio.Event()
+        self._claimed = 0  # Since the last wake-up of run()
+        self.hits = self.misses = self.generated = self.verified = 0
+
+    def _deep_link(self, param: str) -> str:
+        return f"https://t.me/{self._username}?start={param}"
+
+    async def _shorten_new(self) -> Optional[Dict]:
+        param = generate_param()
+        short_url = await get_shortened_url(self._deep_link(param))
+        if AD_API and short_url == self._deep_link(param):
+            return None  # Shortener failed; don't pool a link that skips it
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=self.ttl)
+        return {"_id": param, "short_url": short_url, "expires_at": expires_at}
+
+    async def refill(self) -> int:
+        """Top the pool up to `size`; returns how many links were added"""
+        missing = self.size - await token_pool_db.pool_size(self.verify_ttl)
+        if missing <= 0:
+            return 0
+        slots = asyncio.Semaphore(self.parallel)
+
+        async def one():
+            async with slots:
+                return await self._shorten_new()
+
+        tokens = [token for token in await asyncio.gather(*(one() for _ in range(missing))) if token]
+        added = await token_pool_db.add_tokens(tokens)
+        self.generated += added
+        if added:
+            logger.info(f"🔑 Token pool refilled with {added} links")
+        return added
+
+    async def run(self, client):
+        """Background refill; needs the started bot client for its username"""
+        if not self.size:
+            return
+        if self.ttl <= self.verify_ttl:
+            logger.warning("⚠️ TOKEN_POOL_TTL must exceed TOKEN_VERIFY_TTL; token pool disabled")
+            self.size = 0
+            return
+        self._username = client.me.username
+        while True:
+            try:
+                await self.refill()
+            except Exception as e:
+                logger.error(f"Token pool refill failed: {e}")
+            self._wanted.clear()
+            try:
+                # Links age out of the claimable window; check again well before that even without claims
+                await asyncio.wait_for(self._wanted.wait(), min(3600, max(60, (self.ttl - self.verify_ttl) / 4)))
+            except asyncio.TimeoutError:
+                pass
+
+    async def claim(self, client, user_id: int) -> str:
+        """A short URL whose start param is now the user's pending token"""
+        self._username = self._username or client.me.username
+        token = await token_pool_db.claim_token(user_id, self.verify_ttl) if self.size else None
+        if token:
+            self.hits += 1
+            self._claimed += 1
+            if self._claimed >= max(1, self.size // 4):
+                self._claimed = 0
+                self._wanted.set()
+            return token["short_url"]
+        # Pool empty or off: the old path, shortener in the request
+        self.misses += 1
+        if self.size:
+            self._wanted.set()
+        param = generate_param()
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=self.verify_ttl)
+        await token_pool_db.set_pending(user_id, param, expires_at)
+        return await get_shortened_url(self._deep_link(param))
+
+    async def verify(self, user_id: int, param: str) -> bool:
+        """True once per token: the param /token gave this user"""
+        if await token_pool_db.consume_pending(user_id, param):
+            self.verified += 1
+            return True
+        return False
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "generated": self.generated,
+            "verified": self.verified,
+        }
+
+token_pool = TokenPool(TOKEN_POOL_SIZE, TOKEN_POOL_TTL, TOKEN_VERIFY_TTL)
+
+_TOKENS = registry.counter("devgagan_token_pool_total", "/token links by how they were served", ("event",))
+
+def _collect():
+    stats = token_pool.stats()
+    for event in ("hits", "misses", "generated", "verified"):
+        _TOKENS.set_total(stats[event], event=event)
+
+registry.add_collector(_collect)
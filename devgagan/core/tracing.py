@@ -0,0 +1,165 @@
+# ---------------------------------------------------
+# File Name: tracing.py
+# Description: Per-job phase spans written to a rotating JSONL log
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from logging.handlers import RotatingFileHandler
+from typing import Any, Deque, Dict, List, Optional
+
+from config import TRACE_LOG, TRACE_MAX_BYTES, TRACE_BACKUPS
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("devgagan_trace", default=None)
+
+@dataclass
+class Span:
+    name: str
+    start: float  # Seconds since the trace began
+    duration: float = 0.0
+    status: str = "ok"
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"name": self.name, "start": round(self.start, 4), "duration": round(self.duration, 4), "status": self.status}
+        if self.attrs:
+            data["attrs"] = self.attrs
+        return data
+
+@dataclass
+class Trace:
+    kind: str
+    user_id: int
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    trace_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    started: float = field(default_factory=time.time)
+    status: str = "ok"
+    duration: float = 0.0
+    finished: bool = False
+    spans: List[Span] = field(default_factory=list)
+    _t0: float = field(default_factory=time.perf_counter, repr=False)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "kind": self.kind,
+            "user_id": self.user_id,
+            "ts": round(self.started, 3),
+            "duration": round(self.duration, 4),
+            "status": self.status,
+            "attrs": self.attrs,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] if ordered else 0.0
+
+class Tracer:
+    """One trace per job (link, batch item, /download); phases are spans inside it"""
+    def __init__(self, path: str = TRACE_LOG, max_bytes: int = 10 * 1024**2, backups: int = 3, keep: int = 500):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.recent: Deque[Trace] = deque(maxlen=keep)
+        self._logger: Optional[logging.Logger] = None
+
+    def _write(self, record: Dict[str, Any]):
+        if self._logger is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backups)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger = logging.getLogger("devgagan.traces")
+            self._logger.addHandler(handler)
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+        try:
+            self._logger.info(json.dumps(record, default=str))
+        except Exception as e:
+            logger.error(f"⚠️ Trace write failed: {e}")
+
+    @staticmethod
+    def current() -> Optional[Trace]:
+        return _current.get()
+
+    @asynccontextmanager
+    async def trace(self, kind: str, user_id: int, **attrs):
+        """Root of a job; nested calls join the trace that is already running"""
+        existing = _current.get()
+        if existing is not None:
+            yield existing
+            return
+        trace = Trace(kind, user_id, attrs)
+        token = _current.set(trace)
+        try:
+            yield trace
+        except BaseException:
+            trace.status = "error"
+            raise
+        finally:
+            _current.reset(token)
+            trace.duration = trace.elapsed()
+            trace.finished = True
+            self.recent.append(trace)
+            self._write(trace.to_dict())
+
+    @asynccontextmanager
+    async def span(self, name: str, **attrs):
+        """Time one phase of the current job (a detached Span when there is none)"""
+        trace = _current.get()
+        span = Span(name, trace.elapsed() if trace else 0.0, attrs=attrs)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.status = "error"
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            if trace is not None:
+                trace.spans.append(span)
+                if trace.finished:
+                    # Background work (log copy) that outlived its job
+                    self._write({"trace_id": trace.trace_id, "late_span": span.to_dict()})
+
+    def summary(self, limit: int = 200) -> Dict[str, Any]:
+        """Per-phase p50/p95 and share of total job time over the last `limit` jobs"""
+        traces = list(self.recent)[-limit:]
+        phases: Dict[str, List[float]] = {}
+        for trace in traces:
+            for span in trace.spans:
+                phases.setdefault(span.name, []).append(span.duration)
+        total = sum(trace.duration for trace in traces) or 1.0
+        return {
+            "jobs": len(traces),
+            "errors": sum(1 for trace in traces if trace.status != "ok"),
+            "p50": _percentile([trace.duration for trace in traces], 0.50),
+            "p95": _percentile([trace.duration for trace in traces], 0.95),
+            "phases": {
+                name: {
+                    "count": len(durations),
+                    "p50": _percentile(durations, 0.50),
+                    "p95": _percentile(durations, 0.95),
+                    "share": sum(durations) / total,
+                }
+                for name, durations in sorted(phases.items(), key=lambda item: -sum(item[1]))
+            },
+            "slowest": sorted(traces, key=lambda trace: -trace.duration)[:3],
+        }
+
+tracer = Tracer(TRACE_LOG, TRACE_MAX_BYTES, TRACE_BACKUPS)
@@ -0,0 +1,247 @@
+# ---------------------------------------------------
+# File Name: transfers.py
+# Description: Global transfer scheduler (slots, fair share, byte rate)
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config import MAX_TRANSFERS, USER_MAX_TRANSFERS, MAX_TRANSFER_RATE
+from devgagan.core.metrics import registry, TRANSFER_BYTES, TRANSFER_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Share of the queue each plan tier gets relative to a free user
+TIER_WEIGHTS: Dict[str, float] = {"owner": 8.0, "premium": 4.0, "free": 1.0}
+
+@dataclass
+class TransferTicket:
+    """One admitted download or upload"""
+    user_id: int
+    tier: str
+    kind: str
+    size: int = 0
+    client: str = "pyrogram"
+    queued_at: float = field(default_factory=time.monotonic)
+    started_at: float = 0.0
+    bytes_done: int = 0
+    scheduler: Optional["TransferScheduler"] = None
+
+    def track(self, delta: int):
+        """Count bytes moved without throttling (sync progress hooks)"""
+        if delta > 0:
+            self.bytes_done += delta
+            TRANSFER_BYTES.inc(delta, direction=self.kind, client=self.client)
+
+    def wrap_sync(self, callback: Optional[Callable] = None) -> Callable:
+        """Sync variant of wrap_progress for Telethon's fast_upload/fast_download bars"""
+        last = 0
+
+        def progress(current, total, *args):
+            nonlocal last
+            delta, last = max(current - last, 0), current
+            self.track(delta)
+            return callback(current, total, *args) if callback else None
+        return progress
+
+    def wrap_progress(self, callback: Optional[Callable] = None) -> Callable:
+        """Progress hook that counts bytes and applies the global byte-rate limit"""
+        last = 0
+
+        async def progress(current, total, *args):
+            nonlocal last
+            delta, last = max(current - last, 0), current
+            self.track(delta)
+            if self.scheduler:
+                await self.scheduler.throttle(delta)
+            if callback:
+                result = callback(current, total, *args)
+                if asyncio.iscoroutine(result):
+                    await result
+        return progress
+
+@dataclass(order=True)
+class _Waiter:
+    tag: float
+    seq: int
+    ticket: TransferTicket = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+class TransferScheduler:
+    """
+    Bounds concurrent transfers on the box.
+
+    Waiters are served by weighted fair queuing: each request gets a virtual
+    finish tag of max(now, user's last tag) + 1/weight, the lowest tag runs
+    next, so a premium user's batch can't starve everyone else (and vice
+    versa) while still getting a larger share.
+    """
+    def __init__(
+        self,
+        max_slots: int = 6,
+        per_user: int = 2,
+        max_rate: int = 0,
+        weights: Optional[Dict[str, float]] = None,
+        tier_resolver: Optional[Callable[[int], Awaitable[str]]] = None,
+        tier_ttl: float = 300
+    ):
+        self.max_slots = max_slots
+        self.per_user = per_user
+        self.max_rate = max_rate
+        self.weights = weights or TIER_WEIGHTS
+        self.tier_resolver = tier_resolver
+        self.tier_ttl = tier_ttl
+        self._active: Dict[int, int] = defaultdict(int)
+        self._active_total = 0
+        self._tickets: List[TransferTicket] = []
+        self._heap: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._user_tags: Dict[int, float] = {}
+        self._tiers: Dict[int, tuple] = {}
+        self._tokens = float(max_rate)
+        self._refilled = time.monotonic()
+        self._rate_lock = asyncio.Lock()
+        self.completed = 0
+
+    async def tier_of(self, user_id: int) -> str:
+        cached = self._tiers.get(user_id)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        tier = "free"
+        if self.tier_resolver:
+            try:
+                tier = await self.tier_resolver(user_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Tier lookup failed for {user_id}: {e}")
+        self._tiers[user_id] = (tier, time.monotonic() + self.tier_ttl)
+        return tier
+
+    def _can_start(self, ticket: TransferTicket) -> bool:
+        return self._active_total < self.max_slots and self._active[ticket.user_id] < self.per_user
+
+    def _start(self, ticket: TransferTicket):
+        ticket.started_at = time.monotonic()
+        self._active[ticket.user_id] += 1
+        self._active_total += 1
+        self._tickets.append(ticket)
+
+    def _dispatch(self):
+        """Start the lowest-tagged waiters that fit; skip users at their cap"""
+        blocked = []
+        while self._heap and self._active_total < self.max_slots:
+            waiter = heapq.heappop(self._heap)
+            if waiter.future.done():
+                continue  # Cancelled while queued
+            if self._active[waiter.ticket.user_id] >= self.per_user:
+                blocked.append(waiter)
+                continue
+            self._virtual_time = max(self._virtual_time, waiter.tag)
+            self._start(waiter.ticket)
+            waiter.future.set_result(None)
+        for waiter in blocked:
+            heapq.heappush(self._heap, waiter)
+
+    async def acquire(self, user_id: int, kind: str = "download", size: int = 0, tier: Optional[str] = None,
+                      client: str = "pyrogram") -> TransferTicket:
+        tier = tier or await self.tier_of(user_id)
+        ticket = TransferTicket(user_id, tier, kind, size or 0, client, scheduler=self)
+
+        weight = self.weights.get(tier, 1.0)
+        tag = max(self._virtual_time, self._user_tags.get(user_id, 0.0)) + 1.0 / weight
+        self._user_tags[user_id] = tag
+
+        if not self._heap and self._can_start(ticket):
+            self._virtual_time = max(self._virtual_time, tag)
+            self._start(ticket)
+            return ticket
+
+        waiter = _Waiter(tag, next(self._seq), ticket, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._heap, waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(ticket)  # Admitted just as we were cancelled
+            raise
+        return ticket
+
+    def release(self, ticket: TransferTicket):
+        if ticket not in self._tickets:
+            return
+        self._tickets.remove(ticket)
+        self._active[ticket.user_id] -= 1
+        if not self._active[ticket.user_id]:
+            del self._active[ticket.user_id]
+        self._active_total -= 1
+        self.completed += 1
+        TRANSFER_SECONDS.observe(time.monotonic() - ticket.started_at, direction=ticket.kind, client=ticket.client)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, user_id: int, kind: str = "download", size: int = 0, tier: Optional[str] = None,
+                   client: str = "pyrogram"):
+        """async with scheduler.slot(user_id, "upload", size) as ticket: ..."""
+        ticket = await self.acquire(user_id, kind, size, tier, client)
+        try:
+            yield ticket
+            if not ticket.bytes_done:
+                ticket.track(ticket.size)  # Paths without a progress hook (yt-dlp)
+        finally:
+            self.release(ticket)
+
+    async def throttle(self, nbytes: int):
+        """Token bucket shared by every transfer; no-op when max_rate is 0"""
+        if not self.max_rate or nbytes <= 0:
+            return
+        async with self._rate_lock:
+            now = time.monotonic()
+            self._tokens = min(self.max_rate, self._tokens + (now - self._refilled) * self.max_rate)
+            self._refilled = now
+            self._tokens -= nbytes
+            if self._tokens < 0:
+                await asyncio.sleep(-self._tokens / self.max_rate)
+
+    def stats(self) -> Dict[str, int]:
+        by_tier: Dict[str, int] = defaultdict(int)
+        for waiter in self._heap:
+            if not waiter.future.done():
+                by_tier[waiter.ticket.tier] += 1
+        return {
+            "active": self._active_total,
+            "slots": self.max_slots,
+            "queued": sum(by_tier.values()),
+            "queued_premium": by_tier.get("premium", 0) + by_tier.get("owner", 0),
+            "completed": self.completed,
+        }
+
+async def _resolve_tier(user_id: int) -> str:
+    from devgagan.core.func import get_user_tier
+    return await get_user_tier(user_id)
+
+# Every download/upload path submits through this one instance
+transfer_scheduler = TransferScheduler(
+    MAX_TRANSFERS, USER_MAX_TRANSFERS, MAX_TRANSFER_RATE, tier_resolver=_resolve_tier
+)
+
+_ACTIVE = registry.gauge("devgagan_transfers_active", "Transfers holding a slot")
+_QUEUED = registry.gauge("devgagan_transfers_queued", "Transfers waiting for a slot", ("tier",))
+
+def _collect():
+    stats = transfer_scheduler.stats()
+    _ACTIVE.set(stats["active"])
+    _QUEUED.set(stats["queued"] - stats["queued_premium"], tier="free")
+    _QUEUED.set(stats["queued_premium"], tier="premium")
+
+registry.add_collector(_collect)
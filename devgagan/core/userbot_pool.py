@@ -0,0 +1,211 @@
+# ---------------------------------------------------
+# File Name: userbot_pool.py
+# Description: Pool of started per-user userbot clients, shared across jobs
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from pyrogram import Client
+
+from config import API_ID, API_HASH, USERBOT_IDLE_TIMEOUT, USERBOT_MAX_OPEN, PEER_FLUSH_INTERVAL
+from devgagan.core.metrics import registry
+from devgagan.core.mongo import db
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class _Lease:
+    user_id: int
+    client: Client
+    session: str
+    refs: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    saved: Dict[int, Tuple] = field(default_factory=dict)  # Peers as last written to Mongo
+    persist: bool = True  # Off after /logout so a final flush doesn't bring the peers back
+
+class UserbotPool:
+    """
+    One started Client per logged-in user, reference counted across that
+    user's concurrent jobs. Idle clients are stopped after `idle_timeout`;
+    at `max_open` the least recently used idle client makes room, and when
+    every client is busy new users wait for one to be released.
+    
+    Clients keep their session in memory (session string from Mongo, no
+    SQLite file); the peers they learn are flushed back to Mongo in batches
+    and restored on the next start, so access hashes survive eviction.
+    """
+    def __init__(self, idle_timeout: float = 600, max_open: int = 50, flush_interval: float = 300):
+        self.idle_timeout = idle_timeout
+        self.max_open = max_open
+        self.flush_interval = flush_interval
+        self.leases: Dict[int, _Lease] = {}
+        self._retired: List[_Lease] = []  # Replaced by a new login; stopped once their jobs finish
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._released = asyncio.Condition()
+        self.started = self.reused = self.evicted = 0
+        self.peers_flushed = 0
+
+    @property
+    def open(self) -> int:
+        return len(self.leases) + len(self._retired)
+
+    def _lock(self, user_id: int) -> asyncio.Lock:
+        return self._locks.setdefault(user_id, asyncio.Lock())
+
+    async def acquire(self, user_id: int, session: str) -> Client:
+        """A started client for this session; pair every call with release()"""
+        async with self._lock(user_id):
+            lease = self.leases.get(user_id)
+            if lease and lease.session != session:
+                self._retire(lease)
+                lease = None
+
+            if lease is None:
+                await self._make_room()
+                client = Client(
+                    f"userbot_{user_id}",
+                    api_id=API_ID,
+                    api_hash=API_HASH,
+                    session_string=session,
+                    device_model="iPhone 16 Pro",
+                    no_updates=True  # Jobs only make requests; don't stream the account's updates
+                )
+                await client.start()
+                lease = self.leases[user_id] = _Lease(user_id, client, session)
+                await self._restore_peers(lease)
+                self.started += 1
+            else:
+                self.reused += 1
+
+            lease.refs += 1
+            lease.last_used = time.monotonic()
+            return lease.client
+
+    async def release(self, client: Optional[Client]):
+        """Drop one reference; unknown clients (default userbot, None) are ignored"""
+        lease = next((l for l in [*self.leases.values(), *self._retired] if l.client is client), None)
+        if lease is None:
+            return
+        lease.refs -= 1
+        lease.last_used = time.monotonic()
+        if lease.refs <= 0 and lease in self._retired:
+            self._retired.remove(lease)
+            await self._stop(lease)
+        async with self._released:
+            self._released.notify_all()
+
+    def _retire(self, lease: _Lease):
+        del self.leases[lease.user_id]
+        if lease.refs > 0:
+            self._retired.append(lease)
+        else:
+            asyncio.create_task(self._stop(lease))
+
+    async def evict(self, user_id: int):
+        """Session revoked (/logout): stop now or as soon as running jobs finish"""
+        async with self._lock(user_id):
+            lease = self.leases.get(user_id)
+            if lease:
+                lease.persist = False
+                self._retire(lease)
+
+    async def _make_room(self):
+        while self.open >= self.max_open:
+            idle = [lease for lease in self.leases.values() if lease.refs <= 0]
+            if idle:
+                lease = min(idle, key=lambda l: l.last_used)
+                del self.leases[lease.user_id]
+                await self._stop(lease)
+                continue
+            async with self._released:
+                await self._released.wait()
+
+    async def _restore_peers(self, lease: _Lease):
+        peers = await db.get_peers(lease.user_id)
+        if peers:
+            await lease.client.storage.update_peers(peers)
+            lease.saved = {peer[0]: tuple(peer) for peer in peers}
+
+    async def _flush_peers(self, lease: _Lease):
+        """Write peers added or changed since the last flush, in one update"""
+        if not lease.persist:
+            return
+        try:
+            rows = lease.client.storage.conn.execute(
+                "SELECT id, access_hash, type, username, phone_number FROM peers"
+            ).fetchall()
+        except Exception:
+            return  # Storage already closed
+        changed = [tuple(row) for row in rows if lease.saved.get(row[0]) != tuple(row)]
+        if changed and await db.save_peers(lease.user_id, changed):
+            lease.saved.update((row[0], row) for row in changed)
+            self.peers_flushed += len(changed)
+
+    async def flush(self):
+        await asyncio.gather(*(self._flush_peers(lease) for lease in [*self.leases.values(), *self._retired]))
+
+    async def _stop(self, lease: _Lease):
+        self.evicted += 1
+        await self._flush_peers(lease)
+        try:
+            await asyncio.wait_for(lease.client.stop(), 30)
+        except Exception as e:
+            logger.warning(f"⚠️ Stopping userbot for {lease.user_id} failed: {e}")
+
+    async def run(self):
+        """Stop clients idle for longer than idle_timeout; flush peers every flush_interval"""
+        last_flush = time.monotonic()
+        while True:
+            await asyncio.sleep(min(60, self.idle_timeout / 2, self.flush_interval))
+            try:
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    last_flush = time.monotonic()
+                    await self.flush()
+                cutoff = time.monotonic() - self.idle_timeout
+                for lease in [l for l in self.leases.values() if l.refs <= 0 and l.last_used < cutoff]:
+                    del self.leases[lease.user_id]
+                    await self._stop(lease)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Userbot pool sweep error: {e}")
+
+    async def shutdown(self):
+        leases = [*self.leases.values(), *self._retired]
+        self.leases.clear()
+        self._retired.clear()
+        await asyncio.gather(*(self._stop(lease) for lease in leases))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "open": self.open,
+            "busy": sum(1 for lease in [*self.leases.values(), *self._retired] if lease.refs > 0),
+            "started": self.started,
+            "reused": self.reused,
+            "evicted": self.evicted,
+            "peers_flushed": self.peers_flushed,
+        }
+
+userbot_pool = UserbotPool(USERBOT_IDLE_TIMEOUT, USERBOT_MAX_OPEN, PEER_FLUSH_INTERVAL)
+
+_CLIENTS = registry.gauge("devgagan_userbots", "Pooled per-user clients", ("state",))
+_STARTS = registry.counter("devgagan_userbot_starts_total", "Per-user clients started (handshake + auth)")
+_REUSES = registry.counter("devgagan_userbot_reuses_total", "Jobs served by an already started client")
+_PEERS = registry.counter("devgagan_userbot_peers_flushed_total", "Userbot peers written back to Mongo")
+
+def _collect():
+    stats = userbot_pool.stats()
+    _CLIENTS.set(stats["open"], state="open")
+    _CLIENTS.set(stats["busy"], state="busy")
+    _STARTS.set_total(stats["started"])
+    _REUSES.set_total(stats["reused"])
+    _PEERS.set_total(stats["peers_flushed"])
+
+registry.add_collector(_collect)
@@ -0,0 +1,207 @@
+# ---------------------------------------------------
+# File Name: workdir.py
+# Description: Per-job working directories and the temp-file janitor
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, Set, Tuple
+
+from config import DOWNLOAD_DIR, JANITOR_MAX_AGE, JANITOR_INTERVAL
+from devgagan.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+MARKER = ".job.json"
+
+# Files older code (and crashes) leave outside job directories. Only names the
+# bot generates itself: {user_id}.jpg custom thumbnails live in the working
+# directory too, and the temp directory is shared with other programs.
+STRAY_PATTERNS = {
+    ".": [
+        re.compile(r".+\.part\d{3}(\.\w+)?$"),  # split parts
+        re.compile(r"^thumb_\d+_\d+\.jpg$"),  # screenshot thumbnails
+        # yt-dlp random names (get_random_string); an all-digit stem is a user id
+        re.compile(r"^(?!\d{7}\.)[A-Za-z0-9]{7}\.(mp4|mp3|m4a|webm|mkv|part|ytdl|jpg|webp)$"),
+    ],
+    tempfile.gettempdir(): [
+        re.compile(r"^ytdlp_\w+_\w+\.txt$"),  # cookie files from YtdlpEngine (mkstemp prefix)
+    ],
+}
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _tree_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+class WorkDir:
+    """DOWNLOAD_DIR/jobs/<owner>-<id>/ per job, tagged with the owning pid"""
+    def __init__(self, root: str = DOWNLOAD_DIR):
+        self.root = root
+        self.jobs_root = os.path.join(root, "jobs")
+        self.active: Set[str] = set()
+
+    def create(self, owner) -> str:
+        path = os.path.join(self.jobs_root, f"{owner}-{uuid.uuid4().hex[:8]}")
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, MARKER), "w") as f:
+            json.dump({"pid": os.getpid(), "owner": owner, "created": time.time()}, f)
+        self.active.add(path)
+        return path
+
+    def remove(self, path: str) -> int:
+        self.active.discard(path)
+        if not path or not os.path.exists(path):
+            return 0
+        size = _tree_size(path)
+        shutil.rmtree(path, ignore_errors=True)
+        return size
+
+    @asynccontextmanager
+    async def job(self, owner):
+        """async with workdir.job(user_id) as path: everything for the job goes in path"""
+        path = await asyncio.to_thread(self.create, owner)
+        try:
+            yield path
+        finally:
+            await asyncio.to_thread(self.remove, path)
+
+    def owner_pid(self, path: str) -> int:
+        try:
+            with open(os.path.join(path, MARKER)) as f:
+                return int(json.load(f).get("pid", 0))
+        except (OSError, ValueError):
+            return 0
+
+class Janitor:
+    """Sweeps orphaned job dirs and stray temp files by age and ownership"""
+    def __init__(self, workdir: WorkDir, max_age: float = 6 * 3600, interval: float = 900,
+                 stray_patterns: Dict[str, Iterable[re.Pattern]] = None):
+        self.workdir = workdir
+        self.max_age = max_age
+        self.interval = interval
+        self.stray_patterns = STRAY_PATTERNS if stray_patterns is None else stray_patterns
+        self.files_removed = 0
+        self.bytes_reclaimed = 0
+        self.last_sweep = 0.0
+        self.startup_reclaimed = 0
+
+    def _is_orphan_job(self, path: str, now: float, startup: bool) -> bool:
+        if path in self.workdir.active:
+            return False
+        pid = self.workdir.owner_pid(path)
+        if pid != os.getpid() and (startup or not _pid_alive(pid)):
+            return True  # Left behind by a previous (or dead) process
+        return now - os.path.getmtime(path) > self.max_age
+
+    def sweep(self, startup: bool = False) -> Tuple[int, int]:
+        """Blocking sweep, run it in a thread. Returns (files removed, bytes reclaimed)"""
+        now = time.time()
+        removed = reclaimed = 0
+
+        if os.path.isdir(self.workdir.jobs_root):
+            for entry in os.scandir(self.workdir.jobs_root):
+                if entry.is_dir() and self._is_orphan_job(entry.path, now, startup):
+                    reclaimed += self.workdir.remove(entry.path)
+                    removed += 1
+
+        # Loose downloads in the root (pre job-dir layout)
+        if os.path.isdir(self.workdir.root):
+            for entry in os.scandir(self.workdir.root):
+                if entry.is_file() and (startup or now - entry.stat().st_mtime > self.max_age):
+                    reclaimed += self._unlink(entry)
+                    removed += 1
+
+        for directory, patterns in self.stray_patterns.items():
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if not entry.is_file() or not any(p.match(entry.name) for p in patterns):
+                    continue
+                stat = entry.stat()
+                if stat.st_uid != os.getuid():
+                    continue  # Not ours
+                if startup or now - stat.st_mtime > self.max_age:
+                    reclaimed += self._unlink(entry)
+                    removed += 1
+
+        self.files_removed += removed
+        self.bytes_reclaimed += reclaimed
+        self.last_sweep = now
+        return removed, reclaimed
+
+    @staticmethod
+    def _unlink(entry) -> int:
+        try:
+            size = entry.stat().st_size
+            os.remove(entry.path)
+            return size
+        except OSError:
+            return 0
+
+    async def startup(self):
+        """Reclaim everything the previous process left behind"""
+        removed, reclaimed = await asyncio.to_thread(self.sweep, True)
+        self.startup_reclaimed = reclaimed
+        logger.info(f"🧹 Startup cleanup: {removed} items, {reclaimed / 1024**2:.1f} MB reclaimed")
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                removed, reclaimed = await asyncio.to_thread(self.sweep)
+                if removed:
+                    logger.info(f"🧹 Janitor: {removed} items, {reclaimed / 1024**2:.1f} MB reclaimed")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Janitor error: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "files_removed": self.files_removed,
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "startup_reclaimed": self.startup_reclaimed,
+            "active_jobs": len(self.workdir.active),
+            "last_sweep": self.last_sweep,
+        }
+
+workdir = WorkDir(DOWNLOAD_DIR)
+janitor = Janitor(workdir, JANITOR_MAX_AGE, JANITOR_INTERVAL)
+
+_RECLAIMED = registry.counter("devgagan_janitor_reclaimed_bytes_total", "Bytes removed by the janitor")
+_JOBS = registry.gauge("devgagan_jobs_active", "Jobs with a working directory")
+
+def _collect():
+    stats = janitor.stats()
+    _RECLAIMED.set_total(stats["bytes_reclaimed"])
+    _JOBS.set(stats["active_jobs"])
+
+registry.add_collector(_collect)
@@ -0,0 +1,122 @@
+# ---------------------------------------------------
+# File Name: ytdl_profiles.py
+# Description: yt-dlp download profiles (fragments, chunking, rate, downloader) per site and tier
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import json
+import logging
+import shutil
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from config import (
+    YTDL_FRAGMENTS_FREE, YTDL_FRAGMENTS_PREMIUM, YTDL_CHUNK_SIZE,
+    YTDL_RATE_LIMIT_FREE, YTDL_EXTERNAL_DOWNLOADER, YTDL_PROFILES
+)
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class DownloadProfile:
+    """How yt-dlp fetches: DASH/HLS fragments in parallel, ranged HTTP, rate cap, external tool"""
+    concurrent_fragments: int = 1
+    http_chunk_size: int = 0  # Bytes per ranged request, 0 = one request for the whole file
+    rate_limit: int = 0  # Bytes/s, 0 = unlimited
+    external_downloader: str = ""  # e.g. "aria2c" for segmented plain-HTTP fetches, "" = native
+    external_args: Tuple[str, ...] = field(default=())
+
+    def sequential(self) -> "DownloadProfile":
+        """Streaming uploads tail the file, so it has to be written front to back"""
+        return replace(self, external_downloader="", external_args=())
+
+    def ydl_opts(self) -> Dict[str, Any]:
+        opts: Dict[str, Any] = {"concurrent_fragment_downloads": max(1, self.concurrent_fragments)}
+        if self.http_chunk_size:
+            opts["http_chunk_size"] = self.http_chunk_size
+        if self.rate_limit:
+            opts["ratelimit"] = self.rate_limit
+        if self.external_downloader and _installed(self.external_downloader):
+            # Only plain HTTP goes external; fragments stay with the native (concurrent) downloader
+            opts["external_downloader"] = {"http": self.external_downloader}
+            if self.external_args:
+                opts["external_downloader_args"] = {self.external_downloader: list(self.external_args)}
+        return opts
+
+_missing_logged = set()
+
+def _installed(binary: str) -> bool:
+    if shutil.which(binary):
+        return True
+    if binary not in _missing_logged:
+        _missing_logged.add(binary)
+        logger.warning(f"⚠️ {binary} not found; yt-dlp will use its native downloader")
+    return False
+
+# Plan tier -> baseline
+TIER_PROFILES: Dict[str, DownloadProfile] = {
+    "free": DownloadProfile(
+        concurrent_fragments=YTDL_FRAGMENTS_FREE,
+        http_chunk_size=YTDL_CHUNK_SIZE,
+        rate_limit=YTDL_RATE_LIMIT_FREE,
+        external_downloader=YTDL_EXTERNAL_DOWNLOADER,
+    ),
+    "premium": DownloadProfile(
+        concurrent_fragments=YTDL_FRAGMENTS_PREMIUM,
+        http_chunk_size=YTDL_CHUNK_SIZE,
+        external_downloader=YTDL_EXTERNAL_DOWNLOADER,
+    ),
+}
+TIER_PROFILES["owner"] = TIER_PROFILES["premium"]
+
+# Site -> changes on top of the tier's profile
+SITE_OVERRIDES: Dict[str, Dict[str, Any]] = {
+    # Instagram rate-limits parallel CDN requests from one IP quickly
+    "instagram": {"concurrent_fragments": 2},
+}
+
+ARIA2_ARGS = ("-x", "8", "-s", "8", "-k", "1M")
+
+def site_of(url: str) -> str:
+    """youtube, instagram, ... (registered domain without the TLD)"""
+    host = (urlparse(url).hostname or "").lower()
+    if host in ("youtu.be",):
+        return "youtube"
+    parts = [part for part in host.split(".") if part not in ("www", "m", "music")]
+    return parts[-2] if len(parts) >= 2 else host
+
+def _overrides() -> Dict[str, Dict[str, Any]]:
+    if not YTDL_PROFILES:
+        return {}
+    try:
+        configured = json.loads(YTDL_PROFILES)
+    except ValueError as e:
+        logger.error(f"❌ YTDL_PROFILES is not valid JSON, ignoring it: {e}")
+        return {}
+    fields = DownloadProfile.__dataclass_fields__
+    for pattern, changes in configured.items():
+        unknown = set(changes) - set(fields)
+        if unknown:
+            logger.error(f"❌ YTDL_PROFILES[{pattern!r}]: unknown settings {sorted(unknown)} ignored")
+            configured[pattern] = {key: value for key, value in changes.items() if key in fields}
+    return configured
+
+_CONFIGURED = _overrides()
+
+def profile_for(url: str, tier: Optional[str] = None) -> DownloadProfile:
+    """Tier baseline, then built-in site rules, then YTDL_PROFILES ("site:tier", "site:*", "*:tier")"""
+    tier = tier if tier in TIER_PROFILES else "free"
+    site = site_of(url)
+    profile = TIER_PROFILES[tier]
+    changes = dict(SITE_OVERRIDES.get(site, {}))
+    for pattern in (f"*:{tier}", f"{site}:*", f"{site}:{tier}"):
+        changes.update(_CONFIGURED.get(pattern, {}))
+    if "external_args" in changes:
+        changes["external_args"] = tuple(changes["external_args"])
+    profile = replace(profile, **changes)
+    if profile.external_downloader == "aria2c" and not profile.external_args:
+        profile = replace(profile, external_args=ARIA2_ARGS)
+    return profile
@@ -0,0 +1,216 @@
+# ---------------------------------------------------
+# File Name: ytdlp_engine.py
+# Description: yt-dlp worker pool: single-pass extract + download, warm instances, fair queue
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from config import YTDLP_WORKERS
+from devgagan.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# (cookie profile, options) -> interchangeable YoutubeDL instances
+ProfileKey = Tuple[Optional[str], str]
+
+class YtdlpEngine:
+    """
+    Runs yt-dlp on its own `workers` threads. A job extracts once and
+    downloads from that same info dict (process_ie_result), instead of a
+    second YoutubeDL re-extracting the URL. Finished YoutubeDL instances go
+    back to an idle list per cookie profile + options, so the next job skips
+    construction, cookie loading and extractor setup. When every worker is
+    busy, waiting users are served round-robin rather than first come.
+    """
+    def __init__(self, workers: int = 4):
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ytdlp")
+        self._idle: Dict[ProfileKey, List[Any]] = {}
+        self._cookie_files: Dict[str, str] = {}
+        self._lock = threading.Lock()  # Instances are checked out from the worker threads
+        self._free = workers
+        self._waiting: "OrderedDict[int, Deque[asyncio.Future]]" = OrderedDict()
+        self.running = 0
+        self.created = self.reused = 0
+        self.extractions = self.downloads = 0
+
+    # ---------------- Fair queue ----------------
+
+    @asynccontextmanager
+    async def _turn(self, user_id: int):
+        await self._acquire(user_id)
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._release()
+
+    async def _acquire(self, user_id: int):
+        if self._free > 0 and not self._waiting:
+            self._free -= 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_id, deque()).append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # Granted as we were cancelled: pass it on
+            else:
+                queue = self._waiting.get(user_id)
+                if queue and waiter in queue:
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._waiting[user_id]
+            raise
+
+    def _release(self):
+        """Hand the worker to the next user in rotation"""
+        while self._waiting:
+            user_id, queue = next(iter(self._waiting.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._waiting.move_to_end(user_id)
+            else:
+                del self._waiting[user_id]
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._free += 1
+
+    # ---------------- Warm instances ----------------
+
+    def _cookie_file(self, profile: Optional[str]) -> Optional[str]:
+        """Cookies from the profile's env var, written once per process"""
+        cookies = os.getenv(profile) if profile else None
+        if not cookies:
+            return None
+        if profile not in self._cookie_files:
+            fd, path = tempfile.mkstemp(prefix=f"ytdlp_{profile}_", suffix=".txt")
+            with os.fdopen(fd, "w") as f:
+                f.write(cookies)
+            self._cookie_files[profile] = path
+        return self._cookie_files[profile]
+
+    def _checkout(self, key: ProfileKey, opts: Dict[str, Any]):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.reused += 1
+                return idle.pop()
+            self.created += 1
+            cookiefile = self._cookie_file(key[0])
+        import yt_dlp  # Deferred to the first /dl or /adl (and off the event loop)
+        return yt_dlp.YoutubeDL({**opts, "cookiefile": cookiefile})
+
+    def _checkin(self, key: ProfileKey, ydl):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.workers:
+                idle.append(ydl)
+                return
+        ydl.close()
+
+    @staticmethod
+    def _key(opts: Dict[str, Any], cookies: Optional[str]) -> ProfileKey:
+        return cookies if os.getenv(cookies or "") else None, json.dumps(opts, sort_keys=True, default=str)
+
+    # ---------------- Jobs ----------------
+
+    def _extract_sync(self, key: ProfileKey, opts: Dict[str, Any], url: str):
+        ydl = self._checkout(key, opts)
+        try:
+            return ydl.extract_info(url, download=False)
+        finally:
+            self._checkin(key, ydl)
+
+    def _download_sync(self, key: ProfileKey, opts: Dict[str, Any], info: Dict[str, Any], outtmpl: str,
+                       hooks: List[Callable[[Dict[str, Any]], None]]):
+        ydl = self._checkout(key, opts)
+        for hook in hooks:
+            ydl.add_progress_hook(hook)
+        try:
+            ydl.params["outtmpl"] = {"default": outtmpl}
+            # Formats were already resolved by extract(); this only downloads and post-processes
+            return ydl.process_ie_result(info, download=True)
+        finally:
+            # Hooks belong to this job, not to the warm instance
+            for hook in hooks:
+                ydl._progress_hooks.remove(hook)
+            self._checkin(key, ydl)
+
+    async def extract(self, user_id: int, url: str, opts: Dict[str, Any], cookies: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Info dict for url; `cookies` names the env var holding a cookies.txt"""
+        key = self._key(opts, cookies)
+        async with self._turn(user_id):
+            info = await asyncio.get_running_loop().run_in_executor(self._pool, self._extract_sync, key, opts, url)
+        self.extractions += 1
+        return info
+
+    async def download(self, user_id: int, info: Dict[str, Any], opts: Dict[str, Any], outtmpl: str, cookies: Optional[str] = None,
+                       progress_hooks: Optional[List[Callable[[Dict[str, Any]], None]]] = None) -> Dict[str, Any]:
+        """Download what extract() returned, with the same opts and cookies; hooks run on the worker thread"""
+        key = self._key(opts, cookies)
+        hooks = list(progress_hooks or ())
+        async with self._turn(user_id):
+            result = await asyncio.get_running_loop().run_in_executor(self._pool, self._download_sync, key, opts, info, outtmpl, hooks)
+        self.downloads += 1
+        return result
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for idle in self._idle.values():
+            for ydl in idle:
+                try:
+                    ydl.close()
+                except Exception:
+                    pass
+        self._idle.clear()
+        for path in self._cookie_files.values():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._cookie_files.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queued": sum(len(queue) for queue in self._waiting.values()),
+            "warm": sum(len(idle) for idle in self._idle.values()),
+            "created": self.created,
+            "reused": self.reused,
+            "extractions": self.extractions,
+            "downloads": self.downloads,
+        }
+
+ytdlp_engine = YtdlpEngine(YTDLP_WORKERS)
+
+_JOBS = registry.gauge("devgagan_ytdlp_jobs", "yt-dlp jobs running or waiting for a worker", ("state",))
+_INSTANCES = registry.counter("devgagan_ytdlp_instances_total", "YoutubeDL instances handed to jobs", ("source",))
+_CALLS = registry.counter("devgagan_ytdlp_calls_total", "yt-dlp extractions and downloads", ("op",))
+
+def _collect():
+    stats = ytdlp_engine.stats()
+    _JOBS.set(stats["running"], state="running")
+    _JOBS.set(stats["queued"], state="queued")
+    _INSTANCES.set_total(stats["created"], source="new")
+    _INSTANCES.set_total(stats["reused"], source="warm")
+    _CALLS.set_total(stats["extractions"], op="extract")
+    _CALLS.set_total(stats["downloads"], op="download")
+
+registry.add_collector(_collect)
@@ -12,16 +12,14 @@ from pyrogram import filters, Client
 from devgagan import app
 from config import API_ID as api_id, API_HASH as api_hash
 from devgagan.core.mongo import db
+from devgagan.core.userbot_pool import userbot_pool
 from pyrogram.errors import (
     ApiIdInvalid, PhoneNumberInvalid, PhoneCodeInvalid,
     PhoneCodeExpired, SessionPasswordNeeded, PasswordHashInvalid
 )
 
-def generate_session_name(user_id):
-    return f"sessions/session_{user_id}"
-
 async def delete_session_files(user_id):
-    """Clean up session files and DB entry"""
+    """Clean up session files (left by older versions) and DB entry"""
     session_file = f"session_{user_id}.session"
     journal_file = f"session_{user_id}.session-journal"
     
@@ -31,6 +29,8 @@ async def delete_session_files(user_id):
         os.remove(journal_file)
     
     await db.remove_session(user_id)
+    await db.remove_peers(user_id)
+    await userbot_pool.evict(user_id)
 
 @app.on_message(filters.command("logout") & filters.private)
 async def logout(_, message):
@@ -50,6 +50,7 @@ async def login_handler(_, message):
         await message.reply("⚠️ You are already logged in! Use /logout first.")
         return
     
+    client = None
     try:
         # Ask for phone number
         phone_msg = await app.ask(
@@ -59,11 +60,12 @@ async def login_handler(_, message):
         )
         phone = phone_msg.text.strip()
         
-        # Initialize temporary client
+        # Initialize temporary client (in memory: the session string goes to Mongo)
         client = Client(
-            generate_session_name(user_id),
+            f"login_{user_id}",
             api_id=api_id,
-            api_hash=api_hash
+            api_hash=api_hash,
+            in_memory=True
         )
         
         await client.connect()
@@ -95,9 +97,6 @@ async def login_handler(_, message):
         # Save session
         session_string = await client.export_session_string()
         await db.set_session(user_id, session_string)
-        
-        # Cleanup
-        await client.disconnect()
         await message.reply("✅ **Login successful!** You can now access private channels.")
         
     except asyncio.TimeoutError:
@@ -105,4 +104,8 @@ async def login_handler(_, message):
     except Exception as e:
         await message.reply(f"❌ **Login failed:** {str(e)}")
         print(f"Login error for {user_id}: {e}")
+    finally:
+        # Cleanup (failed and timed-out logins used to leave the connection open)
+        if client and client.is_connected:
+            await client.disconnect()
         
\ No newline at end of file
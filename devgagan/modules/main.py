@@ -13,7 +13,10 @@ import asyncio
 from pyrogram import filters
 from devgagan import app, userrbot
 from config import API_ID, API_HASH, FREEMIUM_LIMIT, PREMIUM_LIMIT, OWNER_ID, DEFAULT_SESSION
-from devgagan.core.get_func import get_msg
+from devgagan.core.get_func import get_msg, bot, parse_message_link
+from devgagan.core.pacer import pacer
+from devgagan.core.tracing import tracer
+from devgagan.core.userbot_pool import userbot_pool
 from devgagan.core.func import *
 from devgagan.core.mongo import db
 from devgagan.core.mongo.plans_db import check_premium
@@ -83,6 +86,7 @@ async def single_link(_, message):
     
     users_loop[user_id] = True
     status_msg = await message.reply("🔄 Processing...", quote=True)
+    userbot = None
     
     try:
         userbot = await initialize_userbot(user_id) if needs_userbot(link) else None
@@ -99,18 +103,19 @@ async def single_link(_, message):
         await status_msg.edit(f"❌ Error: {str(e)}\n\nLink: `{link}`")
     finally:
         users_loop[user_id] = False
+        await release_userbot(userbot)
         try:
             await status_msg.delete()
         except:
             pass
 
-async def process_and_upload_link(userbot, user_id, msg_id, link, retry_count, original_msg):
-    """Process single link and upload"""
-    try:
-        await get_msg(userbot, user_id, msg_id, link, retry_count, original_msg)
-        await asyncio.sleep(2)
-    except Exception as e:
-        raise e
+async def process_and_upload_link(userbot, user_id, msg_id, link, retry_count, original_msg, source_message=None):
+    """Process single link and upload; True if it was uploaded"""
+    async with tracer.trace("batch" if source_message else "link", user_id, link=link) as trace:
+        if not await get_msg(userbot, user_id, msg_id, link, retry_count, original_msg, source_message):
+            trace.status = "failed"
+            return False
+        return True
 
 def needs_userbot(link: str) -> bool:
     """Check if link requires userbot"""
@@ -135,25 +140,21 @@ async def process_special_links(userbot, user_id, msg, link):
     await set_interval(user_id, 45)
 
 async def initialize_userbot(user_id):
-    """Initialize userbot for user"""
+    """Lease the user's pooled userbot (or the default one); pair with release_userbot"""
     data = await db.get_data(user_id)
     if data and data.get("session"):
         try:
-            userbot = Client(
-                f"userbot_{user_id}",
-                api_id=API_ID,
-                api_hash=API_HASH,
-                session_string=data["session"],
-                device_model="iPhone 16 Pro"
-            )
-            await userbot.start()
-            return userbot
+            return await userbot_pool.acquire(user_id, data["session"])
         except Exception as e:
             await app.send_message(user_id, "❌ Session expired. Please /login again.")
             return None
     else:
         return userrbot if DEFAULT_SESSION else None
 
+async def release_userbot(userbot):
+    """Return a leased userbot to the pool (no-op for the default userbot)"""
+    await userbot_pool.release(userbot)
+
 @app.on_message(filters.command("batch") & filters.private)
 async def batch_link(_, message):
     """Handle batch processing"""
@@ -201,30 +202,57 @@ async def batch_link(_, message):
     
     users_loop[user_id] = True
     status = await message.reply(f"📦 Batch started: 0/{count} processed")
+    userbot = None
     
     try:
         userbot = await initialize_userbot(user_id) if needs_userbot(start_link) else None
+        client = userbot or app
+        
+        # Resolve once, then fetch up to 200 messages per API call
+        chat_ref, _ = parse_message_link(start_link)
+        peer = await bot.resolve_channel(chat_ref, client, userbot.name if userbot else "bot")
+        base_link = '/'.join(start_link.split('/')[:-1])
+        message_ids = list(range(start_id, start_id + count))
+        scanned = uploaded = failed = 0
         
-        for i in range(count):
+        async for chunk_ids, messages in bot.iter_batch_messages(client, peer.peer_id, message_ids):
             if not users_loop.get(user_id, False):
                 break
             
-            link = f"{'/'.join(start_link.split('/')[:-1])}/{start_id + i}"
+            for msg in messages:
+                if not users_loop.get(user_id, False):
+                    break
+                
+                link = f"{base_link}/{msg.id}"
+                
+                try:
+                    if await process_and_upload_link(userbot, user_id, status.id, link, 0, message, msg):
+                        uploaded += 1
+                    else:
+                        failed += 1
+                except Exception as e:
+                    print(f"Batch error on {link}: {e}")
+                    failed += 1
+                    continue
+                # Pacing happens inside get_msg; status edits are skipped when too frequent
+                if pacer.try_acquire("edit", status.id):
+                    await status.edit(
+                        f"📦 Batch progress: {scanned + len(chunk_ids)}/{count} scanned, "
+                        f"{uploaded} uploaded, {failed} failed"
+                    )
             
-            try:
-                await process_and_upload_link(userbot, user_id, status.id, link, 0, message)
-                await status.edit(f"📦 Batch progress: {i+1}/{count}")
-                await asyncio.sleep(2)
-            except Exception as e:
-                print(f"Batch error on {link}: {e}")
-                continue
+            scanned += len(chunk_ids)
         
-        await status.edit(f"✅ Batch completed! {count} messages processed.")
+        await status.edit(
+            f"✅ Batch completed! {scanned} messages scanned, {uploaded} uploaded, "
+            f"{failed} failed, {scanned - uploaded - failed} skipped."
+        )
         
     except Exception as e:
         await status.edit(f"❌ Batch failed: {str(e)}")
     finally:
         users_loop[user_id] = False
+        await release_userbot(userbot)
         await set_interval(user_id, 300)
 
 @app.on_message(filters.command("cancel"))
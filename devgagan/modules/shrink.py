@@ -7,25 +7,20 @@
 # ---------------------------------------------------
 
 import asyncio
-import random
-import string
 from pyrogram import filters
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from motor.motor_asyncio import AsyncIOMotorClient
-from config import MONGO_DB, WEBSITE_URL, AD_API
+from config import MONGO_DB
 from devgagan import app
 from devgagan.core.func import subscribe, chk_user
+from devgagan.core.token_pool import token_pool
 from datetime import datetime, timedelta
-import aiohttp
 
 # Database setup
 tclient = AsyncIOMotorClient(MONGO_DB)
 tdb = tclient["telegram_bot"]
 token_collection = tdb["tokens"]
 
-# Cache for active tokens
-Param = {}
-
 async def create_ttl_index():
     """Create TTL index for auto-expiry"""
     try:
@@ -34,28 +29,6 @@ async def create_ttl_index():
     except:
         pass
 
-async def generate_param(length=8):
-    """Generate random parameter"""
-    return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
-
-async def get_shortened_url(deep_link):
-    """Get short URL from API"""
-    if not WEBSITE_URL or not AD_API:
-        return deep_link
-    
-    try:
-        api_url = f"https://{WEBSITE_URL}/api?api={AD_API}&url={deep_link}"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(api_url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get("status") == "success":
-                        return data.get("shortenedUrl")
-    except Exception as e:
-        print(f"Shortener error: {e}")
-    
-    return deep_link
-
 async def is_user_verified(user_id):
     """Check if user has active token"""
     try:
@@ -89,15 +62,14 @@ async def token_handler(_, message):
         await message.reply("✅ Your free session is already active!")
         return
     
-    # Verify token
-    if user_id in Param and Param[user_id] == param:
+    # Verify token (pending tokens live in Mongo, so any shard or restart can check them)
+    if await token_pool.verify(user_id, param):
         await token_collection.insert_one({
             "user_id": user_id,
             "param": param,
             "created_at": datetime.utcnow(),
             "expires_at": datetime.utcnow() + timedelta(hours=3),
         })
-        del Param[user_id]
         await message.reply("🎉 **Verified!** Enjoy 3 hours of free access!")
     else:
         await message.reply("❌ **Invalid token!** Use /token to generate new one.")
@@ -115,11 +87,8 @@ async def generate_token(_, message):
         await message.reply("✅ Your free session is already active!")
         return
     
-    param = await generate_param()
-    Param[user_id] = param
-    
-    deep_link = f"https://t.me/{_.me.username}?start={param}"
-    short_url = await get_shortened_url(deep_link)
+    # Pre-shortened link from the pool; only an empty pool waits on the shortener
+    short_url = await token_pool.claim(_, user_id)
     
     button = InlineKeyboardMarkup(
         [[InlineKeyboardButton("🔑 Verify Access", url=short_url)]]
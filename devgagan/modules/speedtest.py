@@ -10,10 +10,9 @@ import os
 import asyncio
 import traceback
 from time import time
-from speedtest import Speedtest
-from telethon import events
-from devgagan import botStartTime
-from devgagan import sex as gagan
+from pyrogram import enums, filters
+from devgagan import app, botStartTime
+from config import OWNER_ID
 
 SIZE_UNITS = ['B', 'KB', 'MB', 'GB', 'TB', 'PB']
 
@@ -54,13 +53,14 @@ def speed_convert(size, is_bits=True):
         zero += 1
     return f"{round(size, 2)} {units[zero]}"
 
-@gagan.on(events.NewMessage(incoming=True, pattern='^/speedtest$', from_users=OWNER_ID))
-async def speedtest(event):
+@app.on_message(filters.command("speedtest") & filters.user(OWNER_ID))
+async def speedtest(_, message):
     """Run speedtest - OWNER ONLY"""
-    status_msg = await event.reply("🚀 **Running Speed Test...**\nPlease wait ~30 seconds.")
+    status_msg = await message.reply("🚀 **Running Speed Test...**\nPlease wait ~30 seconds.")
     
     try:
         # Run speedtest
+        from speedtest import Speedtest  # Deferred: only the owner ever runs /speedtest
         test = Speedtest()
         test.get_best_server()
         test.download()
@@ -96,15 +96,15 @@ async def speedtest(event):
         
         # Send with image if available
         if image_path and os.path.exists(image_path):
-            await event.reply(string_speed, file=image_path, parse_mode='html')
+            await message.reply_photo(image_path, caption=string_speed, parse_mode=enums.ParseMode.HTML)
             os.remove(image_path)  # Cleanup
         else:
-            await event.reply(string_speed, parse_mode='html')
+            await message.reply(string_speed, parse_mode=enums.ParseMode.HTML)
         
         await status_msg.delete()
             
     except Exception as e:
         error_trace = traceback.format_exc()
-        await status_msg.edit(f"❌ **Speedtest Failed:**\n`{str(e)[:300]}`")
+        await status_msg.edit_text(f"❌ **Speedtest Failed:**\n`{str(e)[:300]}`")
         print(f"Speedtest Error:\n{error_trace}")
         
\ No newline at end of file
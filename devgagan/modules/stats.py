@@ -13,7 +13,15 @@ from pyrogram import filters
 from devgagan import app, botStartTime
 from devgagan.core.mongo.users_db import get_users, add_user, get_user
 from devgagan.core.mongo.plans_db import premium_users
-from config import OWNER_ID
+from devgagan.core.pacer import pacer
+from devgagan.core.transfers import transfer_scheduler
+from devgagan.core.loopmon import loop_monitor
+from devgagan.core.supervisor import supervisor
+from devgagan.core.disk import disk_budget
+from devgagan.core.workdir import janitor
+from devgagan.core.tracing import tracer
+from devgagan.core.memory import memory_guard
+from config import OWNER_ID, SHARDS, SHARD_INDEX
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -49,6 +57,25 @@ def time_formatter() -> str:
     
     return ":".join(parts)
 
+def pacing_summary() -> str:
+    """One line per paced API method"""
+    lines = [
+        f"`{method}`: {data['calls']} calls, {data['flood_waits']} FloodWaits, "
+        f"+{data['delay']}s spacing, waited {data['waited']}s"
+        for method, data in pacer.stats().items()
+    ]
+    return "\n".join(lines) or "`idle`"
+
+def clients_summary():
+    """One line per supervised client"""
+    lines = [
+        f"{'🟢' if data['available'] else '🔴'} `{name}`: "
+        + (f"{data['latency'] * 1000:.0f}ms" if data['available'] else f"down ({data['failures']} failures)")
+        + f", {data['reconnects']} reconnects"
+        for name, data in supervisor.stats().items()
+    ]
+    return "\n".join(lines) or "`none`"
+
 def get_mongo_version():
     """Safely get MongoDB version"""
     try:
@@ -70,6 +97,11 @@ async def stats(client, message):
         users = await get_users() or []
         premium = await premium_users() or []
         
+        transfers = transfer_scheduler.stats()
+        disk = disk_budget.stats()
+        cleanup = janitor.stats()
+        lag = loop_monitor.stats()
+        
         # Build stats message
         stats_text = f"""
 **Stats of {bot_info.mention}:
@@ -82,10 +114,87 @@ async def stats(client, message):
 
 🎨 **Python**: `{sys.version.split()[0]}`
 📑 **MongoDB**: `{get_mongo_version()}`
+
+🚚 **Transfers**: `{transfers['active']}/{transfers['slots']}` active, `{transfers['queued']}` queued ({transfers['queued_premium']} premium)
+💾 **Disk**: `{disk['reserved'] / 1024**3:.2f}/{disk['budget'] / 1024**3:.2f} GB` reserved by {disk['jobs']} jobs, `{disk['waiting']}` waiting
+🧹 **Janitor**: `{cleanup['bytes_reclaimed'] / 1024**2:.1f} MB` reclaimed from {cleanup['files_removed']} items
+🔀 **Process**: `{f"shard {SHARD_INDEX + 1}/{SHARDS} (this user's)" if SHARD_INDEX >= 0 else "single"}`
+🐢 **Loop Lag**: p50 `{lag['p50'] * 1000:.0f}ms`, p99 `{lag['p99'] * 1000:.0f}ms`, max `{lag['max']:.2f}s`, `{lag['stalls']}` stalls
+
+🔌 **Clients**:
+{clients_summary()}
+
+⏱ **Pacing**:
+{pacing_summary()}
 """
         await message.reply_text(stats_text)
         
     except Exception as e:
         logger.error(f"Stats command error: {e}")
         await message.reply_text(f"❌ **Error generating stats:**\n`{str(e)}`")
-        
\ No newline at end of file
+        
+@app.on_message(filters.command("traces") & filters.user(OWNER_ID))
+async def traces(client, message):
+    """Where job time goes: per-phase breakdown of recent jobs (Owner only)"""
+    try:
+        limit = int(message.command[1]) if len(message.command) > 1 else 200
+        summary = tracer.summary(limit)
+        if not summary["jobs"]:
+            await message.reply_text("📭 **No traced jobs yet.**")
+            return
+        
+        phases = "\n".join(
+            f"`{name}`: {data['count']}x, p50 `{data['p50']:.2f}s`, p95 `{data['p95']:.2f}s`, {data['share'] * 100:.0f}% of time"
+            for name, data in summary["phases"].items()
+        )
+        slowest = "\n".join(
+            f"`{trace.trace_id}` {trace.kind} `{trace.duration:.1f}s`: "
+            + ", ".join(f"{span.name} {span.duration:.1f}s" for span in sorted(trace.spans, key=lambda span: -span.duration)[:3])
+            for trace in summary["slowest"]
+        )
+        await message.reply_text(
+            f"🔬 **Last {summary['jobs']} jobs** ({summary['errors']} failed)\n"
+            f"⏱ p50 `{summary['p50']:.1f}s`, p95 `{summary['p95']:.1f}s`\n\n"
+            f"**Phases:**\n{phases}\n\n**Slowest:**\n{slowest}"
+        )
+        
+    except Exception as e:
+        logger.error(f"Traces command error: {e}")
+        await message.reply_text(f"❌ **Error generating traces:**\n`{str(e)}`")
+
+@app.on_message(filters.command("memprofile") & filters.user(OWNER_ID))
+async def memprofile(client, message):
+    """Switch per-job memory profiling: /memprofile <user_id|all|off> (Owner only)"""
+    arg = message.command[1].lower() if len(message.command) > 1 else ""
+    if arg == "all":
+        memory_guard.profile_all = True
+    elif arg == "off":
+        memory_guard.profile_all = False
+        memory_guard.profile_users.clear()
+    elif arg.lstrip("-").isdigit():
+        memory_guard.profile_users.add(int(arg))
+    else:
+        await message.reply_text("❌ Usage: `/memprofile <user_id|all|off>`")
+        return
+    
+    targets = "all jobs" if memory_guard.profile_all else ", ".join(map(str, memory_guard.profile_users)) or "nobody"
+    await message.reply_text(f"🧠 **Memory profiling:** {targets}")
+
+@app.on_message(filters.command("memory") & filters.user(OWNER_ID))
+async def memory(client, message):
+    """RSS vs budget and the latest job profile (Owner only)"""
+    stats = memory_guard.stats()
+    text = (
+        f"🧠 **RSS**: `{stats['rss'] / 1024**2:.0f} MB` (peak `{stats['peak_rss'] / 1024**2:.0f} MB`)\n"
+        f"📏 **Budget**: `{stats['budget'] / 1024**2:.0f} MB`, `{stats['buffered'] / 1024**2:.0f} MB` buffered\n"
+        f"🐌 **Streaming fallbacks**: `{stats['degraded']}`"
+    )
+    if memory_guard.reports:
+        report = memory_guard.reports[-1]
+        sites = "\n".join(f"`{site}`" for site in report["sites"][:5])
+        text += (
+            f"\n\n**Last profile** ({report['job']}, {report['seconds']}s):\n"
+            f"RSS `{report['start_rss'] / 1024**2:.0f}` -> `{report['peak_rss'] / 1024**2:.0f} MB`, "
+            f"traced peak `{report['traced_peak'] / 1024**2:.1f} MB`\n{sites}"
+        )
+    await message.reply_text(text)
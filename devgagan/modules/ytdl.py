@@ -6,33 +6,38 @@
 # License: MIT License
 # ---------------------------------------------------
 
-import yt_dlp
 import os
-import tempfile
 import time
 import asyncio
 import random
 import string
 import logging
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from typing import Any
 
-import aiohttp
-import aiofiles
-from mutagen.id3 import ID3, TIT2, TPE1, COMM, APIC
-from mutagen.mp3 import MP3
-
-from telethon import events
+from pyrogram import filters
 from telethon.tl.types import DocumentAttributeVideo
 
 from devgagan import sex as telethon_client, app as pyrogram_client
-from devgagan.core.func import screenshot, video_metadata
+from devgagan.core.func import screenshot
+from devgagan.core.peer_cache import ResolvedPeer
+from devgagan.core.media_pool import media_pool
+from devgagan.core.ytdlp_engine import ytdlp_engine
+from devgagan.core.stream_upload import BIG_FILE_SIZE, is_progressive, stream_while_downloading
+from devgagan.core.media_cache import media_cache
+from devgagan.core.ytdl_profiles import profile_for
+from devgagan.core.progress import progress_reporter
+from devgagan.core.http_client import http_client
+from devgagan.core.transfers import transfer_scheduler
+from devgagan.core.disk import disk_budget
+from devgagan.core.workdir import workdir
+from devgagan.core.metrics import timed_job
+from config import DISK_DEFAULT_RESERVE, YTDLP_STREAM_UPLOAD
 
 logger = logging.getLogger(__name__)
 
-# Thread pool for blocking operations
-thread_pool = ThreadPoolExecutor(max_workers=3)
-
 # Active downloads tracker
 ongoing_downloads = {}
 
@@ -40,38 +45,45 @@ def get_random_string(length=7):
     """Generate random string for filenames"""
     return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
 
-async def download_thumbnail(url, path):
-    """Async thumbnail download"""
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    async with aiofiles.open(path, 'wb') as f:
-                        await f.write(await response.read())
-                    return path
-    except Exception as e:
-        logger.error(f"Thumbnail download failed: {e}")
-    return None
+@dataclass
+class Command:
+    """
+    The /dl or /adl message, received through Pyrogram (the dispatcher the
+    sharding front routes to workers) and answered through Telethon, which
+    does the uploads. Both are the same bot, so Pyrogram's stored access
+    hash is valid for Telethon too.
+    """
+    message: Any  # Pyrogram Message
+    peer: Any  # Telethon InputPeer of the chat
 
-async def extract_info(url, ydl_opts):
-    """Extract video info in thread pool"""
-    def sync_extract():
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            return ydl.extract_info(url, download=False)
-    return await asyncio.get_event_loop().run_in_executor(thread_pool, sync_extract)
+    @classmethod
+    async def from_message(cls, message):
+        raw = await pyrogram_client.resolve_peer(message.chat.id)
+        return cls(message, ResolvedPeer(message.chat.id, getattr(raw, "access_hash", 0)).telethon_input())
 
-async def download_media(url, ydl_opts):
-    """Download media in thread pool"""
-    def sync_download():
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
-    return await asyncio.get_event_loop().run_in_executor(thread_pool, sync_download)
+    @property
+    def sender_id(self):
+        user = self.message.from_user  # None for anonymous group admins
+        return user.id if user else self.message.chat.id
 
+    async def reply(self, text):
+        """Telethon message, so progress edits and errors are Telethon's"""
+        return await telethon_client.send_message(self.peer, text, reply_to=self.message.id)
+
+async def download_thumbnail(url, path):
+    """Async thumbnail download (pooled connections, capped at 10MB)"""
+    return await http_client.download(url, path, max_bytes=10 * 1024**2)
+
+@timed_job("ytdl_audio")
 async def process_audio(event, url, cookies_env_var=None):
     """Process and upload audio"""
     user_id = event.sender_id
+    variant = "audio:mp3-192"
     download_path = None
-    temp_cookie_path = None
+    job_path = None
+    reporter = None
+    disk_hold = disk_budget.hold(user_id)
+    flights = AsyncExitStack()  # Held until the result is cached, so duplicates wait for it
     
     try:
         # Check if already downloading
@@ -81,22 +93,21 @@ async def process_audio(event, url, cookies_env_var=None):
         
         ongoing_downloads[user_id] = True
         
-        # Setup cookies if needed
-        cookies = os.getenv(cookies_env_var) if cookies_env_var else None
-        if cookies:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-                f.write(cookies)
-                temp_cookie_path = f.name
+        # Already delivered (or being delivered right now) under this URL: re-send it
+        cached = await flights.enter_async_context(media_cache.by_url(url, variant))
+        if cached and await media_cache.send(telethon_client, event.peer, cached):
+            return
+        
+        job_path = await asyncio.to_thread(workdir.create, user_id)
         
         # Generate download path
-        random_name = get_random_string()
+        random_name = os.path.join(job_path, get_random_string())
         download_path = f"{random_name}.mp3"
         
-        # Download options
+        # Download options (cookies and output path are per job, passed separately)
+        profile = profile_for(url, await transfer_scheduler.tier_of(user_id))
         ydl_opts = {
             'format': 'bestaudio/best',
-            'outtmpl': f"{random_name}.%(ext)s",
-            'cookiefile': temp_cookie_path,
             'postprocessors': [{
                 'key': 'FFmpegExtractAudio',
                 'preferredcodec': 'mp3',
@@ -104,83 +115,107 @@ async def process_audio(event, url, cookies_env_var=None):
             }],
             'quiet': True,
             'noplaylist': True,
+            **profile.ydl_opts(),
         }
         
         # Download and extract
         progress_msg = await event.reply("🎵 **Downloading audio...**")
-        info_dict = await extract_info(url, ydl_opts)
+        reporter = progress_reporter(progress_msg, "🎵 Downloading audio")
+        info_dict = await ytdlp_engine.extract(user_id, url, ydl_opts, cookies=cookies_env_var)
         
         if not info_dict:
             return
         
-        await download_media(url, ydl_opts)
+        # Same media under another URL form (youtu.be, shorts, mobile links)
+        key = media_cache.key(info_dict, variant)
+        if key:
+            cached = await flights.enter_async_context(media_cache.by_key(key))
+            if cached and await media_cache.send(telethon_client, event.peer, cached, url):
+                await progress_msg.delete()
+                return
+        
+        expected_size = info_dict.get('filesize') or info_dict.get('filesize_approx') or 0
+        if not disk_budget.can_admit(expected_size or DISK_DEFAULT_RESERVE):
+            await reporter.status("💾 **Waiting for disk space...**")
+        await disk_hold.reserve(expected_size or DISK_DEFAULT_RESERVE)
+        async with transfer_scheduler.slot(user_id, "download", expected_size, client="ytdlp"):
+            await ytdlp_engine.download(user_id, info_dict, ydl_opts, f"{random_name}.%(ext)s", cookies=cookies_env_var,
+                                        progress_hooks=[reporter.hook])
         title = info_dict.get('title', 'Unknown Title')
         
         # Edit metadata
-        await progress_msg.edit("🎵 **Adding metadata...**")
+        await reporter.status("🎵 **Adding metadata...**")
         await edit_audio_metadata(download_path, title, info_dict.get('thumbnail'))
         
         # Upload
-        await progress_msg.edit("📤 **Uploading...**")
-        await upload_audio(telethon_client, event.chat_id, download_path, title)
+        await reporter.status("📤 **Uploading...**", title="📤 Uploading audio")
+        async with transfer_scheduler.slot(user_id, "upload", os.path.getsize(download_path), client="telethon") as ticket:
+            message = await upload_audio(telethon_client, event.peer, download_path, title,
+                                         ticket.wrap_progress(reporter.upload))
+        await media_cache.store(key, url, variant, message)
         
     except Exception as e:
         logger.error(f"Audio processing error: {e}", exc_info=True)
         await event.reply(f"❌ **Error:** {str(e)}")
+        return False
     
     finally:
+        if reporter:
+            reporter.close()
+        await flights.aclose()
         ongoing_downloads.pop(user_id, None)
         # Cleanup
-        for path in [download_path, temp_cookie_path]:
-            if path and os.path.exists(path):
-                os.remove(path)
+        # Download and thumbnails live in the job directory
+        if job_path:
+            await asyncio.to_thread(workdir.remove, job_path)
+        disk_hold.release()
 
 async def edit_audio_metadata(file_path, title, thumbnail_url):
-    """Edit MP3 metadata"""
+    """Edit MP3 metadata (tagging runs in the media worker pool)"""
+    thumb_path = cover = None
     try:
-        audio = MP3(file_path, ID3=ID3)
-        try:
-            audio.add_tags()
-        except:
-            pass
-        
-        audio.tags["TIT2"] = TIT2(encoding=3, text=title)
-        audio.tags["TPE1"] = TPE1(encoding=3, text="༺⚡༻ 𝑫𝒊𝒗𝒚𝒂𝒏𝒔𝒉 𝒔𝒉𝒖𝒌𝒍𝒂 ༺⚡༻")
-        audio.tags["COMM"] = COMM(encoding=3, lang="eng", desc="Comment", text="Processed by Team SPY")
-        
         if thumbnail_url:
-            thumb_path = os.path.join(tempfile.gettempdir(), f"{get_random_string()}.jpg")
+            thumb_path = os.path.join(os.path.dirname(file_path), f"{get_random_string()}.jpg")
             if await download_thumbnail(thumbnail_url, thumb_path):
-                async with aiofiles.open(thumb_path, 'rb') as img:
-                    audio.tags["APIC"] = APIC(
-                        encoding=3, mime='image/jpeg', type=3, desc='Cover', data=await img.read()
-                    )
-                os.remove(thumb_path)
+                cover = await media_pool.thumbnail(thumb_path)  # APIC wants JPEG; sites often serve webp
         
-        audio.save()
+        await media_pool.tag_mp3(
+            file_path, title,
+            "༺⚡༻ 𝑫𝒊𝒗𝒚𝒂𝒏𝒔𝒉 𝒔𝒉𝒖𝒌𝒍𝒂 ༺⚡༻",
+            "Processed by Team SPY",
+            cover
+        )
     except Exception as e:
         logger.error(f"Metadata editing failed: {e}")
+    finally:
+        for path in (thumb_path, cover):
+            if path and os.path.exists(path):
+                os.remove(path)
 
-async def upload_audio(client, chat_id, file_path, title):
-    """Upload audio file"""
+async def upload_audio(client, chat_id, file_path, title, progress=None):
+    """Upload audio file; `progress` is a Telethon progress_callback"""
     try:
         message = await client.send_file(
             chat_id,
             file_path,
             caption=f"**{title}**\n\n**__Powered by ༺⚡༻ 𝑫𝒊𝒗𝒚𝒂𝒏𝒔𝒉 𝒔𝒉𝒖𝒌𝒍𝒂 ༺⚡༻__**",
-            progress_callback=lambda current, total: progress_callback(current, total, chat_id)
+            progress_callback=progress
         )
         return message
     except Exception as e:
         logger.error(f"Upload failed: {e}")
         raise
 
-@telethon_client.on(events.NewMessage(pattern="^/adl(?: |$)(.*)", incoming=True))
-async def audio_handler(event):
+def command_url(message):
+    parts = (message.text or "").split(maxsplit=1)
+    return parts[1].strip() if len(parts) > 1 else ""
+
+@pyrogram_client.on_message(filters.command("adl") & filters.incoming)
+async def audio_handler(_, message):
     """Handle /adl command"""
-    url = event.pattern_match.group(1).strip()
+    url = command_url(message)
     if not url:
-        await event.reply("**Usage:** `/adl <link>`\nSupports: YouTube, Instagram, etc.")
+        await message.reply("**Usage:** `/adl <link>`\nSupports: YouTube, Instagram, etc.")
         return
     
     cookies_var = None
@@ -189,14 +224,14 @@ async def audio_handler(event):
     elif "youtube.com" in url or "youtu.be" in url:
         cookies_var = "YT_COOKIES"
     
-    await process_audio(event, url, cookies_var)
+    await process_audio(await Command.from_message(message), url, cookies_var)
 
-@telethon_client.on(events.NewMessage(pattern="^/dl(?: |$)(.*)", incoming=True))
-async def video_handler(event):
+@pyrogram_client.on_message(filters.command("dl") & filters.incoming)
+async def video_handler(_, message):
     """Handle /dl command"""
-    url = event.pattern_match.group(1).strip()
+    url = command_url(message)
     if not url:
-        await event.reply("**Usage:** `/dl <link>`\nSupports: YouTube, Instagram, etc.")
+        await message.reply("**Usage:** `/dl <link>`\nSupports: YouTube, Instagram, etc.")
         return
     
     cookies_var = None
@@ -208,15 +243,18 @@ async def video_handler(event):
         cookies_var = "YT_COOKIES"
         check_size = True
     
-    # Note: You need to implement process_video similar to process_audio
-    # For now, just send a placeholder message
-    await process_video(event, url, cookies_var, check_size)
+    await process_video(await Command.from_message(message), url, cookies_var, check_size)
 
+@timed_job("ytdl_video")
 async def process_video(event, url, cookies_env_var=None, check_duration_and_size=False):
     """Process and upload video"""
     user_id = event.sender_id
+    variant = "video:best"  # Kind + yt-dlp format: what the cached upload contains
     download_path = None
-    temp_cookie_path = None
+    job_path = None
+    reporter = None
+    disk_hold = disk_budget.hold(user_id)
+    flights = AsyncExitStack()  # Held until the result is cached, so duplicates wait for it
     
     try:
         if user_id in ongoing_downloads:
@@ -225,93 +263,171 @@ async def process_video(event, url, cookies_env_var=None, check_duration_and_siz
         
         ongoing_downloads[user_id] = True
         
-        # Setup cookies
-        cookies = os.getenv(cookies_env_var) if cookies_env_var else None
-        if cookies:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-                f.write(cookies)
-                temp_cookie_path = f.name
+        # Already delivered (or being delivered right now) under this URL: re-send it
+        cached = await flights.enter_async_context(media_cache.by_url(url, variant))
+        if cached and await media_cache.send(telethon_client, event.peer, cached):
+            return
+        
+        job_path = await asyncio.to_thread(workdir.create, user_id)
         
         # Generate download path
-        random_name = get_random_string()
-        download_path = f"{random_name}.mp4"
+        download_path = os.path.join(job_path, f"{get_random_string()}.mp4")
         
-        # Download options
-        ydl_opts = {
-            'outtmpl': download_path,
+        # Download options (cookies and output path are per job, passed separately)
+        profile = profile_for(url, await transfer_scheduler.tier_of(user_id))
+        base_opts = {
             'format': 'best',
-            'cookiefile': temp_cookie_path,
             'writethumbnail': True,
             'quiet': True,
         }
+        ydl_opts = {**base_opts, **profile.ydl_opts()}
         
         # Download
         progress_msg = await event.reply("🎬 **Downloading video...**")
-        info_dict = await extract_info(url, ydl_opts)
+        reporter = progress_reporter(progress_msg, "🎬 Downloading video")
+        info_dict = await ytdlp_engine.extract(user_id, url, ydl_opts, cookies=cookies_env_var)
         
         if not info_dict:
             return
         
+        # Same media under another URL form (youtu.be, shorts, mobile links)
+        key = media_cache.key(info_dict, variant)
+        if key:
+            cached = await flights.enter_async_context(media_cache.by_key(key))
+            if cached and await media_cache.send(telethon_client, event.peer, cached, url):
+                await progress_msg.delete()
+                return
+        
         # Check constraints
         if check_duration_and_size:
             duration = info_dict.get('duration', 0)
             if duration > 3 * 3600:
-                await progress_msg.edit("❌ **Video is longer than 3 hours!**")
+                await reporter.status("❌ **Video is longer than 3 hours!**")
                 return
             
             filesize = info_dict.get('filesize_approx', 0)
             if filesize > 2 * 1024**3:
-                await progress_msg.edit("❌ **Video is larger than 2GB!**")
+                await reporter.status("❌ **Video is larger than 2GB!**")
                 return
         
-        await download_media(url, ydl_opts)
+        expected_size = info_dict.get('filesize') or info_dict.get('filesize_approx') or 0
+        if not disk_budget.can_admit(expected_size or DISK_DEFAULT_RESERVE):
+            await reporter.status("💾 **Waiting for disk space...**")
+        await disk_hold.reserve(expected_size or DISK_DEFAULT_RESERVE)
         title = info_dict.get('title', 'Unknown')
         
+        # Progressive formats: upload the parts while yt-dlp is still writing them
+        # (big-file API only; known small files go the normal way)
+        if YTDLP_STREAM_UPLOAD and is_progressive(info_dict) and not 0 < expected_size <= BIG_FILE_SIZE:
+            await reporter.status("🎬 **Downloading & uploading...**", title="🎬 Downloading & uploading")
+            stream_opts = {**base_opts, **profile.sequential().ydl_opts()}
+            uploaded = await stream_video(user_id, info_dict, stream_opts, download_path, cookies_env_var, expected_size, reporter)
+            if uploaded:
+                metadata = {
+                    'width': info_dict.get('width') or 0,
+                    'height': info_dict.get('height') or 0,
+                    'duration': int(info_dict.get('duration') or 0),
+                }
+                try:
+                    message = await upload_video(telethon_client, event.peer, download_path, title, metadata,
+                                                 info_dict.get('thumbnail'), uploaded=uploaded, sender=user_id)
+                except Exception as e:
+                    logger.warning(f"Sending the streamed upload failed, downloading again: {e}")
+                    message = None
+                    if os.path.exists(download_path):
+                        os.remove(download_path)  # May be hole-punched; only a fresh download is safe to send
+                if message:
+                    await media_cache.store(key, url, variant, message)
+                    reporter.close()
+                    await progress_msg.delete()
+                    return
+            await reporter.status("🎬 **Downloading video...**", title="🎬 Downloading video")
+        
+        async with transfer_scheduler.slot(user_id, "download", expected_size, client="ytdlp"):
+            await ytdlp_engine.download(user_id, info_dict, ydl_opts, download_path, cookies=cookies_env_var,
+                                        progress_hooks=[reporter.hook])
+        
         # Get metadata
-        metadata = video_metadata(download_path)
+        metadata = await media_pool.probe_video(download_path)
         
         # Upload
-        await progress_msg.edit("📤 **Uploading...**")
-        await upload_video(
-            telethon_client,
-            event.chat_id,
-            download_path,
-            title,
-            metadata,
-            info_dict.get('thumbnail')
-        )
+        await reporter.status("📤 **Uploading...**", title="📤 Uploading video")
+        async with transfer_scheduler.slot(user_id, "upload", os.path.getsize(download_path), client="telethon") as ticket:
+            message = await upload_video(
+                telethon_client,
+                event.peer,
+                download_path,
+                title,
+                metadata,
+                info_dict.get('thumbnail'),
+                progress=ticket.wrap_progress(reporter.upload),
+                sender=user_id
+            )
+        await media_cache.store(key, url, variant, message)
         
+        reporter.close()
         await progress_msg.delete()
         
     except Exception as e:
         logger.error(f"Video processing error: {e}", exc_info=True)
         await event.reply(f"❌ **Error:** {str(e)}")
+        return False
     
     finally:
+        if reporter:
+            reporter.close()
+        await flights.aclose()
         ongoing_downloads.pop(user_id, None)
         # Cleanup
-        for path in [download_path, temp_cookie_path]:
-            if path and os.path.exists(path):
-                os.remove(path)
+        # Download and thumbnails live in the job directory
+        if job_path:
+            await asyncio.to_thread(workdir.remove, job_path)
+        disk_hold.release()
 
-async def upload_video(client, chat_id, file_path, title, metadata, thumbnail_url):
-    """Upload video file"""
+async def stream_video(user_id, info_dict, ydl_opts, download_path, cookies_env_var, expected_size, reporter):
+    """Download and upload in one pass; None means fall back to download-then-upload"""
+    # With a thumbnail URL nothing reads the file afterwards, so uploaded parts can leave the disk
+    release_disk = bool(info_dict.get('thumbnail'))
+    try:
+        # One slot: it's the same bytes moving through, and a second per-user slot could deadlock
+        async with transfer_scheduler.slot(user_id, "upload", expected_size, client="telethon") as ticket:
+            return await stream_while_downloading(
+                telethon_client,
+                download_path,
+                lambda: ytdlp_engine.download(
+                    user_id, info_dict, {**ydl_opts, 'nopart': True}, download_path, cookies=cookies_env_var,
+                    progress_hooks=[reporter.hook]
+                ),
+                release_disk=release_disk,
+                progress=ticket.wrap_progress(reporter.upload)
+            )
+    except Exception as e:
+        logger.warning(f"Streaming upload failed, retrying as download-then-upload: {e}")
+        if os.path.exists(download_path):
+            os.remove(download_path)  # Partial (or hole-punched); the fallback starts fresh
+        return None
+
+async def upload_video(client, chat_id, file_path, title, metadata, thumbnail_url, uploaded=None, progress=None, sender=None):
+    """Upload video file (or send one already streamed up as `uploaded`); `progress` is a Telethon progress_callback"""
     try:
         # Download thumbnail if needed
         thumb_path = None
         if thumbnail_url:
-            thumb_path = os.path.join(tempfile.gettempdir(), f"{get_random_string()}.jpg")
-            if not await download_thumbnail(thumbnail_url, thumb_path):
+            thumb_path = os.path.join(os.path.dirname(file_path), f"{get_random_string()}.jpg")
+            if await download_thumbnail(thumbnail_url, thumb_path):
+                # Telegram drops thumbnails over 320px / 200KB; re-encode off the loop
+                thumb_path = await media_pool.thumbnail(thumb_path)
+            else:
                 thumb_path = None
         
-        # Use screenshot if no thumbnail
-        if not thumb_path:
-            thumb_path = await screenshot(file_path, metadata['duration'], chat_id)
+        # Use screenshot if no thumbnail (streamed files only stay readable when there was no thumbnail URL)
+        if not thumb_path and (uploaded is None or not thumbnail_url):
+            thumb_path = await screenshot(file_path, metadata['duration'], sender or chat_id)
         
         # Upload
-        await client.send_file(
+        message = await client.send_file(
             chat_id,
-            file_path,
+            uploaded or file_path,
             caption=f"**{title}**",
             thumb=thumb_path,
             attributes=[
@@ -322,25 +438,14 @@ async def upload_video(client, chat_id, file_path, title, metadata, thumbnail_ur
                     supports_streaming=True
                 )
             ],
-            progress_callback=lambda current, total: progress_callback(current, total, chat_id)
+            progress_callback=progress
         )
         
         # Cleanup thumbnail
         if thumb_path and os.path.exists(thumb_path):
             os.remove(thumb_path)
+        return message
             
     except Exception as e:
         logger.error(f"Video upload error: {e}")
         raise
-
-def progress_callback(current, total, user_id):
-    """Progress callback for uploads"""
-    # Calculate progress
-    percent = (current / total) * 100
-    done_mb = current / (1024 * 1024)
-    total_mb = total / (1024 * 1024)
-    
-    # Speed calculation
-    if user_id not in user_progress:
-        user_progress[user_id] = {'done': 
-        
\ No newline at end of file
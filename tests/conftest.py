@@ -0,0 +1,20 @@
+# ---------------------------------------------------
+# File Name: conftest.py
+# Description: Lets tests import devgagan.core modules without starting the clients
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# License: MIT License
+# ---------------------------------------------------
+
+import os
+import sys
+from types import ModuleType
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# devgagan/__init__.py builds and connects the bots; the core helpers under test don't need them
+if "devgagan" not in sys.modules:
+    package = ModuleType("devgagan")
+    package.__path__ = [os.path.join(REPO_ROOT, "devgagan")]
+    sys.modules["devgagan"] = package
@@ -0,0 +1,70 @@
+from telethon.tl.types import (
+    MessageEntityBold, MessageEntityItalic, MessageEntityCode, MessageEntityTextUrl
+)
+
+from devgagan.core.caption import CaptionFormatter
+
+
+def entities(result):
+    return [(type(e), e.offset, e.length) for e in result.entities]
+
+
+def test_plain_caption_passes_through():
+    result = CaptionFormatter().format("just text & <tags>")
+    assert result.text == "just text & <tags>"
+    assert result.entities == ()
+    assert result.html == "just text &amp; &lt;tags&gt;"
+
+
+def test_empty_and_none():
+    formatter = CaptionFormatter()
+    assert formatter.format(None).text == ""
+    assert formatter.format("").entities == ()
+
+
+def test_nested_entities():
+    result = CaptionFormatter().format("**bold __both__ bold**")
+    assert result.text == "bold both bold"
+    assert entities(result) == [(MessageEntityBold, 0, 14), (MessageEntityItalic, 5, 4)]
+    assert result.html == "<b>bold <i>both</i> bold</b>"
+
+
+def test_utf16_offsets_after_emoji():
+    # 🔥 is one code point but two UTF-16 code units
+    result = CaptionFormatter().format("🔥 **hot** `x`")
+    assert result.text == "🔥 hot x"
+    assert entities(result) == [(MessageEntityBold, 3, 3), (MessageEntityCode, 7, 1)]
+
+
+def test_emoji_inside_entity_counts_double():
+    result = CaptionFormatter().format("**a🎉b** [link](https://t.me/x)")
+    bold, url = result.entities
+    assert (bold.offset, bold.length) == (0, 4)
+    assert isinstance(url, MessageEntityTextUrl)
+    assert (url.offset, url.length, url.url) == (5, 4, "https://t.me/x")
+
+
+def test_unmatched_delimiters_stay_literal():
+    result = CaptionFormatter().format("**open and __closed__")
+    assert result.text == "**open and closed"
+    assert entities(result) == [(MessageEntityItalic, 11, 6)]
+
+
+def test_empty_pair_is_text():
+    result = CaptionFormatter().format("---- divider ----")
+    assert result.text == "---- divider ----"
+    assert result.entities == ()
+
+
+def test_cache_hits_and_lru_eviction():
+    formatter = CaptionFormatter(maxsize=2)
+    first = formatter.format("**a**")
+    formatter.format("**b**")
+    assert formatter.format("**a**") is first  # Hit, and now most recent
+    formatter.format("**c**")  # Evicts "**b**", the least recently used
+    assert formatter.stats() == {"size": 2, "hits": 1, "misses": 3}
+
+    formatter.format("**a**")
+    assert formatter.hits == 2
+    formatter.format("**b**")
+    assert formatter.misses == 4
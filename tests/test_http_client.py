@@ -0,0 +1,61 @@
+import asyncio
+
+from aiohttp import web
+
+from config import HTTP_PER_HOST
+from devgagan.core.http_client import HttpClient, http_client
+
+
+async def start_server(delay=0.05):
+    async def handler(request):
+        await asyncio.sleep(delay)  # Long enough for the requests to overlap
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_get("/api", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/api"
+
+
+def test_requests_share_pooled_connections():
+    async def scenario():
+        runner, url = await start_server()
+        before = http_client.stats()
+        try:
+            results = await asyncio.gather(*(http_client.get_json(url) for _ in range(50)))
+            results += [await http_client.get_json(url) for _ in range(10)]
+        finally:
+            await http_client.close()
+            await runner.cleanup()
+        after = http_client.stats()
+
+        assert results == [{"ok": True}] * 60
+        assert after["requests"] - before["requests"] == 60
+        assert after["failures"] == before["failures"]
+        assert after["connections"] - before["connections"] <= HTTP_PER_HOST
+        assert after["reused"] - before["reused"] >= 60 - HTTP_PER_HOST
+
+    asyncio.run(scenario())
+
+
+def test_session_from_a_finished_loop_is_closed():
+    client = HttpClient(per_host=2)
+
+    async def fetch():
+        runner, url = await start_server(delay=0)
+        try:
+            assert await client.get_json(url) == {"ok": True}
+        finally:
+            await runner.cleanup()
+        return client._session
+
+    first = asyncio.run(fetch())  # Not closed by its loop: the next loop gets a new session
+    second = asyncio.run(fetch())
+
+    assert second is not first
+    assert first.closed
+    asyncio.run(client.close())
@@ -0,0 +1,136 @@
+import asyncio
+import sys
+import time
+from io import BytesIO
+from multiprocessing.connection import Client as Connect
+from types import SimpleNamespace
+
+from pyrogram.raw import types
+
+from devgagan.core.sharding import (
+    ShardRouter, ShardWorker, _authkey, decode, encode, shard_for, update_user_id
+)
+
+
+def private_message(user_id, text="hi"):
+    message = types.Message(id=1, peer_id=types.PeerUser(user_id=user_id), date=0, message=text)
+    return types.UpdateNewMessage(message=message, pts=1, pts_count=1)
+
+
+def group_message(chat_id, user_id):
+    message = types.Message(
+        id=2, peer_id=types.PeerChat(chat_id=chat_id), from_id=types.PeerUser(user_id=user_id),
+        date=0, message="hello group"
+    )
+    return types.UpdateNewMessage(message=message, pts=1, pts_count=1)
+
+
+def callback_query(user_id):
+    return types.UpdateBotCallbackQuery(
+        query_id=1, user_id=user_id, peer=types.PeerUser(user_id=user_id), msg_id=3, chat_instance=0
+    )
+
+
+def test_update_user_id():
+    assert update_user_id(private_message(42)) == 42
+    assert update_user_id(group_message(7, 99)) == 99  # The author, not the group
+    assert update_user_id(callback_query(55)) == 55
+    assert update_user_id(types.UpdateConfig()) is None
+
+
+def test_shard_for():
+    assert shard_for(42, 4) == 2
+    assert shard_for(update_user_id(callback_query(55)), 4) == 3
+    assert shard_for(None, 4) == 0
+    # Everything from one user lands on one shard
+    assert len({shard_for(update_user_id(u), 3) for u in (private_message(43), group_message(7, 43), callback_query(43))}) == 1
+
+
+def test_encode_decode_round_trip():
+    # As Pyrogram hands it over: parsed from the wire, so unset vectors are [] rather than None
+    update = types.UpdateNewMessage.read(BytesIO(group_message(7, 99).write()[4:]))
+    users = {99: types.User(id=99, first_name="Ann", access_hash=5)}
+    chats = {7: types.Chat(id=7, title="Group", photo=types.ChatPhotoEmpty(), participants_count=2, date=0, version=1)}
+
+    decoded, decoded_users, decoded_chats = decode(encode(update, users, chats))
+
+    assert str(decoded) == str(update)
+    assert (decoded.pts, decoded.pts_count) == (1, 1)
+    assert decoded.message.from_id.user_id == 99
+    assert decoded_users[99].first_name == "Ann" and decoded_users[99].access_hash == 5
+    assert decoded_chats[7].title == "Group"
+
+
+class IdleRouter(ShardRouter):
+    """Workers are idle processes; the test plays the worker side itself"""
+    async def _spawn(self, index):
+        return await asyncio.create_subprocess_exec(sys.executable, "-c", "import time; time.sleep(60)")
+
+
+class FakeClient:
+    workers = 0
+
+    def __init__(self):
+        self.dispatcher = SimpleNamespace(locks_list=[], handler_worker_tasks=[], updates_queue=asyncio.Queue())
+        self.peers = []
+
+    async def fetch_peers(self, peers):
+        self.peers.extend(peers)
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_router_delivers_to_worker_and_buffers_while_it_reconnects(tmp_path):
+    async def scenario():
+        router = IdleRouter(shards=2, address=str(tmp_path / "shards.sock"))
+        running = asyncio.create_task(router.run())
+        try:
+            await deliver(router, running)
+        finally:
+            await router.stop()
+
+    async def deliver(router, running):
+        await wait_for(lambda: len(router.processes) == 2)
+
+        # First incarnation of worker 1 gets one update, then goes away
+        conn = await asyncio.to_thread(Connect, router.address, family="AF_UNIX", authkey=_authkey())
+        conn.send(1)
+        await router.route(None, private_message(43, "first"), {}, {})
+        update, _, _ = decode(await asyncio.to_thread(conn.recv_bytes))
+        assert update.message.message == "first"
+        conn.close()
+
+        # Routed while nobody is connected: kept for the replacement
+        users = {45: types.User(id=45, first_name="Bo")}
+        await router.route(None, private_message(45, "second"), users, {})
+        await router.route(None, callback_query(47), {}, {})
+        await router.route(None, private_message(44, "other shard"), {}, {})
+
+        client = FakeClient()
+        worker = ShardWorker(index=1, address=router.address)
+        receiving = asyncio.create_task(worker.run(client))
+        await wait_for(lambda: client.dispatcher.updates_queue.qsize() == 2)
+
+        second, second_users, _ = client.dispatcher.updates_queue.get_nowait()
+        third, _, _ = client.dispatcher.updates_queue.get_nowait()
+        assert second.message.message == "second" and list(second_users) == [45]
+        assert third.user_id == 47
+        assert [peer.id for peer in client.peers] == [45]
+        assert router.routed == [1, 3]
+        assert router.stats()[0]["connected"] == 0  # Shard 0's update waits for it
+
+        processes = dict(router.processes)
+        await router.stop()
+        await asyncio.wait_for(receiving, 5)  # The worker sees the front go away
+        assert running.done()
+        await asyncio.sleep(1.2)  # Past the first restart backoff
+        assert router.processes == processes  # Nothing respawned
+        assert all(p.returncode is not None for p in processes.values())
+        assert router.restarts == [0, 0]
+
+    asyncio.run(scenario())